@@ -29,11 +29,7 @@ from web_ui.routes import init_routes # A function that takes the app and adds r
 app, _ = fast_app(debug=True) # Create app, we might not use the returned router directly if web_ui.routes has its own
 init_routes(app) # Pass the app instance to initialize routes
 
-# Placeholder for where the uploaded file will be temporarily stored
-# In a real app, this needs to be more robust, secure, and cleaned up.
-from pathlib import Path
-UPLOAD_DIR = Path("./temp_uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+# Uploads are stored in the scratch area while they are graded (see sensei_core/scratch.py)
 
 if __name__ == "__main__":
     serve() # FastHTML's way to run Uvicorn
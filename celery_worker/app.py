@@ -1 +1,5 @@
 # Celery application instance
+from celery import Celery
+
+celery_app = Celery("cellsensei", include=["celery_worker.tasks"])
+celery_app.config_from_object("celery_worker.celeryconfig")
@@ -1 +1,41 @@
 # Configuration for Celery
+import os
+import tempfile
+from pathlib import Path
+
+# Broker and result backend. Point these at Redis in production, e.g.
+#   CELLSENSEI_BROKER_URL=redis://localhost:6379/0
+#   CELLSENSEI_RESULT_BACKEND=redis://localhost:6379/1
+# The defaults use Celery's filesystem transport and result backend so a
+# worker can run locally without any external services.
+_celery_dir = Path(os.environ.get("CELLSENSEI_CELERY_DIR", Path(tempfile.gettempdir()) / "cellsensei_celery"))
+
+broker_url = os.environ.get("CELLSENSEI_BROKER_URL", "filesystem://")
+result_backend = os.environ.get("CELLSENSEI_RESULT_BACKEND", f"file://{_celery_dir / 'results'}")
+
+if broker_url.startswith("filesystem://"):
+    for folder in ("queue", "processed", "control"):
+        (_celery_dir / folder).mkdir(parents=True, exist_ok=True)
+    broker_transport_options = {
+        "data_folder_in": str(_celery_dir / "queue"),
+        "data_folder_out": str(_celery_dir / "queue"),
+        "processed_folder": str(_celery_dir / "processed"),
+        "control_folder": str(_celery_dir / "control"),
+        "store_processed": False,
+    }
+
+if result_backend.startswith("file://"):
+    (_celery_dir / "results").mkdir(parents=True, exist_ok=True)
+
+# Results are plain dicts/lists, so JSON is enough
+task_serializer = "json"
+result_serializer = "json"
+accept_content = ["json"]
+
+# Report STARTED (and our PROGRESS updates) rather than leaving tasks PENDING
+task_track_started = True
+result_expires = 60 * 60
+
+# Grading tasks are long and CPU-bound: hand them out one at a time
+worker_prefetch_multiplier = 1
+task_acks_late = True
@@ -1 +1,56 @@
 # Celery tasks for background processing
+import json
+from typing import Dict, List, Any, Optional
+
+from celery_worker.app import celery_app
+from sensei_core.pipeline import grade_submission, GRADING_STAGES
+from sensei_core.scratch import remove_scratch_file
+
+
+@celery_app.task(bind=True, name="cellsensei.grade_submission")
+def grade_submission_task(
+    self,
+    file_path: str,
+    filename: str,
+    options: Dict[str, bool],
+    difficulty: str = "beginner",
+    config_path: Optional[str] = None,
+    selected_functions: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Grade an uploaded file, reporting each pipeline stage as PROGRESS.
+
+    Args:
+        file_path: Path to the uploaded file (on storage shared with the web tier)
+        filename: Original name of the upload, shown on the results page
+        options: Dictionary of check options to enable/disable
+        difficulty: Difficulty level (beginner, intermediate, advanced)
+        config_path: Path of the test configuration to use, or None to skip function tests
+        selected_functions: Names of the functions the student selected for testing
+
+    Returns:
+        Dictionary with "filename", "analysis_results" and "test_results"
+    """
+    def report(stage):
+        self.update_state(state="PROGRESS", meta={
+            "stage": stage,
+            "current": GRADING_STAGES.index(stage) + 1,
+            "total": len(GRADING_STAGES)
+        })
+
+    try:
+        grading = grade_submission(
+            file_path,
+            options,
+            difficulty,
+            config_path,
+            selected_functions or [],
+            progress=report
+        )
+    finally:
+        # Clean up the uploaded file once the worker is done with it
+        remove_scratch_file(file_path)
+
+    grading["filename"] = filename
+    # Test results can hold arbitrary return values; make them JSON-safe
+    return json.loads(json.dumps(grading, default=repr))
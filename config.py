@@ -1 +1,97 @@
 # Optional configuration file
+import os
+import tempfile
+
+# --- Static analysis ---
+
+# Number of warm dmypy daemons kept per worker process for the type-checking option
+MYPY_DAEMON_POOL_SIZE = int(os.environ.get("CELLSENSEI_MYPY_DAEMONS", "1"))
+# Threads per worker process running the analyzers of submissions (Ruff, mypy) side by side;
+# 0 runs each submission's analyzers one after another
+ANALYSIS_MAX_WORKERS = int(os.environ.get("CELLSENSEI_ANALYSIS_WORKERS", "4"))
+# Directory for the short-lived files external tools read (batched Ruff submissions, the file
+# each mypy daemon checks); a tmpfs keeps them off the disk
+TOOL_SCRATCH_DIR = os.environ.get(
+    "CELLSENSEI_TOOL_SCRATCH_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+)
+
+# --- Result cache ---
+
+# Cache analysis and test results by content so identical submissions are only graded once
+RESULT_CACHE_ENABLED = os.environ.get("CELLSENSEI_RESULT_CACHE", "1") != "0"
+# Entries kept in the per-process in-memory LRU tier
+RESULT_CACHE_MEMORY_ENTRIES = int(os.environ.get("CELLSENSEI_RESULT_CACHE_ENTRIES", "256"))
+# Directory of the on-disk tier shared by all workers (empty to disable the disk tier); it must be
+# owned by the grader's user and writable by no one else, or the disk tier is disabled
+RESULT_CACHE_DIR = os.environ.get(
+    "CELLSENSEI_RESULT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "cellsensei_cache")
+)
+# Size budget of the on-disk tier in bytes
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("CELLSENSEI_RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# --- Grading executor ---
+
+# Where the web tier runs blocking grading work: "thread", "process" or "inline" (on the event loop)
+GRADING_EXECUTOR = os.environ.get("CELLSENSEI_GRADING_EXECUTOR", "thread")
+# Maximum number of submissions graded concurrently per web process
+GRADING_MAX_WORKERS = int(os.environ.get("CELLSENSEI_GRADING_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# --- Grading backend ---
+
+# "executor" grades in the web process (see above); "celery" queues grading on Celery workers
+GRADING_BACKEND = os.environ.get("CELLSENSEI_GRADING_BACKEND", "executor")
+
+# --- Load shedding ---
+
+# Grading jobs admitted by a web process and not yet finished above which analysis is partial (0 disables)
+DEGRADE_QUEUE_DEPTH = int(os.environ.get("CELLSENSEI_DEGRADE_QUEUE_DEPTH", str(4 * GRADING_MAX_WORKERS)))
+# Moving average of static analysis time, in seconds, above which analysis is partial (0 disables)
+DEGRADE_LATENCY_SECONDS = float(os.environ.get("CELLSENSEI_DEGRADE_LATENCY", "5"))
+# Check options left out of partial analyses, to be run once the load has fallen
+DEFERRABLE_CHECKS = [
+    check.strip() for check in os.environ.get("CELLSENSEI_DEFERRABLE_CHECKS", "mypy,complexity").split(",") if check.strip()
+]
+# Full analyses waiting for the load to fall, per process; more are dropped
+DEFERRED_ANALYSIS_MAX = int(os.environ.get("CELLSENSEI_DEFERRED_ANALYSIS_MAX", "500"))
+
+# --- Sandbox ---
+
+# Pre-forked worker processes per grading process that run student functions and their tests
+SANDBOX_POOL_SIZE = int(os.environ.get("CELLSENSEI_SANDBOX_WORKERS", "2"))
+# Jobs a sandbox worker runs before it is replaced with a fresh one
+SANDBOX_MAX_JOBS_PER_WORKER = int(os.environ.get("CELLSENSEI_SANDBOX_MAX_JOBS", "50"))
+# CPU seconds one function's tests may use (RLIMIT_CPU)
+SANDBOX_CPU_SECONDS = float(os.environ.get("CELLSENSEI_SANDBOX_CPU_SECONDS", "5"))
+# Address-space limit of a sandbox worker in MiB (RLIMIT_AS)
+SANDBOX_MEMORY_MB = int(os.environ.get("CELLSENSEI_SANDBOX_MEMORY_MB", "1024"))
+# Open file descriptors allowed in a sandbox worker (RLIMIT_NOFILE)
+SANDBOX_MAX_OPEN_FILES = int(os.environ.get("CELLSENSEI_SANDBOX_MAX_FILES", "64"))
+# Wall-clock seconds to wait for one function's tests before the worker is killed
+SANDBOX_JOB_TIMEOUT = float(os.environ.get("CELLSENSEI_SANDBOX_JOB_TIMEOUT", "10"))
+# Total seconds a submission's function tests may run when the assignment doesn't set
+# settings.max_execution_time (0 for no limit beyond SANDBOX_JOB_TIMEOUT per function)
+DEFAULT_MAX_EXECUTION_TIME = float(os.environ.get("CELLSENSEI_MAX_EXECUTION_TIME", "30"))
+
+# --- Test results ---
+
+# Bytes (roughly, as repr) of a tested function's return value kept in its test result;
+# larger values, and anything that isn't plain data, are replaced by a bounded summary
+RESULT_VALUE_MAX_BYTES = int(os.environ.get("CELLSENSEI_RESULT_VALUE_MAX_BYTES", "4096"))
+# Add a SHA-256 digest of the full value to summaries, so equal outputs can be recognized
+RESULT_VALUE_DIGESTS = os.environ.get("CELLSENSEI_RESULT_VALUE_DIGESTS", "1") != "0"
+
+# --- Uploads ---
+
+# Scratch directory uploads are written to while they are graded (shared with Celery workers)
+UPLOAD_DIR = os.environ.get(
+    "CELLSENSEI_UPLOAD_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp_uploads")
+)
+# Largest upload accepted, in bytes
+UPLOAD_MAX_BYTES = int(os.environ.get("CELLSENSEI_UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+# Total bytes the scratch directory may hold; uploads are refused while it is full
+UPLOAD_DIR_MAX_BYTES = int(os.environ.get("CELLSENSEI_UPLOAD_DIR_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Files older than this many seconds are orphans (a crashed request or lost task) and are deleted;
+# keep it longer than a queued Celery task may wait
+UPLOAD_MAX_AGE_SECONDS = float(os.environ.get("CELLSENSEI_UPLOAD_MAX_AGE", str(6 * 60 * 60)))
+# Seconds between sweeps of the scratch directory
+UPLOAD_JANITOR_INTERVAL = float(os.environ.get("CELLSENSEI_UPLOAD_JANITOR_INTERVAL", "600"))
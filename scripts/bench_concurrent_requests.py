@@ -0,0 +1,155 @@
+"""
+Benchmark homepage and upload latency while several uploads are graded concurrently.
+
+Starts the app under Uvicorn once per grading executor mode, fires a batch of
+concurrent uploads, and polls the homepage while they are in flight. With the
+"inline" mode (grading on the event loop) homepage loads wait behind grading;
+with the "thread" or "process" executor they should stay fast.
+
+Usage:
+    python scripts/bench_concurrent_requests.py [--uploads 8] [--modes inline thread]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def make_submission(num_functions: int) -> bytes:
+    """Generate a notebook large enough to make grading take a while."""
+    lines = []
+    for index in range(num_functions):
+        lines.append(f"def compute_{index}(values):")
+        lines.append("    total = []")
+        lines.append("    for value in values:")
+        lines.append("        if value == None:")
+        lines.append("            continue")
+        lines.append("        total.append(value * 2)")
+        lines.append("    return total")
+        lines.append("")
+    notebook = {
+        "cells": [{"cell_type": "code", "execution_count": None, "metadata": {},
+                   "outputs": [], "source": "\n".join(lines)}],
+        "metadata": {}, "nbformat": 4, "nbformat_minor": 5
+    }
+    return json.dumps(notebook).encode("utf-8")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(base_url: str, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base_url, timeout=1).read()
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+def post_upload(base_url: str, payload: bytes) -> float:
+    boundary = uuid.uuid4().hex
+    fields = [
+        ("check_style", "on"), ("check_security", "on"), ("check_linter", "on"),
+        ("check_docstrings", "on"), ("check_best_practices", "on"),
+        ("check_unused", "on"), ("check_complexity", "on"),
+    ]
+    body = b""
+    for name, value in fields:
+        body += (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n").encode()
+    body += (f"--{boundary}\r\nContent-Disposition: form-data; name=\"notebook_file\"; "
+             f"filename=\"submission.ipynb\"\r\nContent-Type: application/x-ipynb+json\r\n\r\n").encode()
+    body += payload + f"\r\n--{boundary}--\r\n".encode()
+
+    request = urllib.request.Request(
+        f"{base_url}/upload", data=body,
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+    )
+    start = time.perf_counter()
+    urllib.request.urlopen(request, timeout=300).read()
+    return time.perf_counter() - start
+
+
+def get_homepage(base_url: str) -> float:
+    start = time.perf_counter()
+    urllib.request.urlopen(base_url, timeout=300).read()
+    return time.perf_counter() - start
+
+
+def run_mode(mode: str, uploads: int, payload: bytes) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, CELLSENSEI_GRADING_EXECUTOR=mode, CELLSENSEI_RESULT_CACHE="0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(base_url)
+        upload_times, homepage_times = [], []
+        uploads_done = threading.Event()
+
+        def upload():
+            upload_times.append(post_upload(base_url, payload))
+
+        threads = [threading.Thread(target=upload) for _ in range(uploads)]
+        for thread in threads:
+            thread.start()
+
+        def wait_for_uploads():
+            for thread in threads:
+                thread.join()
+            uploads_done.set()
+
+        threading.Thread(target=wait_for_uploads).start()
+        while not uploads_done.is_set():
+            homepage_times.append(get_homepage(base_url))
+            time.sleep(0.05)
+
+        return {"uploads": upload_times, "homepage": homepage_times}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summarize(label: str, samples: list) -> str:
+    if not samples:
+        return f"{label:>10}: no samples"
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return (f"{label:>10}: n={len(samples):3d}  p50={statistics.median(samples) * 1000:8.1f} ms  "
+            f"p95={p95 * 1000:8.1f} ms  max={max(samples) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=8, help="Concurrent uploads per mode")
+    parser.add_argument("--functions", type=int, default=1500, help="Functions in the generated submission")
+    parser.add_argument("--modes", nargs="+", default=["inline", "thread"], help="Grading executor modes to compare")
+    args = parser.parse_args()
+
+    payload = make_submission(args.functions)
+    for mode in args.modes:
+        results = run_mode(mode, args.uploads, payload)
+        print(f"[{mode}]")
+        print(summarize("homepage", results["homepage"]))
+        print(summarize("upload", results["uploads"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Runs a submission's analyzers as a small dependency graph.
+
+Each stage names the stages whose results it needs. Stages whose
+dependencies are met run together: those that mostly wait on a subprocess
+(Ruff, mypy) on a bounded thread pool shared by the worker process, and
+cheap or CPU-bound Python stages (the AST passes, formatting a tool's
+output) on the calling thread in the meantime. A submission with every
+check enabled then takes about as long as its slowest analyzer rather than
+the sum of all of them.
+
+A stage that finds the rest can't usefully run (code that doesn't parse)
+returns Halted, and every stage depending on it is skipped.
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Any, Callable, NamedTuple, Optional, Tuple
+
+import config
+
+
+class AnalysisStage(NamedTuple):
+    """One analyzer in the graph."""
+
+    name: str
+    # Called with {dependency name: its result}; returns this stage's result
+    run: Callable[[Dict[str, Any]], Any]
+    # Names of the stages whose results this one needs
+    after: Tuple[str, ...] = ()
+    # Run on the calling thread rather than the pool (cheap or CPU-bound Python)
+    inline: bool = False
+
+
+class Halted(NamedTuple):
+    """
+    Returned by a stage to stop the stages that depend on it, directly or not.
+
+    Each of them is skipped and gets this same value as its result.
+    """
+
+    stage: str
+    # Why the stage halted (e.g. the SyntaxError)
+    detail: Any = None
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def get_analysis_executor() -> ThreadPoolExecutor:
+    """
+    Get the thread pool analysis stages run on, creating it on first use.
+
+    Bounded by ANALYSIS_MAX_WORKERS across every submission this process
+    analyzes; a forked worker gets its own pool rather than its parent's.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=config.ANALYSIS_MAX_WORKERS,
+                thread_name_prefix="analysis"
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def run_stage_graph(stages: List[AnalysisStage], executor: Optional[ThreadPoolExecutor] = None) -> Dict[str, Any]:
+    """
+    Run analysis stages, each as soon as the stages it depends on have finished.
+
+    Args:
+        stages: The stages to run; dependencies must be among them
+        executor: Pool for stages that aren't inline; defaults to the shared
+            analysis pool. Stages run one after another on the caller when
+            ANALYSIS_MAX_WORKERS is 0
+
+    Returns:
+        Dictionary mapping each stage's name to its result (Halted for the
+        stages that were skipped)
+
+    Raises:
+        ValueError: If a stage depends on an unknown stage, or the dependencies form a cycle
+        Exception: Whatever a stage raised (stages are expected to report their own failures)
+    """
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        unknown = set(stage.after) - names
+        if unknown:
+            raise ValueError(f"Stage {stage.name} depends on unknown stages: {', '.join(sorted(unknown))}")
+
+    if executor is None and config.ANALYSIS_MAX_WORKERS > 0:
+        executor = get_analysis_executor()
+
+    results: Dict[str, Any] = {}
+    pending = list(stages)
+    running: Dict[Future, str] = {}
+    while pending or running:
+        ready = [stage for stage in pending if all(name in results for name in stage.after)]
+        if not ready and not running:
+            raise ValueError(f"Stages depend on each other in a cycle: {', '.join(stage.name for stage in pending)}")
+        for stage in ready:
+            pending.remove(stage)
+
+        # Start the pool's stages first, so they run while the inline ones do
+        inline = []
+        skipped = False
+        for stage in ready:
+            inputs = {name: results[name] for name in stage.after}
+            halted = next((result for result in inputs.values() if isinstance(result, Halted)), None)
+            if halted is not None:
+                results[stage.name] = halted
+                skipped = True
+            elif stage.inline or executor is None:
+                inline.append((stage, inputs))
+            else:
+                running[executor.submit(stage.run, inputs)] = stage.name
+        for stage, inputs in inline:
+            results[stage.name] = stage.run(inputs)
+        if inline or skipped:
+            # Their results may have made more stages ready
+            continue
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            results[running.pop(future)] = future.result()
+    return results
@@ -0,0 +1,320 @@
+import ast
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple, Callable, Iterable, Union
+
+# Security-related disallowed modules
+DISALLOWED_IMPORTS = {
+    "os", "subprocess", "shutil", "sys", "socket", "requests",
+    "urllib", "http", "ftplib", "telnetlib", "smtplib"
+}
+# Potentially dangerous built-in functions
+DISALLOWED_FUNCTIONS = {"eval", "exec", "__import__", "globals", "locals", "compile"}
+
+# Rule registry: option name -> node type -> handlers, plus per-option finalizers
+# that run once after the traversal (for rules that need a whole function body).
+_NODE_RULES: Dict[str, Dict[type, List[Callable]]] = {}
+_FINALIZERS: Dict[str, List[Callable]] = {}
+
+
+class AstFinding(NamedTuple):
+    """
+    One rule message, with where it was found.
+
+    `depth` and `position` place the reporting node in the breadth-first
+    traversal; `line` is the line the message refers to ("at line N").
+    """
+
+    depth: int
+    position: int
+    option: str
+    message: str
+    line: int
+
+    def shifted(self, line_offset: int) -> "AstFinding":
+        """Return the finding as if its code started `line_offset` lines further down."""
+        if not line_offset:
+            return self
+        line = self.line + line_offset
+        message = self.message.replace(f"at line {self.line}", f"at line {line}", 1)
+        return self._replace(message=message, line=line)
+
+
+class FunctionScope:
+    """Per-function state accumulated while the traversal is inside a FunctionDef."""
+
+    __slots__ = ("node", "depth", "position", "branch_count", "has_list_append_loop", "appended_var")
+
+    def __init__(self, node: ast.FunctionDef, depth: int, position: int):
+        self.node = node
+        self.depth = depth
+        self.position = position
+        self.branch_count = 0
+        self.has_list_append_loop = False
+        self.appended_var: Optional[str] = None
+
+
+class AstRuleContext:
+    """
+    State shared by all rule handlers during a single traversal.
+
+    Findings are stored with the traversal position of the node that produced
+    them so every option reports its messages in the same order ast.walk would.
+    """
+
+    def __init__(self, options: Iterable[str]):
+        self.options = list(options)
+        self.findings: List[AstFinding] = []
+        self.functions: List[FunctionScope] = []
+        self.scopes: Tuple[FunctionScope, ...] = ()
+        self.node: Optional[ast.AST] = None
+        self.depth = 0
+        self.position = 0
+
+    def report(self, option: str, message: str, scope: Optional[FunctionScope] = None) -> None:
+        """Record a finding for an option at the current node, or at a function's node."""
+        if scope is None:
+            finding = AstFinding(self.depth, self.position, option, message, getattr(self.node, "lineno", 0))
+        else:
+            finding = AstFinding(scope.depth, scope.position, option, message, scope.node.lineno)
+        self.findings.append(finding)
+
+    def ordered(self) -> List[Tuple[str, str]]:
+        """Return (option, message) pairs for all findings in traversal order."""
+        return [(finding.option, finding.message) for finding in sort_findings(self.findings)]
+
+    def results(self) -> Dict[str, List[str]]:
+        """Return the findings for each option ordered by node position."""
+        return findings_by_option(sort_findings(self.findings), self.options)
+
+
+def sort_findings(findings: Iterable[AstFinding]) -> List[AstFinding]:
+    """Sort findings into traversal order, keeping the report order of findings at the same node."""
+    return sorted(findings, key=lambda finding: (finding.depth, finding.position))
+
+
+def findings_by_option(findings: Iterable[AstFinding], options: Iterable[str]) -> Dict[str, List[str]]:
+    """Group already ordered findings into a message list per option."""
+    results: Dict[str, List[str]] = {option: [] for option in options}
+    for finding in findings:
+        results[finding.option].append(finding.message)
+    return results
+
+
+def ast_rule(option: str, *node_types: type) -> Callable:
+    """
+    Register a handler that is called for every node of the given types.
+
+    Args:
+        option: Analysis option that enables the rule (e.g. "security")
+        node_types: AST node classes the handler is dispatched on
+
+    Returns:
+        Decorator registering the handler
+    """
+    def decorator(handler: Callable) -> Callable:
+        by_type = _NODE_RULES.setdefault(option, {})
+        for node_type in node_types:
+            by_type.setdefault(node_type, []).append(handler)
+        return handler
+    return decorator
+
+
+def ast_rule_finalizer(option: str) -> Callable:
+    """Register a handler that is called once after the traversal completes."""
+    def decorator(handler: Callable) -> Callable:
+        _FINALIZERS.setdefault(option, []).append(handler)
+        return handler
+    return decorator
+
+
+def enabled_options(options: Iterable[str]) -> List[str]:
+    """Return the options that have at least one registered rule, in the given order."""
+    return [option for option in options if option in _NODE_RULES or option in _FINALIZERS]
+
+
+def traverse(tree: ast.AST, options: Iterable[str]) -> AstRuleContext:
+    """
+    Dispatch every node of a parsed tree to the rules of the enabled options.
+
+    Args:
+        tree: Parsed module
+        options: Names of the enabled options (e.g. "security", "style")
+
+    Returns:
+        The rule context holding all findings
+    """
+    enabled = enabled_options(options)
+    context = AstRuleContext(enabled)
+
+    # Build the dispatch table once for the enabled options
+    dispatch: Dict[type, List[Callable]] = {}
+    for option in enabled:
+        for node_type, handlers in _NODE_RULES.get(option, {}).items():
+            dispatch.setdefault(node_type, []).extend(handlers)
+
+    # Breadth-first like ast.walk, but carrying the enclosing function scopes
+    queue: deque = deque([(tree, (), 0)])
+    position = 0
+    while queue:
+        node, scopes, depth = queue.popleft()
+        context.node = node
+        context.depth = depth
+        context.position = position
+        context.scopes = scopes
+        position += 1
+
+        if isinstance(node, ast.FunctionDef):
+            scope = FunctionScope(node, depth, context.position)
+            context.functions.append(scope)
+            scopes = scopes + (scope,)
+
+        for handler in dispatch.get(type(node), ()):
+            handler(node, context)
+
+        for child in ast.iter_child_nodes(node):
+            queue.append((child, scopes, depth + 1))
+
+    for option in enabled:
+        for finalizer in _FINALIZERS.get(option, ()):
+            finalizer(context)
+
+    return context
+
+
+def run_ast_rules(source: Union[str, ast.AST], options: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Run every registered rule for the enabled options in a single traversal.
+
+    Args:
+        source: Python code as a string, or an already parsed tree
+        options: Names of the enabled options (e.g. "security", "style")
+
+    Returns:
+        Dictionary mapping each enabled option to its list of messages.
+        A SyntaxError in the code is reported once per enabled option.
+    """
+    options = list(options)
+    try:
+        tree = ast.parse(source) if isinstance(source, str) else source
+        return traverse(tree, options).results()
+    except SyntaxError as e:
+        return {option: [f"Syntax error in student code: {e}"] for option in options}
+    except Exception as e:
+        return {option: [f"Error during AST check: {str(e)}"] for option in options}
+
+
+# --- Security rules ---
+
+def _is_disallowed_module(name: str) -> bool:
+    return name in DISALLOWED_IMPORTS or any(name.startswith(f"{mod}.") for mod in DISALLOWED_IMPORTS)
+
+
+@ast_rule("security", ast.Import)
+def _check_import(node: ast.Import, context: AstRuleContext) -> None:
+    for alias in node.names:
+        if _is_disallowed_module(alias.name):
+            context.report("security", f"Security: Disallowed import found: '{alias.name}' at line {node.lineno}")
+
+
+@ast_rule("security", ast.ImportFrom)
+def _check_import_from(node: ast.ImportFrom, context: AstRuleContext) -> None:
+    if node.module and _is_disallowed_module(node.module):
+        context.report("security", f"Security: Disallowed import from found: '{node.module}' at line {node.lineno}")
+
+
+@ast_rule("security", ast.Call)
+def _check_disallowed_call(node: ast.Call, context: AstRuleContext) -> None:
+    if isinstance(node.func, ast.Name) and node.func.id in DISALLOWED_FUNCTIONS:
+        context.report("security", f"Security: Disallowed function call found: '{node.func.id}()' at line {node.lineno}")
+
+
+# --- Variable naming style rules ---
+
+@ast_rule("style", ast.Assign)
+def _check_variable_naming(node: ast.Assign, context: AstRuleContext) -> None:
+    for target in node.targets:
+        if isinstance(target, ast.Name):
+            if target.id.isupper() and len(target.id) > 1 and not target.id.startswith("_"):
+                context.report("style", f"Style: Variable '{target.id}' at line {node.lineno} is all uppercase. This style is typically reserved for constants.")
+            elif target.id.startswith("__") and not target.id.endswith("__"):
+                context.report("style", f"Style: Variable '{target.id}' at line {node.lineno} uses double underscore prefix, which is typically reserved for name mangling in classes.")
+
+
+# --- Common errors ---
+
+@ast_rule("errors", ast.FunctionDef)
+def _check_empty_function(node: ast.FunctionDef, context: AstRuleContext) -> None:
+    if not node.body:
+        context.report("errors", f"Error: Function '{node.name}' at line {node.lineno} has an empty body.")
+
+
+# --- Function definition style rules ---
+
+@ast_rule("docstrings", ast.FunctionDef)
+def _check_function_style(node: ast.FunctionDef, context: AstRuleContext) -> None:
+    # Check function name style (should be snake_case)
+    if not node.name.islower() and "_" not in node.name and not node.name.startswith("__"):
+        context.report("docstrings", f"Style: Function name '{node.name}' at line {node.lineno} should use snake_case naming convention.")
+
+    # Check for docstring
+    if not ast.get_docstring(node):
+        context.report("docstrings", f"Style: Function '{node.name}' at line {node.lineno} is missing a docstring.")
+
+    # Check argument names
+    for arg in node.args.args:
+        if not arg.arg.islower() and "_" not in arg.arg:
+            context.report("docstrings", f"Style: Argument '{arg.arg}' in function '{node.name}' at line {node.lineno} should use snake_case naming convention.")
+
+
+# --- Complexity rules ---
+
+@ast_rule("complexity", ast.If, ast.For, ast.While)
+def _count_branch(node: ast.AST, context: AstRuleContext) -> None:
+    # A branch counts towards every function it is nested in
+    for scope in context.scopes:
+        scope.branch_count += 1
+
+
+@ast_rule_finalizer("complexity")
+def _report_complexity(context: AstRuleContext) -> None:
+    for scope in context.functions:
+        name, lineno = scope.node.name, scope.node.lineno
+        if scope.branch_count > 10:
+            context.report("complexity", f"Complexity: Function '{name}' at line {lineno} has high complexity ({scope.branch_count} branches). Consider refactoring.", scope)
+        elif scope.branch_count > 5:
+            context.report("complexity", f"Complexity: Function '{name}' at line {lineno} has moderate complexity ({scope.branch_count} branches). Consider simplifying.", scope)
+
+
+# --- Best practice rules ---
+
+@ast_rule("best_practices", ast.Compare)
+def _check_singleton_comparison(node: ast.Compare, context: AstRuleContext) -> None:
+    # Check for 'is' vs '==' with None, True, False
+    if isinstance(node.ops[0], (ast.Eq, ast.NotEq)) and len(node.comparators) == 1:
+        if isinstance(node.comparators[0], ast.Constant):
+            if node.comparators[0].value is None:
+                context.report("best_practices", f"Best Practice: Use 'is None' instead of '== None' at line {node.lineno}")
+            elif node.comparators[0].value is True:
+                context.report("best_practices", f"Best Practice: Use 'is True' instead of '== True' at line {node.lineno}")
+            elif node.comparators[0].value is False:
+                context.report("best_practices", f"Best Practice: Use 'is False' instead of '== False' at line {node.lineno}")
+
+
+@ast_rule("best_practices", ast.For)
+def _track_append_loop(node: ast.For, context: AstRuleContext) -> None:
+    # Look for loops with list.append() inside each enclosing function
+    for stmt in node.body:
+        if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call):
+            if (isinstance(stmt.value.func, ast.Attribute) and
+                stmt.value.func.attr == 'append'):
+                appended_var = stmt.value.func.value.id if isinstance(stmt.value.func.value, ast.Name) else None
+                for scope in context.scopes:
+                    scope.has_list_append_loop = True
+                    scope.appended_var = appended_var
+
+
+@ast_rule_finalizer("best_practices")
+def _report_append_loops(context: AstRuleContext) -> None:
+    for scope in context.functions:
+        if scope.has_list_append_loop and scope.appended_var:
+            context.report("best_practices", f"Best Practice: Consider using a list comprehension instead of appending in a loop in function '{scope.node.name}' at line {scope.node.lineno}", scope)
@@ -0,0 +1,129 @@
+import ast
+from typing import Dict, List, Iterable, Optional
+
+from sensei_core.ast_rules import AstFinding, enabled_options, findings_by_option, run_ast_rules, traverse
+from sensei_core.result_cache import get_result_cache, make_cache_key, hash_code, normalize_code
+
+
+def cell_line_offsets(sources: List[str]) -> List[int]:
+    """
+    Find where each cell starts in the script made by joining the cells with newlines.
+
+    Args:
+        sources: Code cell sources, in notebook order
+
+    Returns:
+        For each cell, the number of script lines before its first line
+    """
+    offsets = []
+    offset = 0
+    for source in sources:
+        offsets.append(offset)
+        offset += normalize_code(source).count("\n") + 1
+    return offsets
+
+
+def analyze_cell(source: str, options: List[str]) -> Optional[List[AstFinding]]:
+    """
+    Run the AST rules on one cell on its own, reusing the findings of an identical cell.
+
+    Line numbers in the findings are relative to the cell. The findings are
+    cached by the cell's content alone, so a cell that hasn't changed keeps
+    its entry however the cells before it grow or shrink.
+
+    Args:
+        source: Code cell source
+        options: Enabled AST rule options (see ast_rules.enabled_options)
+
+    Returns:
+        The cell's findings, or None if the cell doesn't parse on its own
+    """
+    cache = get_result_cache()
+    if cache is not None:
+        cache_key = make_cache_key("cell_ast_rules", code=hash_code(source), options=options)
+        findings = cache.get(cache_key)
+        if findings is not None:
+            return findings
+
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+    findings = traverse(tree, options).findings
+
+    if cache is not None:
+        cache.set(cache_key, findings)
+    return findings
+
+
+def run_ast_rules_by_cell(sources: List[str], options: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Run the AST rules on a notebook cell by cell, so a resubmission only
+    re-analyzes the cells that changed.
+
+    Every AST rule looks at a single statement or function, so a cell's
+    findings depend on that cell alone. They are merged back into the order a
+    single traversal of the joined script would produce (breadth-first: by
+    depth, then cell, then position in the cell) with their line numbers moved
+    to the cell's place in the script. The result is the same as
+    run_ast_rules on the joined script.
+
+    Anything that only makes sense for the whole script (a cell that doesn't
+    parse on its own, a late __future__ import) falls back to a single run on
+    the joined script.
+
+    Args:
+        sources: Code cell sources, in notebook order
+        options: Names of the enabled options (e.g. "security", "style")
+
+    Returns:
+        Dictionary mapping each enabled option to its list of messages
+    """
+    options = list(options)
+    enabled = enabled_options(options)
+    if get_result_cache() is None or any("__future__" in source for source in sources[1:]):
+        return run_ast_rules("\n".join(sources), options)
+
+    merged = []
+    for cell_number, (source, offset) in enumerate(zip(sources, cell_line_offsets(sources))):
+        try:
+            findings = analyze_cell(source, enabled)
+        except Exception:
+            findings = None
+        if findings is None:
+            return run_ast_rules("\n".join(sources), options)
+        merged.extend(((finding.depth, cell_number, finding.position), finding.shifted(offset)) for finding in findings)
+
+    merged.sort(key=lambda item: item[0])
+    return findings_by_option((finding for _, finding in merged), enabled)
+
+
+def run_ast_rules_on_parsing_cells(sources: List[str], options: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Run the AST rules on the cells of a notebook whose code doesn't parse as a whole.
+
+    Cells that don't parse on their own are blanked out, keeping their line
+    count, so the findings in the other cells keep their line numbers.
+
+    Args:
+        sources: Code cell sources, in notebook order
+        options: Names of the enabled options (e.g. "security", "style")
+
+    Returns:
+        Dictionary mapping each enabled option to its list of messages, or an
+        empty dictionary if the remaining cells still don't parse together
+    """
+    parsing_sources = []
+    for source in sources:
+        try:
+            ast.parse(source)
+            parsing_sources.append(source)
+        except SyntaxError:
+            parsing_sources.append("\n" * source.count("\n"))
+
+    try:
+        ast.parse("\n".join(parsing_sources))
+    except SyntaxError:
+        # An error that spans cells (an unclosed bracket, say)
+        return {}
+    return run_ast_rules_by_cell(parsing_sources, options)
@@ -0,0 +1,314 @@
+"""
+Compares the value a tested function returned with a test case's expected value.
+
+A test case picks how its values are compared with an optional "compare"
+entry in the assignment YAML, either a comparator name or a mapping:
+
+    compare:
+      method: auto        # Comparator to use (see register_comparator); default "auto"
+      rel_tol: 1.0e-6     # Allowed difference relative to the expected value
+      abs_tol: 1.0e-9     # Allowed absolute difference
+      ordered: false      # Compare lists and 1-D arrays as multisets
+      equal_nan: true     # NaN matches NaN
+
+The "auto" comparator walks lists, tuples and dicts, compares numbers with
+tolerance and compares numeric lists, NumPy arrays and pandas objects as
+whole arrays with NumPy, so a large output costs one vectorized pass.
+"""
+import math
+import numbers
+import reprlib
+from collections.abc import Mapping
+from typing import Dict, List, Any, Callable, NamedTuple, Optional
+
+# Tolerances used when a test case doesn't set its own
+DEFAULT_REL_TOL = 1e-9
+DEFAULT_ABS_TOL = 0.0
+# Lists of at least this many numbers are compared as one array
+VECTORIZE_MIN_LENGTH = 16
+
+# Types compared with plain ==, without looking any further
+_EXACT_TYPES = frozenset({int, str, bytes, type(None)})
+# NumPy dtype kinds compared with tolerance, and those compared exactly
+_NUMERIC_KINDS = "biufc"
+_INTEGER_KINDS = "biu"
+
+_COMPARATORS: Dict[str, Callable[[Any, Any, "CompareOptions"], Optional[str]]] = {}
+
+
+class CompareOptions(NamedTuple):
+    """How a test case compares values (see the module docstring)."""
+
+    method: str = "auto"
+    rel_tol: float = DEFAULT_REL_TOL
+    abs_tol: float = DEFAULT_ABS_TOL
+    ordered: bool = True
+    equal_nan: bool = True
+
+
+def register_comparator(name: str) -> Callable:
+    """
+    Register a comparator a test case can select with `compare: {method: name}`.
+
+    A comparator is called as comparator(actual, expected, options) and
+    returns None when the values match, or a short description of the
+    difference.
+
+    Args:
+        name: Name test cases refer to the comparator by
+
+    Returns:
+        Decorator registering the comparator
+    """
+    def decorator(comparator: Callable) -> Callable:
+        _COMPARATORS[name] = comparator
+        return comparator
+    return decorator
+
+
+def parse_compare_options(spec: Any) -> CompareOptions:
+    """
+    Read a test case's "compare" entry.
+
+    Args:
+        spec: None, a comparator name or a mapping of CompareOptions fields
+
+    Returns:
+        The options, with defaults for anything not set
+
+    Raises:
+        ValueError: If the entry names an unknown comparator or option
+    """
+    if spec is None:
+        options = CompareOptions()
+    elif isinstance(spec, str):
+        options = CompareOptions(method=spec)
+    elif isinstance(spec, Mapping):
+        unknown = set(spec) - set(CompareOptions._fields)
+        if unknown:
+            raise ValueError(f"Unknown compare options: {', '.join(sorted(unknown))}")
+        options = CompareOptions(**spec)
+        options = options._replace(rel_tol=float(options.rel_tol), abs_tol=float(options.abs_tol))
+    else:
+        raise ValueError(f"Invalid compare entry: {spec!r}")
+
+    if options.method not in _COMPARATORS:
+        raise ValueError(f"Unknown comparator: {options.method}")
+    return options
+
+
+def compare_values(actual: Any, expected: Any, spec: Any = None) -> Optional[str]:
+    """
+    Compare a function's return value with the expected value.
+
+    Args:
+        actual: Value the function returned
+        expected: Expected value from the test case
+        spec: The test case's "compare" entry, if any
+
+    Returns:
+        None if the values match, otherwise a short description of the first
+        difference found (which doesn't reveal the expected value)
+    """
+    options = parse_compare_options(spec)
+    return _COMPARATORS[options.method](actual, expected, options)
+
+
+def _where(path: List[Any]) -> str:
+    return " at " + "".join(f"[{step!r}]" for step in path) if path else ""
+
+
+def _wrong_value(actual: Any, path: List[Any]) -> str:
+    return f"Wrong value{_where(path)}: got {reprlib.repr(actual)}"
+
+
+def _is_real(value: Any) -> bool:
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def _is_array_like(value: Any) -> bool:
+    """NumPy arrays and pandas objects, recognized without importing either."""
+    package = type(value).__module__.partition(".")[0]
+    return (package == "numpy" and hasattr(value, "shape")) or (package == "pandas" and hasattr(value, "to_numpy"))
+
+
+def _close(actual: float, expected: float, options: CompareOptions) -> bool:
+    # Same rule as numpy.isclose, so numbers compare alike inside and outside arrays
+    if math.isnan(actual) or math.isnan(expected):
+        return options.equal_nan and math.isnan(actual) and math.isnan(expected)
+    if math.isinf(actual) or math.isinf(expected):
+        return actual == expected
+    return abs(actual - expected) <= options.abs_tol + options.rel_tol * abs(expected)
+
+
+def _numeric_array(values: Any):
+    """Convert to a NumPy array if the values are all numbers (and evenly nested), else return None."""
+    import numpy as np
+
+    try:
+        array = np.asarray(values)
+    except (ValueError, TypeError):
+        return None
+    return array if array.dtype.kind in _NUMERIC_KINDS else None
+
+
+def _compare_arrays(actual: Any, expected: Any, options: CompareOptions, path: List[Any]) -> Optional[str]:
+    """Compare array-likes by shape and then element by element in one vectorized pass."""
+    import numpy as np
+
+    if type(actual).__module__.startswith("pandas"):
+        if isinstance(expected, Mapping) and hasattr(actual, "columns"):
+            # A DataFrame against {column: values}: the columns, then each column's values
+            columns = [str(column) for column in actual.columns]
+            if sorted(columns) != sorted(str(key) for key in expected):
+                return f"Wrong columns{_where(path)}: got {reprlib.repr(columns)}"
+            by_name = dict(zip(columns, actual.columns))
+            for key, values in expected.items():
+                mismatch = _compare(actual[by_name[str(key)]].to_numpy(), values, options, path + [key])
+                if mismatch is not None:
+                    return mismatch
+            return None
+        actual = actual.to_numpy()
+    if type(expected).__module__.startswith("pandas"):
+        expected = expected.to_numpy()
+
+    try:
+        actual_array = np.asarray(actual)
+        expected_array = np.asarray(expected)
+    except (ValueError, TypeError):
+        # Ragged nesting has no array form; compare it as nested lists
+        actual_list = actual.tolist() if hasattr(actual, "tolist") else actual
+        expected_list = expected.tolist() if hasattr(expected, "tolist") else expected
+        return _compare_sequences(actual_list, expected_list, options, path)
+
+    numeric = actual_array.dtype.kind in _NUMERIC_KINDS and expected_array.dtype.kind in _NUMERIC_KINDS
+    if not options.ordered:
+        if not (numeric and actual_array.ndim == 1 and expected_array.ndim == 1):
+            return _compare_sequences(actual_array.tolist(), expected_array.tolist(), options, path)
+        actual_array, expected_array = np.sort(actual_array), np.sort(expected_array)
+
+    if actual_array.shape != expected_array.shape:
+        return f"Wrong shape{_where(path)}: got {actual_array.shape}, expected {expected_array.shape}"
+    if not numeric:
+        # Strings, objects and mixed contents are compared item by item
+        return _compare_sequences(actual_array.tolist(), expected_array.tolist(), options, path)
+
+    if actual_array.dtype.kind in _INTEGER_KINDS and expected_array.dtype.kind in _INTEGER_KINDS:
+        matches = actual_array == expected_array
+    else:
+        matches = np.isclose(
+            actual_array, expected_array,
+            rtol=options.rel_tol, atol=options.abs_tol, equal_nan=options.equal_nan
+        )
+    if matches.all():
+        return None
+    if not options.ordered:
+        return f"Wrong values{_where(path)}"
+    first = tuple(int(index) for index in np.argwhere(~matches)[0])
+    return _wrong_value(actual_array[first].item(), path + list(first))
+
+
+def _compare_sequences(actual: Any, expected: Any, options: CompareOptions, path: List[Any]) -> Optional[str]:
+    if not isinstance(actual, (list, tuple)):
+        return _wrong_value(actual, path)
+    if len(actual) != len(expected):
+        return f"Wrong length{_where(path)}: got {len(actual)} items, expected {len(expected)}"
+
+    if len(expected) >= VECTORIZE_MIN_LENGTH:
+        # NumPy's conversion tells whether both hold only numbers (nested evenly) faster than checking each item
+        expected_array = _numeric_array(expected)
+        actual_array = _numeric_array(actual) if expected_array is not None else None
+        if actual_array is not None:
+            return _compare_arrays(actual_array, expected_array, options, path)
+
+    if not options.ordered:
+        try:
+            actual, expected = sorted(actual), sorted(expected)
+        except TypeError:
+            return _compare_unordered(actual, expected, options, path)
+
+    for index, (actual_item, expected_item) in enumerate(zip(actual, expected)):
+        mismatch = _compare(actual_item, expected_item, options, path + [index])
+        if mismatch is not None:
+            return mismatch
+    return None
+
+
+def _compare_unordered(actual: List[Any], expected: List[Any], options: CompareOptions, path: List[Any]) -> Optional[str]:
+    """Match items that can't be sorted (dicts, mixed types) pairwise, each actual item used once."""
+    remaining = list(actual)
+    for expected_item in expected:
+        for index, actual_item in enumerate(remaining):
+            if _compare(actual_item, expected_item, options, []) is None:
+                del remaining[index]
+                break
+        else:
+            return f"Wrong values{_where(path)}"
+    return None
+
+
+def _compare(actual: Any, expected: Any, options: CompareOptions, path: List[Any]) -> Optional[str]:
+    if type(expected) is bool:
+        try:
+            return None if bool(actual) == expected else _wrong_value(actual, path)
+        except ValueError as e:
+            # NumPy arrays of more than one element have no truth value
+            return f"Wrong value{_where(path)}: {e}"
+
+    # Fast path for ints, strings and None
+    if type(expected) in _EXACT_TYPES and type(actual) in _EXACT_TYPES:
+        return None if actual == expected else _wrong_value(actual, path)
+
+    if _is_real(actual) and _is_real(expected):
+        if isinstance(actual, numbers.Integral) and isinstance(expected, numbers.Integral):
+            matches = actual == expected
+        else:
+            matches = _close(float(actual), float(expected), options)
+        return None if matches else _wrong_value(actual, path)
+
+    if _is_array_like(actual) or _is_array_like(expected):
+        return _compare_arrays(actual, expected, options, path)
+
+    # YAML has no tuples, so a list and a tuple with the same items match
+    if isinstance(expected, (list, tuple)):
+        return _compare_sequences(actual, expected, options, path)
+
+    if isinstance(expected, Mapping):
+        if not isinstance(actual, Mapping):
+            return _wrong_value(actual, path)
+        missing = [key for key in expected if key not in actual]
+        if missing:
+            return f"Missing key{_where(path)}: {missing[0]!r}"
+        extra = [key for key in actual if key not in expected]
+        if extra:
+            return f"Unexpected key{_where(path)}: {extra[0]!r}"
+        for key, expected_value in expected.items():
+            mismatch = _compare(actual[key], expected_value, options, path + [key])
+            if mismatch is not None:
+                return mismatch
+        return None
+
+    return _compare_exact(actual, expected, options, path)
+
+
+@register_comparator("auto")
+def compare_auto(actual: Any, expected: Any, options: CompareOptions) -> Optional[str]:
+    """Compare containers item by item, numbers with tolerance and numeric arrays with NumPy."""
+    return _compare(actual, expected, options, [])
+
+
+@register_comparator("exact")
+def compare_exact(actual: Any, expected: Any, options: CompareOptions) -> Optional[str]:
+    """Compare with ==, as Python does."""
+    return _compare_exact(actual, expected, options, [])
+
+
+def _compare_exact(actual: Any, expected: Any, options: CompareOptions, path: List[Any]) -> Optional[str]:
+    try:
+        matches = actual == expected
+        # == on arrays is elementwise
+        if _is_array_like(matches):
+            matches = matches.all()
+        return None if bool(matches) else _wrong_value(actual, path)
+    except Exception as e:
+        return f"Could not compare the value{_where(path)}: {e}"
@@ -0,0 +1,269 @@
+import math
+import random
+import string
+import time
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+# Candidate complexity classes, simplest first
+COMPLEXITY_CLASSES = ["O(1)", "O(log n)", "O(n)", "O(n log n)", "O(n^2)", "O(n^3)", "O(2^n)"]
+
+# Input sizes used when a scaling test doesn't list its own
+DEFAULT_SIZES = {
+    "int": [8, 10, 12, 14, 16, 18, 20],
+    "list": [250, 500, 1000, 2000, 4000, 8000],
+    "sorted_list": [250, 500, 1000, 2000, 4000, 8000],
+    "string": [250, 500, 1000, 2000, 4000, 8000],
+}
+
+# A class is preferred over a more complex one whose fit is less than this much better
+FIT_TOLERANCE = 1.25
+# Timings that grow less than this across all sizes are treated as O(1)
+FLAT_GROWTH = 1.2
+# Each timed batch of calls should take at least this long so timer noise doesn't dominate
+MIN_BATCH_SECONDS = 0.001
+MAX_BATCH_CALLS = 1000
+# Minimum number of sizes needed to fit a class
+MIN_SIZES = 3
+
+
+def normalize_complexity_class(name: str) -> str:
+    """Normalize spellings such as "O(n²)", "o(N^2)" and "O(n*log n)" to "o(n^2)"."""
+    name = name.replace("²", "^2").replace("³", "^3").replace("ⁿ", "^n").replace("*", "")
+    return "".join(name.split()).lower()
+
+
+def _class_index(name: str) -> Optional[int]:
+    normalized = normalize_complexity_class(name)
+    for index, complexity_class in enumerate(COMPLEXITY_CLASSES):
+        if normalize_complexity_class(complexity_class) == normalized:
+            return index
+    return None
+
+
+def generate_input(kind: str, size: int, rng: random.Random) -> Any:
+    """
+    Generate one input of the given kind and size for a scaling test.
+
+    Args:
+        kind: "int" (the size itself), "list", "sorted_list" or "string"
+        size: Input size n
+        rng: Random number generator, seeded so runs are repeatable
+
+    Returns:
+        The generated input
+    """
+    if kind == "int":
+        return size
+    if kind == "list":
+        return [rng.randint(-10 * size, 10 * size) for _ in range(size)]
+    if kind == "sorted_list":
+        return sorted(rng.randint(-10 * size, 10 * size) for _ in range(size))
+    if kind == "string":
+        return "".join(rng.choice(string.ascii_lowercase) for _ in range(size))
+    raise ValueError(f"Unknown scaling test input kind: {kind}")
+
+
+def _time_calls(function: Callable, value: Any, number: int, copy_input: bool) -> float:
+    # Copies are made before the clock starts so in-place mutation can't leak between calls
+    if copy_input:
+        arguments = [list(value) for _ in range(number)]
+    else:
+        arguments = [value] * number
+    start = time.perf_counter()
+    for argument in arguments:
+        function(argument)
+    return time.perf_counter() - start
+
+
+def _mutates_input(function: Callable, value: Any) -> bool:
+    """Call the function once on a copy of a list input and report whether it changed it."""
+    if not isinstance(value, list):
+        return False
+    argument = list(value)
+    function(argument)
+    return argument != value
+
+
+def measure_runtimes(
+    function: Callable,
+    kind: str,
+    sizes: List[int],
+    repeats: int = 5,
+    time_budget: Optional[float] = None,
+    seed: int = 0
+) -> Tuple[List[int], List[float]]:
+    """
+    Time a function over increasing input sizes.
+
+    Each size is timed `repeats` times and the fastest per-call time is kept.
+    Measuring stops early when the next size would likely overrun `time_budget`.
+
+    Args:
+        function: Function taking a single input
+        kind: Input kind (see generate_input)
+        sizes: Input sizes, measured in increasing order
+        repeats: Timed batches per size
+        time_budget: Seconds available for all measurements, if limited
+        seed: Seed for the input generator
+
+    Returns:
+        The sizes that were measured and their per-call times in seconds
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    measured_sizes: List[int] = []
+    seconds: List[float] = []
+    last_cost = 0.0
+    growth = 1.0
+
+    for size in sorted(sizes):
+        spent = time.perf_counter() - started
+        if time_budget is not None and spent + last_cost * growth > 0.8 * time_budget:
+            break
+
+        size_started = time.perf_counter()
+        value = generate_input(kind, size, rng)
+
+        # Calibrate how many calls make up one timed batch
+        copy_input = _mutates_input(function, value)
+        single_call = _time_calls(function, value, 1, copy_input)
+        number = max(1, min(MAX_BATCH_CALLS, math.ceil(MIN_BATCH_SECONDS / max(single_call, 1e-9))))
+        best = single_call
+        for _ in range(repeats):
+            best = min(best, _time_calls(function, value, number, copy_input) / number)
+
+        cost = time.perf_counter() - size_started
+        if last_cost > 0:
+            growth = max(1.0, cost / last_cost)
+        last_cost = cost
+
+        measured_sizes.append(size)
+        seconds.append(best)
+
+    return measured_sizes, seconds
+
+
+def fit_complexity(sizes: List[int], seconds: List[float]) -> Tuple[str, Dict[str, float]]:
+    """
+    Find the complexity class that best explains measured runtimes.
+
+    Every class is fitted at once as t = a + b * g(n) by least squares on
+    relative error, so small and large sizes count equally. The simplest class
+    whose residual is within FIT_TOLERANCE of the best one is chosen.
+
+    Args:
+        sizes: Input sizes
+        seconds: Runtime per call for each size
+
+    Returns:
+        The fitted class and the residual of every class
+    """
+    import numpy as np
+
+    n = np.asarray(sizes, dtype=float)
+    t = np.maximum(np.asarray(seconds, dtype=float), 1e-12)
+
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        growth = np.vstack([
+            np.zeros_like(n),
+            np.log2(n),
+            n,
+            n * np.log2(n),
+            n ** 2,
+            n ** 3,
+            np.exp2(n),
+        ])
+        # Scale each class to [0, 1] over the measured sizes to keep the fit well conditioned
+        scale = growth.max(axis=1, keepdims=True)
+        growth = growth / np.where(scale > 0, scale, 1.0)
+
+        # Weighted least squares for a and b per class, with weights 1 / t
+        w = 1.0 / t
+        x = growth * w
+        s00 = np.sum(w * w)
+        s01 = np.sum(w * x, axis=1)
+        s11 = np.sum(x * x, axis=1)
+        y0 = np.sum(w)
+        y1 = np.sum(x, axis=1)
+        det = s00 * s11 - s01 ** 2
+        b = np.where(det > 0, (s00 * y1 - s01 * y0) / det, 0.0)
+        b = np.where(np.isfinite(b) & (b > 0), b, 0.0)
+        a = (y0 - b * s01) / s00
+        residuals = np.sum((1.0 - a[:, None] * w - b[:, None] * x) ** 2, axis=1)
+        residuals = np.where(np.isfinite(residuals), residuals, np.inf)
+
+    residual_by_class = dict(zip(COMPLEXITY_CLASSES, residuals.tolist()))
+    if t.max() < FLAT_GROWTH * t.min():
+        return COMPLEXITY_CLASSES[0], residual_by_class
+
+    acceptable = residuals <= residuals.min() * FIT_TOLERANCE + 1e-12
+    return COMPLEXITY_CLASSES[int(np.argmax(acceptable))], residual_by_class
+
+
+def run_scaling_test(
+    function: Callable,
+    test_case: Dict[str, Any],
+    time_budget: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Run a scaling test: measure how a function's runtime grows and grade it
+    against a target complexity class.
+
+    Args:
+        function: The callable function to test
+        test_case: Scaling test from the assignment configuration, with "target"
+            and optionally "input", "sizes", "repeats" and "seed"
+        time_budget: Seconds available for measuring, if limited
+
+    Returns:
+        Dictionary with test results; "actual" is the fitted class and
+        "timings" the measured sizes and per-call seconds
+    """
+    target = test_case.get("target", "O(n)")
+    kind = test_case.get("input", "list")
+    result = {
+        "test_id": test_case.get("test_id", "unknown"),
+        "description": test_case.get("description", ""),
+        "passed": False,
+        "status": "error",
+        "points": test_case.get("points", 0),
+        "error": None,
+        "actual": None,
+        "elapsed": 0.0,
+        "timings": None
+    }
+
+    target_index = _class_index(target)
+    if target_index is None:
+        result["error"] = f"Unknown target complexity class: {target}"
+        return result
+
+    start = time.perf_counter()
+    try:
+        sizes, seconds = measure_runtimes(
+            function,
+            kind,
+            test_case.get("sizes") or DEFAULT_SIZES.get(kind, DEFAULT_SIZES["list"]),
+            repeats=test_case.get("repeats", 5),
+            time_budget=time_budget,
+            seed=test_case.get("seed", 0)
+        )
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+    finally:
+        result["elapsed"] = time.perf_counter() - start
+
+    result["timings"] = {"sizes": sizes, "seconds": seconds}
+    if len(sizes) < MIN_SIZES:
+        result["status"] = "timed_out"
+        result["error"] = f"Too slow to measure: only {len(sizes)} input sizes finished within the time limit"
+        return result
+
+    fitted, _ = fit_complexity(sizes, seconds)
+    result["actual"] = fitted
+    result["passed"] = COMPLEXITY_CLASSES.index(fitted) <= target_index
+    result["status"] = "passed" if result["passed"] else "failed"
+    if not result["passed"]:
+        result["error"] = f"Runtime grows like {fitted}; expected {target} or better"
+    return result
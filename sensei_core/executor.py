@@ -0,0 +1,66 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+import config
+from sensei_core.load_shedding import get_load_monitor
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+
+def get_grading_executor() -> Optional[Executor]:
+    """
+    Get the executor that grading work runs on, creating it on first use.
+
+    Returns:
+        A thread or process pool bounded by GRADING_MAX_WORKERS, or None when
+        GRADING_EXECUTOR is "inline" (grading runs directly on the caller)
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if config.GRADING_EXECUTOR == "process":
+                _executor = ProcessPoolExecutor(max_workers=config.GRADING_MAX_WORKERS)
+            elif config.GRADING_EXECUTOR == "thread":
+                _executor = ThreadPoolExecutor(
+                    max_workers=config.GRADING_MAX_WORKERS,
+                    thread_name_prefix="grading"
+                )
+        return _executor
+
+
+async def run_grading_job(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Run blocking grading work without stalling the event loop.
+
+    Args:
+        func: Function to run; must be a picklable top-level function when the
+            process executor is configured. It is also passed `backlogged`,
+            whether the queue was over DEGRADE_QUEUE_DEPTH when the job was
+            admitted, since a process-pool worker can't see the queue itself
+        args: Positional arguments for func
+        kwargs: Keyword arguments for func
+
+    Returns:
+        Whatever func returns
+    """
+    executor = get_grading_executor()
+    # Counted from the moment it is queued, so analysis can go partial under load
+    with get_load_monitor().admitted() as backlogged:
+        kwargs = {**kwargs, "backlogged": backlogged}
+        if executor is None:
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_grading_executor() -> None:
+    """Shut down the grading executor, waiting for running jobs to finish."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
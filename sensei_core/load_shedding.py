@@ -0,0 +1,149 @@
+"""
+Load-adaptive analysis: fast core feedback while the server is overloaded.
+
+The load monitor tracks how many grading jobs this process has admitted and
+not yet finished (the queue depth) and a moving average of how long static
+analysis takes. Above DEGRADE_QUEUE_DEPTH or DEGRADE_LATENCY_SECONDS, static
+analysis runs without the checks in DEFERRABLE_CHECKS, and the full analysis
+is handed to a background thread that runs it once the load has fallen
+below both thresholds. Its results go to the result cache, so submitting
+the same code again then gets the full report straight away.
+
+Grading jobs are counted where they are admitted (run_grading_job, in the
+web process), and whether the queue was over its threshold is decided there
+and passed along with the job, since a process-pool worker never sees the
+queue. Latency is measured where analysis runs. Celery tasks aren't
+admitted by the web process, so on Celery workers only the latency
+threshold applies. The average decays while no analysis finishes, so a
+server that has gone quiet stops counting as overloaded.
+"""
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+import config as settings
+
+# Weight of the newest analysis in the latency average
+LATENCY_SMOOTHING = 0.2
+# Seconds without a finished analysis after which the latency average has halved
+LATENCY_HALF_LIFE_SECONDS = 30.0
+# Seconds between load checks while deferred work waits
+DEFERRED_POLL_SECONDS = 5.0
+
+
+class LoadMonitor:
+    """Queue depth and recent analysis latency of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.latency = 0.0
+        self._latency_time = time.monotonic()
+
+    @contextmanager
+    def admitted(self) -> Iterator[bool]:
+        """
+        Count a grading job, from the moment it is queued until it finishes.
+
+        Yields:
+            Whether the queue, counting this job, is over DEGRADE_QUEUE_DEPTH
+        """
+        with self._lock:
+            self.queue_depth += 1
+            queue_depth = self.queue_depth
+        try:
+            yield settings.DEGRADE_QUEUE_DEPTH > 0 and queue_depth > settings.DEGRADE_QUEUE_DEPTH
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+
+    def record_latency(self, seconds: float) -> None:
+        """Add the duration of one analysis to the moving average."""
+        with self._lock:
+            latency = self._decayed_latency()
+            self.latency = latency + LATENCY_SMOOTHING * (seconds - latency)
+            self._latency_time = time.monotonic()
+
+    def current_latency(self) -> float:
+        """The latency average, decayed by the time since the last analysis finished."""
+        with self._lock:
+            return self._decayed_latency()
+
+    def _decayed_latency(self) -> float:
+        idle = time.monotonic() - self._latency_time
+        return self.latency * 0.5 ** (idle / LATENCY_HALF_LIFE_SECONDS)
+
+    def under_pressure(self) -> bool:
+        """Whether the queue depth or the analysis latency is over its threshold (0 disables one)."""
+        with self._lock:
+            queue_depth, latency = self.queue_depth, self._decayed_latency()
+        return (
+            (settings.DEGRADE_QUEUE_DEPTH > 0 and queue_depth > settings.DEGRADE_QUEUE_DEPTH)
+            or (settings.DEGRADE_LATENCY_SECONDS > 0 and latency > settings.DEGRADE_LATENCY_SECONDS)
+        )
+
+
+_monitor: Optional[LoadMonitor] = None
+_monitor_pid: Optional[int] = None
+_monitor_lock = threading.Lock()
+
+
+def get_load_monitor() -> LoadMonitor:
+    """
+    Get this process's load monitor, creating it on first use.
+
+    A forked worker gets its own monitor rather than a copy of its parent's counts.
+    """
+    global _monitor, _monitor_pid
+    with _monitor_lock:
+        if _monitor is None or _monitor_pid != os.getpid():
+            _monitor = LoadMonitor()
+            _monitor_pid = os.getpid()
+        return _monitor
+
+
+_deferred: "Optional[queue.Queue[Any]]" = None
+_deferred_pid: Optional[int] = None
+_deferred_lock = threading.Lock()
+
+
+def _deferred_loop(work: "queue.Queue[Any]") -> None:
+    while True:
+        func, args = work.get()
+        while get_load_monitor().under_pressure():
+            time.sleep(DEFERRED_POLL_SECONDS)
+        try:
+            func(*args)
+        except Exception as e:
+            print(f"Warning: Deferred analysis failed: {e}")
+
+
+def defer_until_idle(func: Callable, *args: Any) -> bool:
+    """
+    Run `func(*args)` on a background thread once the load has fallen.
+
+    Deferred work runs one item at a time, in the order it was deferred.
+
+    Args:
+        func: Function to run
+        args: Positional arguments for func
+
+    Returns:
+        True if the work was queued, False if DEFERRED_ANALYSIS_MAX items are
+        already waiting (the work is then dropped)
+    """
+    global _deferred, _deferred_pid
+    with _deferred_lock:
+        if _deferred is None or _deferred_pid != os.getpid():
+            _deferred = queue.Queue(maxsize=settings.DEFERRED_ANALYSIS_MAX)
+            _deferred_pid = os.getpid()
+            threading.Thread(target=_deferred_loop, args=(_deferred,), name="deferred-analysis", daemon=True).start()
+        work = _deferred
+    try:
+        work.put_nowait((func, args))
+    except queue.Full:
+        return False
+    return True
@@ -0,0 +1,315 @@
+import ast
+import builtins
+import copy
+import hashlib
+import marshal
+from typing import Dict, List, Iterable, NamedTuple, Optional, Set, Tuple
+
+from sensei_core.result_cache import get_result_cache, make_cache_key, hash_code
+
+# Filename compiled slices report in tracebacks, matching the linters' name for the student's code
+SLICE_FILENAME = "student_code.py"
+
+_BUILTIN_NAMES = frozenset(dir(builtins))
+
+# Match statements arrived in Python 3.10; on 3.9 there are no such nodes to look for
+_MATCH_CAPTURES = tuple(getattr(ast, name) for name in ("MatchAs", "MatchStar") if hasattr(ast, name))
+_MATCH_MAPPING = getattr(ast, "MatchMapping", ())
+
+# Bumped when slicing changes, so slices and fingerprints cached by an older version aren't reused
+SLICE_VERSION = 2
+
+
+def _argument_names(arguments: ast.arguments) -> Set[str]:
+    every_arg = arguments.posonlyargs + arguments.args + arguments.kwonlyargs
+    every_arg += [arg for arg in (arguments.vararg, arguments.kwarg) if arg is not None]
+    return {arg.arg for arg in every_arg}
+
+
+def _argument_expressions(arguments: ast.arguments) -> List[ast.AST]:
+    """Defaults and annotations of a signature, which are evaluated in the enclosing scope."""
+    every_arg = arguments.posonlyargs + arguments.args + arguments.kwonlyargs
+    every_arg += [arg for arg in (arguments.vararg, arguments.kwarg) if arg is not None]
+    expressions = list(arguments.defaults) + [default for default in arguments.kw_defaults if default is not None]
+    return expressions + [arg.annotation for arg in every_arg if arg.annotation is not None]
+
+
+def _scope_names(nodes: Iterable[ast.AST]) -> Tuple[Set[str], Set[str], Set[str], List[ast.AST]]:
+    """
+    Collect the names one scope binds and reads directly.
+
+    Nested functions, lambdas and classes are not entered, only their parts
+    that run in this scope (decorators, defaults, bases). Comprehensions are
+    treated as part of the scope, which at worst reads a name too many.
+
+    Returns:
+        Names bound, names read, names declared global or nonlocal, and the nested scopes
+    """
+    bound: Set[str] = set()
+    read: Set[str] = set()
+    declared: Set[str] = set()
+    nested: List[ast.AST] = []
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            bound.add(node.name)
+            stack.extend(node.decorator_list + _argument_expressions(node.args))
+            if node.returns is not None:
+                stack.append(node.returns)
+            nested.append(node)
+            continue
+        if isinstance(node, ast.ClassDef):
+            bound.add(node.name)
+            stack.extend(node.decorator_list + node.bases + [keyword.value for keyword in node.keywords])
+            nested.append(node)
+            continue
+        if isinstance(node, ast.Lambda):
+            stack.extend(_argument_expressions(node.args))
+            nested.append(node)
+            continue
+
+        if isinstance(node, ast.Name):
+            (read if isinstance(node.ctx, ast.Load) else bound).add(node.id)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name != "*":
+                    bound.add(alias.asname or alias.name.split(".")[0])
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            declared.update(node.names)
+        elif isinstance(node, (ast.ExceptHandler,) + _MATCH_CAPTURES) and node.name:
+            bound.add(node.name)
+        elif isinstance(node, _MATCH_MAPPING) and node.rest:
+            bound.add(node.rest)
+        stack.extend(ast.iter_child_nodes(node))
+    return bound, read, declared, nested
+
+
+def _root_name(node: ast.AST) -> Optional[str]:
+    """The variable at the base of an attribute, subscript or call chain (`data` in `data.rows[0].x`)."""
+    while isinstance(node, (ast.Attribute, ast.Subscript, ast.Call, ast.Starred)):
+        node = node.func if isinstance(node, ast.Call) else node.value
+    return node.id if isinstance(node, ast.Name) else None
+
+
+def _mutated_names(statement: ast.stmt) -> Set[str]:
+    """
+    Names a statement may change in place without rebinding them.
+
+    These are the names whose item or attribute it assigns or deletes
+    (`memo[0] = 0`, `obj.attr = v`) and those it calls a method on
+    (`data.append(x)`, `df.dropna(inplace=True)`). Function and lambda bodies
+    are not entered, since they don't run here; class bodies are.
+    """
+    mutated: Set[str] = set()
+    stack: List[ast.AST] = [statement]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            stack.extend(node.decorator_list + _argument_expressions(node.args))
+            continue
+        if isinstance(node, ast.Lambda):
+            stack.extend(_argument_expressions(node.args))
+            continue
+        target = None
+        if isinstance(node, (ast.Attribute, ast.Subscript)) and not isinstance(node.ctx, ast.Load):
+            target = node.value
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            target = node.func.value
+        if target is not None:
+            name = _root_name(target)
+            if name is not None:
+                mutated.add(name)
+        stack.extend(ast.iter_child_nodes(node))
+    return mutated
+
+
+def free_names(scope: ast.AST) -> Set[str]:
+    """
+    Names a function, lambda or class reads from outside itself.
+
+    Args:
+        scope: FunctionDef, AsyncFunctionDef, Lambda or ClassDef node
+
+    Returns:
+        Names looked up in enclosing scopes (module globals and builtins included)
+    """
+    if isinstance(scope, ast.Lambda):
+        body, parameters = [scope.body], _argument_names(scope.args)
+    elif isinstance(scope, ast.ClassDef):
+        body, parameters = scope.body, set()
+    else:
+        body, parameters = scope.body, _argument_names(scope.args)
+
+    bound, read, declared, nested = _scope_names(body)
+    local = (bound | parameters) - declared
+    free = read - local
+    for inner in nested:
+        inner_free = free_names(inner)
+        # Methods don't see the class body's names; nested functions do see their function's
+        free |= inner_free if isinstance(scope, ast.ClassDef) else inner_free - local
+    return free
+
+
+class NameGraph:
+    """
+    Which module-level statements bind which names, and which names each one needs.
+
+    A statement that changes a name in place (`data.append(x)`, `memo[0] = 0`)
+    counts as binding it too, so a slice that keeps the name keeps what was
+    done to it. Built once per submission; `dependencies` then finds the
+    statements a set of names transitively depends on.
+    """
+
+    def __init__(self, tree: ast.Module):
+        self.statements = tree.body
+        self.binders: Dict[str, List[int]] = {}
+        self.needs: List[Set[str]] = []
+        self.star_imports: List[int] = []
+        self.future_imports: List[int] = []
+
+        for index, statement in enumerate(self.statements):
+            bound, read, _, nested = _scope_names([statement])
+            for inner in nested:
+                read |= free_names(inner)
+            self.needs.append(read)
+            for name in bound | _mutated_names(statement):
+                self.binders.setdefault(name, []).append(index)
+            if isinstance(statement, ast.ImportFrom):
+                if statement.module == "__future__":
+                    self.future_imports.append(index)
+                elif any(alias.name == "*" for alias in statement.names):
+                    self.star_imports.append(index)
+
+    def dependencies(self, names: Iterable[str]) -> List[int]:
+        """
+        Find the statements that bind `names` and, transitively, everything they read.
+
+        A name can be bound by several statements (a constant reassigned in a
+        later cell, say); all of them are kept so the slice ends in the same
+        state as running the whole notebook. Star imports are kept when some
+        needed name isn't bound anywhere else, and __future__ imports always.
+
+        Args:
+            names: Names the code to run will look up at module level
+
+        Returns:
+            Indices of the needed statements, in module order
+        """
+        selected: Set[int] = set(self.future_imports)
+        seen: Set[str] = set()
+        pending = list(names)
+        unresolved = False
+        while pending:
+            name = pending.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            binders = self.binders.get(name)
+            if not binders:
+                unresolved = unresolved or name not in _BUILTIN_NAMES
+                continue
+            for index in binders:
+                if index not in selected:
+                    selected.add(index)
+                    pending.extend(self.needs[index] - seen)
+
+        if unresolved:
+            selected.update(self.star_imports)
+        return sorted(selected)
+
+
+def _strip_docstrings(statements: List[ast.stmt]) -> List[ast.stmt]:
+    """Copy statements without the docstrings of the functions and classes in them."""
+    copies = [copy.deepcopy(statement) for statement in statements]
+    for statement in copies:
+        for node in ast.walk(statement):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and ast.get_docstring(node) is not None:
+                # Keep the body valid if the docstring was all there was
+                node.body = node.body[1:] or [ast.Pass()]
+    return copies
+
+
+def normalized_fingerprint(statements: List[ast.stmt]) -> str:
+    """
+    Hash code by its syntax tree alone.
+
+    Formatting, comments, docstrings and positions in the file don't change
+    the fingerprint, so trivially different copies of a function share it.
+
+    Args:
+        statements: Parsed statements (left unchanged)
+
+    Returns:
+        SHA-256 hex digest of the normalized statements
+    """
+    normalized = "\n".join(ast.dump(statement) for statement in _strip_docstrings(statements))
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class ModuleSlice(NamedTuple):
+    """The part of a submission that tested functions depend on, compiled."""
+
+    # Marshalled code object (code objects can't be pickled, but marshal round-trips them
+    # between processes running the same interpreter, as the sandbox workers do)
+    code: bytes
+    # Per tested function, the normalized fingerprint of the function and of
+    # the statements it depends on: equal fingerprints behave the same under test
+    function_fingerprints: Dict[str, str]
+
+
+def build_module_slice(code_string: str, function_sources: Dict[str, str]) -> Optional[ModuleSlice]:
+    """
+    Compile the module-level code a submission's tested functions depend on.
+
+    Imports, helper functions, classes and constants the functions use
+    (directly or through each other) are kept, in notebook order; plotting,
+    data loading and anything else they don't reference is left out. The
+    functions themselves are compiled from `function_sources` after the slice
+    is run, so nested functions and methods can be tested too.
+
+    Cached by the code's content and the tested functions.
+
+    Args:
+        code_string: The submission's extracted code
+        function_sources: Source of each function to be tested, by name
+
+    Returns:
+        The compiled slice, or None if the code doesn't compile
+    """
+    cache = get_result_cache()
+    if cache is not None:
+        cache_key = make_cache_key(
+            "module_slice",
+            version=SLICE_VERSION,
+            code=hash_code(code_string),
+            functions={name: hash_code(source) for name, source in function_sources.items()}
+        )
+        cached_slice = cache.get(cache_key)
+        if cached_slice is not None:
+            return cached_slice
+
+    try:
+        graph = NameGraph(ast.parse(code_string))
+        function_fingerprints = {}
+        needed: Set[str] = set()
+        for name, source in function_sources.items():
+            function_nodes = ast.parse(source).body
+            function_needs = {name}
+            for node in function_nodes:
+                function_needs |= free_names(node)
+            needed |= function_needs
+            dependencies = [graph.statements[index] for index in graph.dependencies(function_needs)]
+            function_fingerprints[name] = normalized_fingerprint(function_nodes + dependencies)
+
+        statements = [graph.statements[index] for index in graph.dependencies(needed)]
+        # Notebooks may use top-level await, which parses but doesn't compile as a module
+        code = compile(ast.Module(body=statements, type_ignores=[]), SLICE_FILENAME, "exec", dont_inherit=True)
+    except SyntaxError:
+        return None
+
+    module_slice = ModuleSlice(code=marshal.dumps(code), function_fingerprints=function_fingerprints)
+
+    if cache is not None:
+        cache.set(cache_key, module_slice)
+    return module_slice
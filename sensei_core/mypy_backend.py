@@ -0,0 +1,180 @@
+import atexit
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import config
+
+# Flags every daemon is started with (kept identical so they can share a cache)
+MYPY_FLAGS = ["--ignore-missing-imports"]
+
+# File name each daemon checks; errors are reported against it directly
+STUDENT_FILENAME = "student_code.py"
+
+# Root for the shared incremental cache
+MYPY_BASE_DIR = Path(tempfile.gettempdir()) / "cellsensei_mypy"
+# Root for daemon working directories, where each check writes the student's code
+MYPY_WORK_DIR = Path(config.TOOL_SCRATCH_DIR) / "cellsensei_mypy"
+
+
+class MypyDaemonError(Exception):
+    """Raised when a dmypy daemon cannot be reached or started."""
+
+
+class MypyCheckTimeout(MypyDaemonError):
+    """Raised when a daemon doesn't finish checking a submission in time."""
+
+
+class MypyDaemon:
+    """
+    A long-lived dmypy server that type-checks one submission at a time.
+
+    Every check overwrites the same file in the daemon's working directory, so
+    the daemon only re-analyzes the student's code; builtins and stubs stay
+    loaded between submissions.
+    """
+
+    def __init__(self, work_dir: Path, cache_dir: Path, timeout: float = 10):
+        self.work_dir = work_dir
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.status_file = str(work_dir / "dmypy.json")
+        self.checks = 0
+
+    def start(self) -> None:
+        """Start the daemon, replacing any previous instance."""
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.kill()
+        result = subprocess.run(
+            ["dmypy", "--status-file", self.status_file, "start", "--",
+             *MYPY_FLAGS, "--cache-dir", str(self.cache_dir)],
+            cwd=self.work_dir,
+            capture_output=True,
+            text=True,
+            timeout=30
+        )
+        if result.returncode != 0:
+            raise MypyDaemonError(result.stderr.strip() or result.stdout.strip() or "dmypy failed to start")
+
+    def kill(self) -> None:
+        """Kill the daemon if it is running."""
+        if os.path.exists(self.status_file):
+            subprocess.run(
+                ["dmypy", "--status-file", self.status_file, "kill"],
+                cwd=self.work_dir,
+                capture_output=True,
+                timeout=10
+            )
+            # A killed daemon may linger as a zombie, which makes dmypy think it is alive
+            if os.path.exists(self.status_file):
+                os.remove(self.status_file)
+
+    def check(self, code_string: str) -> Dict[str, Any]:
+        """
+        Type-check code, restarting the daemon once if it has crashed.
+
+        A check that times out isn't retried: the same code would most likely
+        time out again. The daemon, which may still be busy with it, is killed
+        and started afresh by the next check.
+
+        Args:
+            code_string: The Python code to check
+
+        Returns:
+            The daemon response with "out", "err" and "status" keys
+
+        Raises:
+            MypyCheckTimeout: If the check took longer than the daemon's timeout
+            MypyDaemonError: If the daemon can't be restarted or fails again
+        """
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        student_file = self.work_dir / STUDENT_FILENAME
+        student_file.write_text(code_string, encoding="utf-8")
+        # Give every check a distinct mtime so the daemon never misses a change
+        self.checks += 1
+        os.utime(student_file, (self.checks, self.checks))
+
+        try:
+            return self._request_check()
+        except MypyCheckTimeout:
+            self.kill()
+            raise
+        except MypyDaemonError:
+            self.start()
+            return self._request_check()
+
+    def _request_check(self) -> Dict[str, Any]:
+        from mypy.dmypy.client import request, BadStatus
+
+        try:
+            response = request(
+                self.status_file, "check",
+                timeout=self.timeout,
+                files=[STUDENT_FILENAME],
+                export_types=False,
+                is_tty=False,
+                terminal_width=80
+            )
+        except BadStatus as e:
+            raise MypyDaemonError(str(e))
+        if "error" in response:
+            # The client reports its own timeout as an error response, like a dead daemon
+            if response["error"] == "timed out":
+                raise MypyCheckTimeout(f"Type checking took longer than {self.timeout} seconds")
+            raise MypyDaemonError(response["error"])
+        return response
+
+
+class MypyDaemonPool:
+    """A fixed-size pool of warm daemons sharing one incremental cache."""
+
+    def __init__(self, size: int, base_dir: Path = MYPY_BASE_DIR, work_dir: Path = MYPY_WORK_DIR, timeout: float = 10):
+        self.pid = os.getpid()
+        self.cache_dir = base_dir / "cache"
+        self.daemons: List[MypyDaemon] = [
+            MypyDaemon(work_dir / f"daemon_{self.pid}_{index}", self.cache_dir, timeout)
+            for index in range(max(1, size))
+        ]
+        self._idle: "queue.Queue[MypyDaemon]" = queue.Queue()
+        for daemon in self.daemons:
+            self._idle.put(daemon)
+
+    def check(self, code_string: str) -> Dict[str, Any]:
+        """Type-check code on the next idle daemon."""
+        daemon = self._idle.get()
+        try:
+            return daemon.check(code_string)
+        finally:
+            self._idle.put(daemon)
+
+    def shutdown(self) -> None:
+        """Stop every daemon and remove its working directory."""
+        for daemon in self.daemons:
+            try:
+                daemon.kill()
+            except Exception as e:
+                print(f"Warning: Could not stop mypy daemon in {daemon.work_dir}: {e}")
+            shutil.rmtree(daemon.work_dir, ignore_errors=True)
+
+
+_pool: Optional[MypyDaemonPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_daemon_pool() -> MypyDaemonPool:
+    """
+    Get the daemon pool for this worker process, creating it on first use.
+
+    A forked worker gets its own pool rather than sharing its parent's daemons.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = MypyDaemonPool(config.MYPY_DAEMON_POOL_SIZE)
+            atexit.register(_pool.shutdown)
+        return _pool
@@ -1,14 +1,193 @@
-import nbformat
 import ast
 import re
 import os
-import inspect
-import importlib.util
-import sys
 import yaml
-import types
+import time
+import marshal
+from bisect import bisect_right
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple, Callable, Union
+from typing import Dict, List, Any, BinaryIO, Optional, Tuple, Callable, ContextManager, Type, Union
+
+import config as settings
+from sensei_core.comparison import compare_values
+from sensei_core.notebook_reader import read_code_cells, read_code_cells_from_path
+from sensei_core.module_slice import build_module_slice
+from sensei_core.result_cache import get_result_cache, make_cache_key, hash_code, hash_config
+from sensei_core.test_runner import run_function_tests_in_sandbox
+from sensei_core.value_capture import capture_value
+
+# Outcomes of a single test: "timed_out" means it ran past its time limit,
+# "skipped" that a pytest test was skipped or expected to fail
+TEST_STATUSES = ["passed", "failed", "error", "timed_out", "skipped"]
+
+# Line breaks as Python's tokenizer counts them (unlike str.splitlines, which also splits on form feeds)
+_LINE_BREAK = re.compile(r"\r\n|\r|\n")
+
+class SourceMap:
+    """
+    Line index of extracted code, and the notebook cell each line came from.
+    
+    Built once per submission: slicing lines and locating a line in its cell
+    are then constant-time lookups instead of re-splitting the whole code.
+    """
+    
+    def __init__(self, code: str, cells: Optional[List[Tuple[int, str]]] = None):
+        """
+        Args:
+            code: The extracted code
+            cells: (cell index, source) of the code cells that, joined with
+                newlines, make up `code`; None for a plain Python file
+        """
+        self.code = code
+        # Offset in `code` of the first character of each line
+        self.line_starts = [0] + [match.end() for match in _LINE_BREAK.finditer(code)]
+        # Cell index and line within the cell of each line, for notebooks
+        self.line_cells: List[int] = []
+        self.cell_lines: List[int] = []
+        
+        if cells:
+            cell_offset = 0
+            for position, (cell_index, source) in enumerate(cells):
+                first_line = bisect_right(self.line_starts, cell_offset)
+                cell_offset += len(source) + 1
+                last_line = bisect_right(self.line_starts, cell_offset - 1) if position + 1 < len(cells) else len(self.line_starts)
+                self.line_cells.extend([cell_index] * (last_line - first_line + 1))
+                self.cell_lines.extend(range(1, last_line - first_line + 2))
+    
+    def line_span(self, first_line: int, last_line: int) -> Tuple[int, int]:
+        """Return the offsets of lines `first_line` to `last_line` (1-based, inclusive) without the final line break."""
+        start = self.line_starts[first_line - 1]
+        if last_line >= len(self.line_starts):
+            return start, len(self.code)
+        end = self.line_starts[last_line]
+        end -= 2 if self.code.startswith("\r\n", end - 2) else 1
+        return start, end
+    
+    def slice_lines(self, first_line: int, last_line: int) -> str:
+        """Return lines `first_line` to `last_line` (1-based, inclusive) without the final line break."""
+        start, end = self.line_span(first_line, last_line)
+        return self.code[start:end]
+    
+    def locate(self, line: int) -> Optional[Tuple[int, int]]:
+        """
+        Map a line of the extracted code to its notebook cell.
+        
+        Args:
+            line: 1-based line number in the extracted code
+            
+        Returns:
+            (cell index, 1-based line within the cell), or None for a plain
+            Python file or a line outside the code
+        """
+        if 1 <= line <= len(self.line_cells):
+            return self.line_cells[line - 1], self.cell_lines[line - 1]
+        return None
+    
+    def describe(self, line: int) -> Optional[str]:
+        """Describe where a line of the extracted code is in the notebook, e.g. "cell 3, line 2"."""
+        location = self.locate(line)
+        if location is None:
+            return None
+        cell_index, cell_line = location
+        return f"cell {cell_index + 1}, line {cell_line}"
+
+class FunctionRecord:
+    """
+    A function found in student code.
+    
+    Records are immutable and small: instead of copies of the function's text
+    they keep offsets into the code they were found in, which all records of
+    a submission share. `source` (the function as ast.unparse writes it) is
+    only computed when the function is tested, and then only once.
+    """
+    
+    __slots__ = ("name", "args", "defaults", "line_number", "docstring", "_code", "_start", "_body_start", "_end", "_source")
+    
+    def __init__(
+        self,
+        name: str,
+        args: Tuple[str, ...],
+        defaults: Tuple[Optional[str], ...],
+        line_number: int,
+        docstring: Optional[str],
+        code: str,
+        start: int,
+        body_start: int,
+        end: int
+    ):
+        """
+        Args:
+            name: Function name
+            args: Names of the positional arguments
+            defaults: Default value of each argument as source code, or None
+            line_number: Line of the `def` in the code
+            docstring: The function's docstring, if any
+            code: The code the function was found in
+            start: Offset in `code` of the function's first line, decorators included
+            body_start: Offset in `code` of the `def` line
+            end: Offset in `code` just past the function's last line
+        """
+        for attribute, value in (
+            ("name", name), ("args", args), ("defaults", defaults), ("line_number", line_number),
+            ("docstring", docstring), ("_code", code), ("_start", start), ("_body_start", body_start),
+            ("_end", end), ("_source", None)
+        ):
+            object.__setattr__(self, attribute, value)
+    
+    def __setattr__(self, attribute, value):
+        raise AttributeError(f"FunctionRecord is immutable; cannot set {attribute!r}")
+    
+    def __reduce__(self):
+        # The lazily computed source is left out; pickling the records of one
+        # submission together stores the shared code once
+        return (FunctionRecord, (
+            self.name, self.args, self.defaults, self.line_number, self.docstring,
+            self._code, self._start, self._body_start, self._end
+        ))
+    
+    def __repr__(self) -> str:
+        return f"FunctionRecord({self.name!r}, line {self.line_number})"
+    
+    @property
+    def code(self) -> str:
+        """The code the function was found in."""
+        return self._code
+    
+    @property
+    def body(self) -> str:
+        """The function's lines as written, from the `def` line on."""
+        return self._code[self._body_start:self._end]
+    
+    @property
+    def source(self) -> str:
+        """The function as ast.unparse writes it (decorators included), computed on first use."""
+        if self._source is None:
+            text = self._code[self._start:self._end]
+            if text[:1].isspace():
+                # A nested function or method: parse it inside a block at its own indentation
+                node = ast.parse("if True:\n" + text).body[0].body[0]
+            else:
+                node = ast.parse(text).body[0]
+            object.__setattr__(self, "_source", ast.unparse(node))
+        return self._source
+
+def extract_code_cells_from_notebook(notebook_path) -> Optional[List[Tuple[int, str]]]:
+    """
+    Extract the code cells of a Jupyter notebook.
+    
+    Args:
+        notebook_path: Path to the notebook file (str or Path object)
+        
+    Returns:
+        List of (cell index, source) in notebook order, where indices count
+        all cells, or None if extraction fails
+    """
+    try:
+        # Streams the file and skips cell outputs (plots, HTML tables) without loading them
+        return read_code_cells_from_path(notebook_path)
+    except Exception as e:
+        print(f"Error reading or parsing notebook {notebook_path}: {e}")
+        return None
 
 def extract_code_from_notebook(notebook_path) -> Optional[str]:
     """
@@ -20,72 +199,99 @@ def extract_code_from_notebook(notebook_path) -> Optional[str]:
     Returns:
         A string containing all code cells joined with newlines, or None if extraction fails
     """
-    try:
-        with open(notebook_path, 'r', encoding='utf-8') as f:
-            nb_content = nbformat.read(f, as_version=4)
+    code_cells = extract_code_cells_from_notebook(notebook_path)
+    return "\n".join(source for _, source in code_cells) if code_cells is not None else None
+
+def extract_code_cells_from_upload(stream: BinaryIO, filename: str) -> Optional[List[Tuple[int, str]]]:
+    """
+    Extract the code of an uploaded file straight from its stream, without saving it first.
+    
+    Args:
+        stream: Seekable binary stream of the notebook or Python file
+        filename: Name of the uploaded file, used to tell the two apart
         
-        all_code = []
-        for cell in nb_content.cells:
-            if cell.cell_type == 'code':
-                all_code.append(cell.source)
-        return "\n".join(all_code)
+    Returns:
+        List of (cell index, source) for a notebook's code cells, or a single
+        (0, code) entry for a Python file; None if extraction fails
+    """
+    try:
+        if filename.endswith('.ipynb'):
+            # Streamed, so cell outputs are skipped without being loaded
+            return read_code_cells(stream)
+        return [(0, stream.read().decode('utf-8'))]
     except Exception as e:
-        print(f"Error reading or parsing notebook {notebook_path}: {e}")
+        print(f"Error reading uploaded file {filename}: {e}")
         return None
 
-def extract_functions_from_code(code_string: str) -> Dict[str, Dict[str, Any]]:
+def extract_code_cells_from_file(file_path) -> Optional[List[Tuple[int, str]]]:
+    """
+    Extract the code of a notebook or Python file on disk (see extract_code_cells_from_upload).
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            return extract_code_cells_from_upload(f, str(file_path))
+    except OSError as e:
+        print(f"Error reading file {file_path}: {e}")
+        return None
+
+def extract_functions_from_code(code_string: str) -> Dict[str, FunctionRecord]:
     """
     Extract Python function definitions from code string.
+    Results are cached by the code's content hash, so the function scan done
+    before upload is reused when the submission is graded.
     
     Args:
         code_string: Python code as a string
         
     Returns:
-        Dictionary mapping function names to their details (args, body, etc.)
+        Dictionary mapping function names to their records
     """
+    cache = get_result_cache()
+    if cache is not None:
+        cache_key = make_cache_key("function_records", code=hash_code(code_string))
+        cached_functions = cache.get(cache_key)
+        if cached_functions is not None:
+            return cached_functions
+    
+    functions = _extract_functions_from_code(code_string)
+    
+    if cache is not None:
+        cache.set(cache_key, functions)
+    return functions
+
+def _extract_functions_from_code(code_string: str) -> Dict[str, FunctionRecord]:
     functions = {}
     
     try:
         tree = ast.parse(code_string)
+        source_map = SourceMap(code_string)
         
         for node in ast.walk(tree):
             if isinstance(node, ast.FunctionDef):
-                # Get function name
-                func_name = node.name
-                
                 # Get function arguments
-                args = []
-                defaults = []
-                
-                # Process arguments
-                for arg in node.args.args:
-                    args.append(arg.arg)
+                args = tuple(arg.arg for arg in node.args.args)
                 
                 # Process default values for arguments
-                if node.args.defaults:
-                    num_defaults = len(node.args.defaults)
-                    num_args = len(node.args.args)
-                    defaults = [None] * (num_args - num_defaults) + [ast.unparse(default) for default in node.args.defaults]
-                else:
-                    defaults = [None] * len(args)
-                
-                # Get function body as source code
-                func_body_lines = code_string.splitlines()[node.lineno-1:node.end_lineno]
-                func_body = "\n".join(func_body_lines)
+                defaults = (None,) * (len(args) - len(node.args.defaults)) + tuple(
+                    ast.unparse(default) for default in node.args.defaults
+                )
                 
-                # Get function source code
-                func_source = ast.unparse(node)
+                # Locate the function in the code; its source is unparsed from there when needed
+                first_line = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+                start, end = source_map.line_span(first_line, node.end_lineno)
+                body_start = source_map.line_starts[node.lineno - 1]
                 
-                # Store function details
-                functions[func_name] = {
-                    "name": func_name,
-                    "args": args,
-                    "defaults": defaults,
-                    "line_number": node.lineno,
-                    "body": func_body,
-                    "source": func_source,
-                    "docstring": ast.get_docstring(node)
-                }
+                functions[node.name] = FunctionRecord(
+                    name=node.name,
+                    args=args,
+                    defaults=defaults,
+                    line_number=node.lineno,
+                    docstring=ast.get_docstring(node),
+                    code=code_string,
+                    start=start,
+                    body_start=body_start,
+                    end=end
+                )
     except SyntaxError as e:
         print(f"Syntax error in student code: {e}")
     except Exception as e:
@@ -93,7 +299,7 @@ def extract_functions_from_code(code_string: str) -> Dict[str, Dict[str, Any]]:
     
     return functions
 
-def extract_functions_from_notebook(notebook_path) -> Dict[str, Dict[str, Any]]:
+def extract_functions_from_notebook(notebook_path) -> Dict[str, FunctionRecord]:
     """
     Extract all function definitions from a Jupyter notebook.
     
@@ -101,7 +307,7 @@ def extract_functions_from_notebook(notebook_path) -> Dict[str, Dict[str, Any]]:
         notebook_path: Path to the notebook file
         
     Returns:
-        Dictionary mapping function names to their details
+        Dictionary mapping function names to their records
     """
     code = extract_code_from_notebook(notebook_path)
     if code is None:
@@ -109,7 +315,7 @@ def extract_functions_from_notebook(notebook_path) -> Dict[str, Dict[str, Any]]:
     
     return extract_functions_from_code(code)
 
-def extract_functions_from_file(file_path) -> Dict[str, Dict[str, Any]]:
+def extract_functions_from_file(file_path) -> Dict[str, FunctionRecord]:
     """
     Extract all function definitions from a Python file or notebook.
     
@@ -117,7 +323,7 @@ def extract_functions_from_file(file_path) -> Dict[str, Dict[str, Any]]:
         file_path: Path to the file (str or Path object)
         
     Returns:
-        Dictionary mapping function names to their details
+        Dictionary mapping function names to their records
     """
     file_path_str = str(file_path)
     
@@ -131,13 +337,15 @@ def extract_functions_from_file(file_path) -> Dict[str, Dict[str, Any]]:
         print(f"Unsupported file type: {file_path}")
         return {}
 
-def compile_function(function_source: str, function_name: str) -> Optional[Callable]:
+def compile_function(function_source: str, function_name: str, module_code: Optional[bytes] = None) -> Optional[Callable]:
     """
     Compile a function from its source code and return the callable.
     
     Args:
         function_source: Source code of the function
         function_name: Name of the function
+        module_code: Marshalled code of the module-level statements the
+            function depends on (see module_slice.build_module_slice), run first
         
     Returns:
         Callable function object or None if compilation fails
@@ -146,6 +354,10 @@ def compile_function(function_source: str, function_name: str) -> Optional[Calla
         # Create a module-like namespace
         namespace = {}
         
+        # Imports, helpers and constants the function uses
+        if module_code is not None:
+            exec(marshal.loads(module_code), namespace)
+        
         # Compile and execute the function code in the namespace
         exec(function_source, namespace)
         
@@ -204,15 +416,20 @@ def run_function_test(function: Callable, test_case: Dict[str, Any]) -> Dict[str
         test_case: Dictionary containing test case details
         
     Returns:
-        Dictionary with test results
+        Dictionary with test results; "status" is one of TEST_STATUSES,
+        "error" says what differed when a test fails, "actual" is the
+        captured return value and "elapsed" is the time the function call
+        took in seconds
     """
     result = {
         "test_id": test_case.get("test_id", "unknown"),
         "description": test_case.get("description", ""),
         "passed": False,
+        "status": "error",
         "points": test_case.get("points", 0),
         "error": None,
-        "actual": None
+        "actual": None,
+        "elapsed": 0.0
     }
     
     try:
@@ -221,110 +438,74 @@ def run_function_test(function: Callable, test_case: Dict[str, Any]) -> Dict[str
         expected = test_case.get("expected")
         
         # Convert inputs to the right format
-        if isinstance(inputs, list):
-            actual = function(*inputs)
-        else:
-            actual = function(inputs)
+        start = time.perf_counter()
+        try:
+            if isinstance(inputs, list):
+                actual = function(*inputs)
+            else:
+                actual = function(inputs)
+        finally:
+            result["elapsed"] = time.perf_counter() - start
+        
+        # Large or unusual return values are kept as a bounded summary (see value_capture)
+        result["actual"] = capture_value(actual)
         
-        result["actual"] = actual
+        # Compare with expected result, as the test case's "compare" entry says (see comparison.py)
+        mismatch = compare_values(actual, expected, test_case.get("compare"))
+        result["passed"] = mismatch is None
+        result["error"] = mismatch
         
-        # Compare with expected result
-        if isinstance(expected, bool):
-            # Special handling for boolean comparisons
-            result["passed"] = bool(actual) == expected
-        elif isinstance(actual, float) and isinstance(expected, (int, float)):
-            # Special handling for floating point comparisons
-            import math
-            result["passed"] = math.isclose(actual, expected, rel_tol=1e-9)
-        else:
-            # Standard equality check
-            result["passed"] = actual == expected
+        result["status"] = "passed" if result["passed"] else "failed"
             
     except Exception as e:
         result["error"] = str(e)
     
     return result
 
-def run_pytest_tests(function: Callable, pytest_file: str, function_name: str) -> List[Dict[str, Any]]:
+def run_pytest_tests(
+    function: Callable,
+    pytest_file: str,
+    function_name: str,
+    call_limit: Optional[Callable[[], ContextManager[Any]]] = None,
+    limit_error: Type[BaseException] = TimeoutError
+) -> List[Dict[str, Any]]:
     """
     Run pytest tests for a function.
     
+    The pytest file is collected and run by real pytest (see pytest_backend),
+    in a fresh module of its own with the student's function bound to
+    `function_name`, so nothing is shared between submissions.
+    
     Args:
         function: The callable function to test
-        pytest_file: Path to the pytest file
+        pytest_file: Path to the pytest file, relative to assignment_defs
         function_name: Name of the function
+        call_limit: Returns the context manager each test's call runs in (its time limit)
+        limit_error: Exception that context manager raises when a test runs too long
         
     Returns:
         List of test results
     """
-    import pytest
-    from _pytest.runner import runtestprotocol
-    
-    results = []
-    
-    try:
-        # Create a temporary module with the function
-        module_name = f"student_module_{function_name}"
-        module = types.ModuleType(module_name)
-        setattr(module, function_name, function)
-        sys.modules[module_name] = module
-        
-        # Also set the function in the global namespace for the pytest file
-        globals()[function_name] = function
-        
-        # Run the pytest file
-        pytest_path = Path(__file__).parent.parent / "assignment_defs" / pytest_file
-        
-        if not pytest_path.exists():
-            return [{"test_id": "pytest_error", "description": f"Pytest file {pytest_file} not found", "passed": False}]
-        
-        # Import the pytest file
-        spec = importlib.util.spec_from_file_location("test_module", pytest_path)
-        test_module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(test_module)
-        
-        # Run the tests
-        for name, obj in inspect.getmembers(test_module):
-            if name.startswith("test_") and inspect.isfunction(obj):
-                # Create a test result
-                test_result = {
-                    "test_id": name,
-                    "description": obj.__doc__ or name,
-                    "passed": False,
-                    "error": None
-                }
-                
-                try:
-                    # Run the test
-                    obj()
-                    test_result["passed"] = True
-                except Exception as e:
-                    test_result["error"] = str(e)
-                
-                results.append(test_result)
-        
-    except Exception as e:
-        results.append({
-            "test_id": "pytest_setup_error",
-            "description": "Error setting up pytest",
-            "passed": False,
-            "error": str(e)
-        })
-    
-    # Clean up
-    if module_name in sys.modules:
-        del sys.modules[module_name]
-    if function_name in globals():
-        del globals()[function_name]
+    # Imported here so only sandbox workers load pytest
+    from sensei_core.pytest_backend import run_pytest_file
     
-    return results
+    return run_pytest_file(pytest_file, {function_name: function}, call_limit, limit_error)
 
 def test_extracted_functions(
-    functions: Dict[str, Dict[str, Any]], 
+    functions: Dict[str, FunctionRecord], 
     config: Dict[str, Any]
 ) -> Dict[str, List[Dict[str, Any]]]:
     """
     Test extracted functions against test cases defined in a configuration.
+    Each function runs with the module-level code it depends on (imports,
+    helpers, constants), compiled once for all of them.
+    
+    Results are stored per function, keyed by the function's normalized
+    fingerprint (see module_slice.normalized_fingerprint, which covers the
+    code it depends on) and its test configuration. Students whose
+    implementations differ only in formatting, comments or docstrings share
+    one sandbox run. Runtime-scaling tests are timed afresh for every
+    submission.
     
     Args:
         functions: Dictionary of extracted functions
@@ -333,10 +514,94 @@ def test_extracted_functions(
     Returns:
         Dictionary mapping function names to test results
     """
+    tested_configs = {
+        func_config.get("name"): func_config
+        for func_config in config.get("functions", [])
+        if func_config.get("name") in functions
+    }
+    if not tested_configs:
+        return {}
+    module_slice = build_module_slice(
+        next(iter(functions.values())).code,
+        {func_name: functions[func_name].source for func_name in tested_configs}
+    )
+    
+    cache = get_result_cache()
+    cache_keys = {}
+    results = {}
+    if cache is not None and module_slice is not None:
+        settings_config = config.get("settings", {})
+        for func_name, func_config in tested_configs.items():
+            # Version 2 entries leave out scaling-test results and use slices that keep in-place changes
+            cache_keys[func_name] = make_cache_key(
+                "function_test_results",
+                version=2,
+                function=module_slice.function_fingerprints[func_name],
+                config=hash_config({"settings": settings_config, "functions": [func_config]})
+            )
+            cached_results = cache.get(cache_keys[func_name])
+            if cached_results is not None:
+                results[func_name] = cached_results
+    
+    # Runtime-scaling results depend on how busy the server was when they were
+    # measured, so they aren't shared: a function found in the cache still has
+    # its scaling tests run
+    job_configs = []
+    for func_name, func_config in tested_configs.items():
+        if func_name not in results:
+            job_configs.append(func_config)
+        elif func_config.get("scaling_tests") and not any(
+            result.get("test_id") == "compilation_error" for result in results[func_name]
+        ):
+            job_configs.append({"name": func_name, "scaling_tests": func_config["scaling_tests"]})
+    fresh_results = _test_extracted_functions(
+        functions, {**config, "functions": job_configs}, module_slice.code if module_slice else None
+    ) if job_configs else {}
+    
+    for func_name, function_results in fresh_results.items():
+        position = len(tested_configs[func_name].get("tests", []))
+        if func_name in results:
+            # Only the scaling tests ran; they go back between the configured tests and pytest's
+            cached_results = results[func_name]
+            results[func_name] = cached_results[:position] + function_results + cached_results[position:]
+            continue
+        
+        shared_results = _without_scaling_results(function_results, tested_configs[func_name])
+        # Timeouts may only mean the server was busy, so don't remember them
+        sandbox_failed = any(
+            result.get("sandbox_error") or result.get("status") == "timed_out"
+            for result in shared_results
+        )
+        if func_name in cache_keys and not sandbox_failed:
+            cache.set(cache_keys[func_name], shared_results)
+        results[func_name] = function_results
+    
+    # Report functions in configuration order, however their results were found
+    return {func_name: results[func_name] for func_name in tested_configs if func_name in results}
+
+def _without_scaling_results(function_results: List[Dict[str, Any]], func_config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Drop a function's scaling-test results, which follow one result per configured test."""
+    position = len(func_config.get("tests", []))
+    scaling_ids = [test_case.get("test_id", "unknown") for test_case in func_config.get("scaling_tests", [])]
+    found_ids = [result.get("test_id") for result in function_results[position:position + len(scaling_ids)]]
+    if not scaling_ids or found_ids != scaling_ids:
+        # No scaling tests, or they never ran (the function didn't compile)
+        return function_results
+    return function_results[:position] + function_results[position + len(scaling_ids):]
+
+def _test_extracted_functions(
+    functions: Dict[str, FunctionRecord], 
+    config: Dict[str, Any],
+    module_code: Optional[bytes] = None
+) -> Dict[str, List[Dict[str, Any]]]:
     results = {}
     
     # Get configuration settings
     config_functions = config.get("functions", [])
+    max_execution_time = config.get("settings", {}).get("max_execution_time", settings.DEFAULT_MAX_EXECUTION_TIME)
+    
+    # All of a submission's tests share one deadline
+    deadline = time.monotonic() + max_execution_time if max_execution_time else None
     
     for func_config in config_functions:
         func_name = func_config.get("name")
@@ -345,34 +610,19 @@ def test_extracted_functions(
             # Skip functions not found in the student's code
             continue
         
-        func_info = functions[func_name]
-        func_source = func_info.get("source")
-        
-        # Compile the function
-        function = compile_function(func_source, func_name)
-        
-        if function is None:
-            # Skip if function compilation failed
-            results[func_name] = [{
-                "test_id": "compilation_error",
-                "description": "Function could not be compiled",
-                "passed": False,
-                "error": "Compilation error"
-            }]
-            continue
-        
-        # Run basic tests defined in the config
-        function_results = []
-        
-        for test_case in func_config.get("tests", []):
-            test_result = run_function_test(function, test_case)
-            function_results.append(test_result)
+        func_source = functions[func_name].source
         
-        # Run pytest tests if specified
-        pytest_file = func_config.get("pytest_file")
-        if pytest_file:
-            pytest_results = run_pytest_tests(function, pytest_file, func_name)
-            function_results.extend(pytest_results)
+        # Compile and test the function in a sandbox worker, in one round trip
+        function_results = run_function_tests_in_sandbox(
+            func_name,
+            func_source,
+            func_config.get("tests", []),
+            func_config.get("pytest_file"),
+            time_limit=func_config.get("time_limit"),
+            budget=deadline - time.monotonic() if deadline is not None else None,
+            scaling_tests=func_config.get("scaling_tests", []),
+            module_code=module_code
+        )
         
         results[func_name] = function_results
     
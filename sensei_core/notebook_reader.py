@@ -0,0 +1,255 @@
+import codecs
+import io
+import json
+import re
+from typing import BinaryIO, Iterator, List, Tuple
+
+import nbformat
+
+# Bytes read from the notebook at a time; peak memory stays around this plus the largest code cell
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# The next character that matters while skipping a container
+_STRUCTURAL = re.compile(r'[\[\]{}"]')
+# A number, true, false or null
+_SCALAR = re.compile(r"[^,\]}\s]+")
+
+_decoder = json.JSONDecoder()
+
+
+class NotebookFormatError(ValueError):
+    """The notebook isn't a v4 JSON document the streaming reader understands."""
+
+
+class _JsonStream:
+    """
+    Minimal pull parser over a UTF-8 JSON byte stream.
+
+    Values can be decoded (for the small ones we keep) or skipped; skipping
+    only ever holds one chunk in memory, however large the value is.
+    """
+
+    def __init__(self, stream: BinaryIO, chunk_size: int = CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Drop consumed text and read another chunk; returns False at end of input."""
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            self.buffer = self.buffer[self.pos:] + self.decoder.decode(b"", final=True)
+        else:
+            self.buffer = self.buffer[self.pos:] + self.decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it ("" at end of input)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise NotebookFormatError(f"Expected {char!r} in notebook JSON")
+        self.pos += 1
+
+    def decode_value(self):
+        """Decode the next value in full; only used for small values such as cell sources."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise NotebookFormatError("Malformed JSON value in notebook")
+            self._fill()
+
+    def skip_value(self) -> None:
+        """Skip the next value without materializing it."""
+        char = self.peek()
+        if char == '"':
+            self.pos += 1
+            self._skip_string_tail()
+        elif char in "[{":
+            self._skip_container()
+        else:
+            while True:
+                match = _SCALAR.match(self.buffer, self.pos)
+                end = match.end() if match else self.pos
+                if end < len(self.buffer) or not self._fill():
+                    self.pos = end
+                    return
+
+    def _skip_string_tail(self) -> None:
+        # str.find runs at memchr speed, far faster than a regex over megabytes of base64
+        while True:
+            quote = self.buffer.find('"', self.pos)
+            if quote < 0:
+                # Keep a trailing run of backslashes: it decides whether the next quote is escaped
+                trailing = len(self.buffer) - len(self.buffer.rstrip("\\"))
+                self.pos = len(self.buffer) - trailing
+                if not self._fill():
+                    raise NotebookFormatError("Unterminated string in notebook JSON")
+                continue
+            backslashes = 0
+            while quote - backslashes - 1 >= self.pos and self.buffer[quote - backslashes - 1] == "\\":
+                backslashes += 1
+            if backslashes % 2 == 0:
+                self.pos = quote + 1
+                return
+            self.pos = quote + 1
+
+    def _skip_container(self) -> None:
+        depth = 0
+        while True:
+            match = _STRUCTURAL.search(self.buffer, self.pos)
+            if match is None:
+                self.pos = len(self.buffer)
+                if not self._fill():
+                    raise NotebookFormatError("Unterminated container in notebook JSON")
+                continue
+            char = match.group()
+            self.pos = match.end()
+            if char == '"':
+                self._skip_string_tail()
+            elif char in "[{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def iter_object_keys(self) -> Iterator[str]:
+        """Iterate over an object's keys; the caller must decode or skip each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.decode_value()
+            if not isinstance(key, str):
+                raise NotebookFormatError("Object key is not a string")
+            self.expect(":")
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise NotebookFormatError("Expected ',' or '}' in notebook JSON")
+
+    def iter_array(self) -> Iterator[None]:
+        """Iterate over an array; the caller must decode or skip each element."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield None
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise NotebookFormatError("Expected ',' or ']' in notebook JSON")
+
+
+def _join_source(source) -> str:
+    # nbformat stores multi-line sources either as one string or a list of lines
+    if isinstance(source, list):
+        return "".join(source)
+    if isinstance(source, str):
+        return source
+    raise NotebookFormatError("Cell source is neither a string nor a list of strings")
+
+
+def stream_code_cells(stream: BinaryIO) -> Iterator[Tuple[int, str]]:
+    """
+    Stream the code cells of a v4 notebook, skipping outputs and attachments.
+
+    Args:
+        stream: Binary stream of the .ipynb file
+
+    Yields:
+        (cell index, source) for each code cell; indices count all cells
+
+    Raises:
+        NotebookFormatError: If the document isn't a v4 notebook this reader understands
+    """
+    parser = _JsonStream(stream)
+    found_cells = False
+    for key in parser.iter_object_keys():
+        if key == "nbformat":
+            version = parser.decode_value()
+            if version != 4:
+                raise NotebookFormatError(f"Unsupported nbformat version {version}")
+        elif key == "cells":
+            found_cells = True
+            for index, _ in enumerate(parser.iter_array()):
+                cell_type, source = None, None
+                for cell_key in parser.iter_object_keys():
+                    if cell_key == "cell_type":
+                        cell_type = parser.decode_value()
+                    elif cell_key == "source":
+                        source = parser.decode_value()
+                    else:
+                        parser.skip_value()
+                if cell_type == "code":
+                    yield index, _join_source(source if source is not None else "")
+        else:
+            parser.skip_value()
+    if not found_cells:
+        raise NotebookFormatError("Notebook has no cells")
+
+
+def _nbformat_code_cells(stream: BinaryIO) -> List[Tuple[int, str]]:
+    """Read code cells through nbformat, which validates and upgrades older formats."""
+    notebook = nbformat.read(io.TextIOWrapper(stream, encoding="utf-8"), as_version=4)
+    return [
+        (index, cell.source)
+        for index, cell in enumerate(notebook.cells)
+        if cell.cell_type == "code"
+    ]
+
+
+def read_code_cells(stream: BinaryIO) -> List[Tuple[int, str]]:
+    """
+    Read the code cells of a notebook.
+
+    The streaming reader handles v4 notebooks without ever materializing cell
+    outputs; anything it can't handle (older formats, malformed JSON) goes
+    through nbformat instead, which validates it and raises on invalid input.
+
+    Args:
+        stream: Seekable binary stream of the .ipynb file
+
+    Returns:
+        List of (cell index, source) for each code cell
+    """
+    try:
+        return list(stream_code_cells(stream))
+    except NotebookFormatError:
+        stream.seek(0)
+        return _nbformat_code_cells(stream)
+
+
+def read_code_cells_from_path(notebook_path) -> List[Tuple[int, str]]:
+    """Read the code cells of the notebook at `notebook_path` (see read_code_cells)."""
+    with open(notebook_path, "rb") as f:
+        return read_code_cells(f)
@@ -0,0 +1,133 @@
+from typing import Dict, List, Any, Optional, Iterable, Callable, Tuple
+
+from sensei_core.notebook_parser import (
+    extract_code_cells_from_file, extract_functions_from_code, get_available_configs, test_extracted_functions
+)
+from sensei_core.static_analyzer import run_static_analysis_on_cells, run_static_analysis_on_code
+
+# Stages of the grading pipeline, in the order they run
+GRADING_STAGES = ["extracting", "static_analysis", "function_tests"]
+
+
+def find_config(config_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Find an available test configuration by its file path.
+
+    Args:
+        config_path: The configuration's file path, as offered on the upload form
+
+    Returns:
+        The configuration, or None if no configuration has that path
+    """
+    for config in get_available_configs():
+        if config.get("file_path") == config_path:
+            return config
+    return None
+
+
+def grade_submission(
+    file_path: str,
+    options: Dict[str, bool],
+    difficulty: str = "beginner",
+    config_path: Optional[str] = None,
+    selected_functions: Iterable[str] = (),
+    progress: Optional[Callable[[str], None]] = None
+) -> Dict[str, Any]:
+    """
+    Run the whole grading pipeline for one uploaded file saved on disk.
+
+    The file is read once; every stage works on the code extracted from it
+    (see grade_code_cells).
+
+    Args:
+        file_path: Path to the uploaded notebook or Python file
+        options: Dictionary of check options to enable/disable
+        difficulty: Difficulty level (beginner, intermediate, advanced)
+        config_path: Path of the test configuration to use, or None to skip function tests
+        selected_functions: Names of the functions the student selected for testing
+        progress: Called with the name of each stage (one of GRADING_STAGES) as it starts
+
+    Returns:
+        Dictionary with "analysis_results" and "test_results"
+    """
+    return grade_code_cells(
+        extract_code_cells_from_file(file_path),
+        str(file_path).endswith(".ipynb"),
+        options,
+        difficulty,
+        config_path,
+        selected_functions,
+        progress
+    )
+
+
+def grade_code_cells(
+    code_cells: Optional[List[Tuple[int, str]]],
+    is_notebook: bool,
+    options: Dict[str, bool],
+    difficulty: str = "beginner",
+    config_path: Optional[str] = None,
+    selected_functions: Iterable[str] = (),
+    progress: Optional[Callable[[str], None]] = None,
+    backlogged: bool = False
+) -> Dict[str, Any]:
+    """
+    Run the whole grading pipeline on a submission's extracted code.
+
+    The code is joined once and handed to every stage in memory; nothing is
+    read from or written to the upload again. This is blocking work
+    (subprocesses and student code), so the web tier runs it on the grading
+    executor rather than on the event loop.
+
+    Args:
+        code_cells: List of (cell index, source) as returned by
+            extract_code_cells_from_upload, or None if extraction failed
+        is_notebook: Whether the cells are a notebook's (findings then point at their cell)
+        options: Dictionary of check options to enable/disable
+        difficulty: Difficulty level (beginner, intermediate, advanced)
+        config_path: Path of the test configuration to use, or None to skip function tests
+        selected_functions: Names of the functions the student selected for testing
+        progress: Called with the name of each stage (one of GRADING_STAGES) as it starts
+        backlogged: Whether the grading queue was over its threshold when this
+            submission was admitted (analysis is then partial; see load_shedding)
+
+    Returns:
+        Dictionary with "analysis_results" and "test_results"
+    """
+    def report(stage):
+        if progress is not None:
+            progress(stage)
+
+    # Extract functions from the code
+    report("extracting")
+    code = "\n".join(source for _, source in code_cells or [])
+    extracted_functions = extract_functions_from_code(code) if code_cells is not None else {}
+
+    report("static_analysis")
+    if code_cells is None:
+        analysis_results: Dict[str, List[str]] = {"error": ["Could not extract code from file."]}
+    elif is_notebook:
+        analysis_results = run_static_analysis_on_cells(code_cells, options, difficulty, backlogged)
+    else:
+        analysis_results = run_static_analysis_on_code(code, options, difficulty, backlogged=backlogged)
+
+    report("function_tests")
+    test_results: Dict[str, List[Dict[str, Any]]] = {}
+    selected_config = find_config(config_path) if config_path else None
+
+    # If a config was selected, run the tests
+    if selected_config:
+        selected = set(selected_functions)
+        functions_to_test = {
+            func_name: func_info
+            for func_name, func_info in extracted_functions.items()
+            if func_name in selected
+        }
+
+        if functions_to_test:
+            test_results = test_extracted_functions(functions_to_test, selected_config)
+
+    return {
+        "analysis_results": analysis_results,
+        "test_results": test_results
+    }
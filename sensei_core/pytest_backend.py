@@ -0,0 +1,339 @@
+"""
+Runs assignment pytest files against student functions with real pytest.
+
+Fixtures, parametrization, marks, pytest.approx and conftest.py all work as
+they do under the pytest command. Each sandbox worker configures pytest once
+(plugins, options, conftest files) and then runs every pytest file it is
+sent in a new session on that configuration, so a run costs collection and
+the tests themselves rather than a fresh interpreter or pytest setup.
+
+Keeping a configuration alive relies on pytest internals (_prepareconfig,
+Config._do_configure and _ensure_unconfigure) and on new-style hook
+wrappers, so pytest is pinned to the versions this was tested with
+(see pyproject.toml).
+"""
+import ast
+import os
+import threading
+import time
+import types
+from pathlib import Path
+from typing import Dict, List, Any, Callable, ContextManager, Optional, Tuple, Type
+
+import pytest
+from _pytest.assertion.rewrite import rewrite_asserts
+from _pytest.config import ExitCode, _prepareconfig
+from _pytest.outcomes import OutcomeException
+
+# Assignment pytest files and their conftest.py files live here
+ASSIGNMENT_DIR = Path(__file__).resolve().parent.parent / "assignment_defs"
+
+# No cache directory, no terminal output (results come from the plugin) and no
+# output capture (the sandbox already keeps student output off its channel);
+# the empty ini file keeps the repository's own pytest settings out
+PYTEST_ARGS = [
+    "-p", "no:cacheprovider",
+    "-p", "no:terminal",
+    "--capture=no",
+    "-c", os.devnull,
+    "--rootdir", str(ASSIGNMENT_DIR),
+    "--confcutdir", str(ASSIGNMENT_DIR),
+]
+
+# Compiled assignment pytest files: path -> (modification time, code object)
+_pytest_code_cache: Dict[str, Tuple[int, types.CodeType]] = {}
+_pytest_code_lock = threading.Lock()
+
+
+def load_pytest_code(pytest_path: Path) -> types.CodeType:
+    """
+    Compile an assignment's pytest file, reusing the code object until the file changes.
+
+    Asserts are rewritten the way pytest rewrites them on import, so failures
+    explain themselves ("assert 42 == 3.0").
+
+    Args:
+        pytest_path: Path to the pytest file
+
+    Returns:
+        The file's compiled code
+    """
+    key = str(pytest_path)
+    mtime = pytest_path.stat().st_mtime_ns
+    with _pytest_code_lock:
+        cached = _pytest_code_cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    source = pytest_path.read_bytes()
+    tree = ast.parse(source, filename=key)
+    rewrite_asserts(tree, source, key)
+    code = compile(tree, key, "exec", dont_inherit=True)
+    with _pytest_code_lock:
+        _pytest_code_cache[key] = (mtime, code)
+    return code
+
+
+class StudentTestModule(pytest.Module):
+    """
+    A pytest file collected from its cached code into a fresh module, with
+    the student's functions bound into the module before it runs.
+    """
+
+    bindings: Dict[str, Any] = {}
+
+    def _getobj(self):
+        module = types.ModuleType(f"assignment_tests_{self.path.stem}")
+        module.__file__ = str(self.path)
+        module.__dict__.update(self.bindings)
+        exec(load_pytest_code(self.path), module.__dict__)
+        return module
+
+
+class ResultCollector:
+    """
+    Pytest plugin that turns the reports of one run into test results.
+
+    Registered once per worker; `start` resets it before each run.
+    """
+
+    def __init__(self):
+        self.start({})
+
+    def start(
+        self,
+        bindings: Dict[str, Any],
+        call_limit: Optional[Callable[[], ContextManager[Any]]] = None,
+        limit_error: Type[BaseException] = TimeoutError
+    ) -> None:
+        """Prepare for a run whose test module gets `bindings` (see run_pytest_file for the rest)."""
+        self.bindings = bindings
+        self.call_limit = call_limit
+        self.limit_error = limit_error
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.collection_errors: List[str] = []
+        # Tests whose call ran past its time limit: node id -> message
+        self.timed_out: Dict[str, str] = {}
+        # A BaseException from student code (the sandbox's time limit) that stopped the run, and the test it stopped
+        self.interruption: Optional[BaseException] = None
+        self.interrupted_test: Optional[str] = None
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_pycollect_makemodule(self, module_path, parent):
+        module = StudentTestModule.from_parent(parent, path=module_path)
+        module.bindings = self.bindings
+        return module
+
+    def pytest_collectreport(self, report) -> None:
+        if report.failed:
+            self.collection_errors.append(_failure_message(report))
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_call(self, item):
+        if self.call_limit is None:
+            return (yield)
+        try:
+            with self.call_limit():
+                return (yield)
+        except self.limit_error as e:
+            # Only this test failed; the run goes on with the next one
+            self.timed_out[item.nodeid] = str(e) or "Timed out"
+            raise
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        report = yield
+        excinfo = call.excinfo
+        timed_out = call.when == "call" and item.nodeid in self.timed_out
+        if excinfo is not None and not timed_out and not isinstance(excinfo.value, (Exception, OutcomeException)):
+            # Pytest reports it as a failure and moves on; stop the run instead
+            self.interruption = excinfo.value
+            self.interrupted_test = item.nodeid
+            item.session.shouldstop = "Interrupted by the sandbox"
+
+        if item.nodeid not in self.results:
+            self.results[item.nodeid] = _new_result(item)
+        return report
+
+    def pytest_runtest_logreport(self, report) -> None:
+        result = self.results.get(report.nodeid)
+        if result is None:
+            return
+        result["elapsed"] += report.duration
+
+        if report.failed:
+            # A failing fixture is an error in the test setup, not a failed test
+            if result["status"] == "passed":
+                if report.when == "call" and report.nodeid in self.timed_out:
+                    result["status"] = "timed_out"
+                    result["error"] = self.timed_out[report.nodeid]
+                else:
+                    result["status"] = "failed" if report.when == "call" else "error"
+                    result["error"] = _failure_message(report)
+        elif report.skipped and result["status"] == "passed":
+            result["status"] = "skipped"
+            result["error"] = _failure_message(report)
+
+        if report.when == "teardown":
+            result["passed"] = result["status"] == "passed"
+
+
+def _new_result(item) -> Dict[str, Any]:
+    """The result of a test that hasn't reported anything yet."""
+    return {
+        "test_id": item.name,
+        "description": (item.function.__doc__ or item.name).strip(),
+        "passed": False,
+        "status": "passed",
+        "error": None,
+        "elapsed": 0.0
+    }
+
+
+def _failure_message(report) -> str:
+    """The one-line reason a report failed or was skipped."""
+    longrepr = report.longrepr
+    if isinstance(longrepr, tuple):
+        # Skips are reported as (path, line, reason)
+        return str(longrepr[2]).removeprefix("Skipped: ")
+    crash = getattr(longrepr, "reprcrash", None)
+    if crash is not None:
+        return crash.message
+    return str(longrepr)
+
+
+class PytestSession:
+    """
+    One pytest configuration, set up once and reused for every run in a worker.
+    """
+
+    def __init__(self):
+        self.collector = ResultCollector()
+        self.config = _prepareconfig(list(PYTEST_ARGS), plugins=[self.collector])
+        self.config._do_configure()
+
+    def close(self) -> None:
+        self.config._ensure_unconfigure()
+
+    def run(
+        self,
+        pytest_path: Path,
+        bindings: Dict[str, Any],
+        call_limit: Optional[Callable[[], ContextManager[Any]]] = None,
+        limit_error: Type[BaseException] = TimeoutError
+    ) -> List[Dict[str, Any]]:
+        """
+        Collect and run one pytest file in a new session.
+
+        Args:
+            pytest_path: Path to the pytest file
+            bindings: Module-level names the test file expects (the student's function)
+            call_limit: See run_pytest_file
+            limit_error: See run_pytest_file
+
+        Returns:
+            List of test results, in collection order
+        """
+        config = self.config
+        self.collector.start(bindings, call_limit, limit_error)
+        session = pytest.Session.from_config(config)
+        session.exitstatus = ExitCode.OK
+        try:
+            config.hook.pytest_sessionstart(session=session)
+            try:
+                session.perform_collect([str(pytest_path)])
+                config.hook.pytest_runtestloop(session=session)
+            except (session.Interrupted, session.Failed):
+                pass
+            finally:
+                config.hook.pytest_sessionfinish(session=session, exitstatus=session.exitstatus)
+        except pytest.UsageError as e:
+            # Collection errors surface as a usage error when the file can't be collected at all
+            self.collector.collection_errors.append(str(e))
+        finally:
+            os.chdir(session.startpath)
+            # The session and its fixture manager register themselves as plugins; the next run brings its own
+            for name in ("session", "funcmanage"):
+                if config.pluginmanager.has_plugin(name):
+                    config.pluginmanager.unregister(name=name)
+
+        interruption = self.collector.interruption
+        if interruption is not None and not isinstance(interruption, self.collector.limit_error):
+            raise interruption
+
+        if interruption is not None:
+            # Keep the tests that finished; the interrupted one and those never reached ran out of time
+            message = str(interruption) or "Timed out"
+            for item in getattr(session, "items", []):
+                result = self.collector.results.get(item.nodeid)
+                if result is None:
+                    result = self.collector.results[item.nodeid] = _new_result(item)
+                elif item.nodeid != self.collector.interrupted_test or result["status"] == "timed_out":
+                    continue
+                result.update(passed=False, status="timed_out", error=message)
+
+        results = list(self.collector.results.values())
+        if self.collector.collection_errors:
+            results.append({
+                "test_id": "pytest_collection_error",
+                "description": "Error collecting the pytest file",
+                "passed": False,
+                "status": "error",
+                "error": "\n".join(self.collector.collection_errors)
+            })
+        return results
+
+
+_session: Optional[PytestSession] = None
+_session_lock = threading.Lock()
+
+
+def run_pytest_file(
+    pytest_file: str,
+    bindings: Dict[str, Any],
+    call_limit: Optional[Callable[[], ContextManager[Any]]] = None,
+    limit_error: Type[BaseException] = TimeoutError
+) -> List[Dict[str, Any]]:
+    """
+    Run an assignment's pytest file against student code with real pytest.
+
+    A test whose call raises `limit_error` inside `call_limit()` is reported
+    as timed out, and the run goes on with the next test.
+
+    Args:
+        pytest_file: Path of the pytest file, relative to assignment_defs
+        bindings: Module-level names the test file expects, e.g. {"calculate_average": function}
+        call_limit: Returns the context manager each test's call runs in (the sandbox's
+            per-test time limit), or None for no limit
+        limit_error: Exception that context manager raises when a test runs too long
+
+    Returns:
+        List of test results
+    """
+    global _session
+    pytest_path = ASSIGNMENT_DIR / pytest_file
+    if not pytest_path.exists():
+        return [{"test_id": "pytest_error", "description": f"Pytest file {pytest_file} not found", "passed": False, "status": "error"}]
+
+    with _session_lock:
+        start = time.perf_counter()
+        try:
+            if _session is None:
+                _session = PytestSession()
+            return _session.run(pytest_path, bindings, call_limit, limit_error)
+        except Exception as e:
+            # Don't reuse a configuration that failed mid-run
+            if _session is not None:
+                try:
+                    _session.close()
+                except Exception:
+                    pass
+            _session = None
+            return [{
+                "test_id": "pytest_setup_error",
+                "description": "Error setting up pytest",
+                "passed": False,
+                "status": "error",
+                "error": str(e),
+                "elapsed": time.perf_counter() - start
+            }]
@@ -0,0 +1,308 @@
+import hashlib
+import json
+import os
+import pickle
+import stat
+import subprocess
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import config
+
+_tool_versions: Optional[Dict[str, str]] = None
+
+
+def normalize_code(code_string: str) -> str:
+    """
+    Normalize code so byte-level differences that don't change analysis share a key.
+
+    Args:
+        code_string: Python code as a string
+
+    Returns:
+        The code without a BOM and with Unix line endings
+    """
+    return code_string.lstrip("\ufeff").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def hash_code(code_string: str) -> str:
+    """Return the SHA-256 hex digest of the normalized code."""
+    return hashlib.sha256(normalize_code(code_string).encode("utf-8")).hexdigest()
+
+
+def hash_config(test_config: Dict[str, Any]) -> str:
+    """
+    Hash an assignment configuration, including the pytest files it references
+    and every conftest.py pytest loads for them (those between each pytest
+    file and assignment_defs).
+
+    Args:
+        test_config: Loaded assignment configuration
+
+    Returns:
+        SHA-256 hex digest of the configuration
+    """
+    digest = hashlib.sha256(json.dumps(test_config, sort_keys=True, default=str).encode("utf-8"))
+    assignment_dir = (Path(__file__).parent.parent / "assignment_defs").resolve()
+    for func_config in test_config.get("functions", []):
+        pytest_file = func_config.get("pytest_file")
+        if pytest_file:
+            pytest_path = (assignment_dir / pytest_file).resolve()
+            try:
+                digest.update(pytest_path.read_bytes())
+            except OSError:
+                digest.update(b"<missing>")
+
+            directory = pytest_path.parent
+            while directory == assignment_dir or assignment_dir in directory.parents:
+                conftest = directory / "conftest.py"
+                if conftest.is_file():
+                    digest.update(str(conftest.relative_to(assignment_dir)).encode("utf-8"))
+                    digest.update(conftest.read_bytes())
+                directory = directory.parent
+    return digest.hexdigest()
+
+
+def get_tool_versions() -> Dict[str, str]:
+    """
+    Get the versions of the tools whose output ends up in cached results.
+
+    Returns:
+        Dictionary mapping tool names to version strings (looked up once per process)
+    """
+    global _tool_versions
+    if _tool_versions is None:
+        versions = {"python": sys.version.split()[0]}
+        try:
+            versions["ruff"] = subprocess.run(
+                ["ruff", "--version"], capture_output=True, text=True, timeout=10
+            ).stdout.strip()
+        except Exception:
+            versions["ruff"] = "unavailable"
+        try:
+            from mypy.version import __version__ as mypy_version
+            versions["mypy"] = mypy_version
+        except Exception:
+            versions["mypy"] = "unavailable"
+        _tool_versions = versions
+    return _tool_versions
+
+
+def make_cache_key(kind: str, **parts: Any) -> str:
+    """
+    Build a content-addressed cache key.
+
+    Args:
+        kind: Kind of result being cached (e.g. "static_analysis")
+        parts: Everything the result depends on; must be JSON serializable
+
+    Returns:
+        SHA-256 hex digest identifying the result
+    """
+    payload = {"kind": kind, "tools": get_tool_versions(), **parts}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache of pickled analysis results.
+
+    The memory tier is an LRU of recent entries; the disk tier keeps one file
+    per entry and evicts the least recently used files once the directory
+    grows beyond `disk_max_bytes`.
+    """
+
+    def __init__(self, memory_entries: int, disk_dir: Optional[Path], disk_max_bytes: int):
+        self.memory_entries = memory_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached result.
+
+        Args:
+            key: Cache key from make_cache_key
+
+        Returns:
+            A fresh copy of the cached result, or None on a miss
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+
+        if data is None:
+            data = self._read_disk(key)
+            with self._lock:
+                if data is None:
+                    self.counters["misses"] += 1
+                    return None
+                self.counters["disk_hits"] += 1
+                self._remember(key, data)
+
+        try:
+            return pickle.loads(data)
+        except Exception as e:
+            print(f"Warning: Discarding unreadable cache entry {key}: {e}")
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a result; values that can't be pickled are silently not cached.
+
+        Args:
+            key: Cache key from make_cache_key
+            value: Result to store
+        """
+        try:
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+
+        with self._lock:
+            self._remember(key, data)
+        self._write_disk(key, data)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit/miss counters and current tier sizes."""
+        with self._lock:
+            return {**self.counters, "memory_entries": len(self._memory), "disk_bytes": self._disk_bytes or 0}
+
+    def _remember(self, key: str, data: bytes) -> None:
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.pkl"
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if self.disk_dir is None:
+            return None
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            # Touch the entry so eviction sees it as recently used
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        if self.disk_dir is None:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(mode=0o700, exist_ok=True)
+            # Write to a temporary name first so readers never see a partial entry
+            temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            temp_path.write_bytes(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += len(data)
+            if self._disk_bytes > self.disk_max_bytes:
+                self._evict_disk()
+
+    def _scan_disk_bytes(self) -> int:
+        total = 0
+        for entry in self.disk_dir.glob("*/*.pkl"):
+            try:
+                total += entry.stat().st_size
+            except OSError:
+                continue
+        return total
+
+    def _evict_disk(self) -> None:
+        # Evict least recently used entries until the tier is back under 90% of its budget
+        entries = []
+        for entry in self.disk_dir.glob("*/*.pkl"):
+            try:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry))
+            except OSError:
+                continue
+        entries.sort(key=lambda item: item[0])
+
+        total = sum(size for _, size, _ in entries)
+        target = int(self.disk_max_bytes * 0.9)
+        for _, size, entry in entries:
+            if total <= target:
+                break
+            try:
+                entry.unlink()
+                total -= size
+                self.counters["evictions"] += 1
+            except OSError:
+                continue
+        self._disk_bytes = total
+
+
+def private_cache_dir(path: Path) -> Optional[Path]:
+    """
+    Create the disk tier's directory, or check an existing one, so only this user can use it.
+
+    Entries are unpickled when read, so anyone who can write to the directory
+    could run code in the grader. The directory must be a real directory (not
+    a symlink), owned by this user and writable by no one else; one others
+    can only read is closed to them.
+
+    Args:
+        path: Configured cache directory
+
+    Returns:
+        The directory, or None (disk tier disabled) if it isn't private
+    """
+    try:
+        path.mkdir(mode=0o700, parents=True, exist_ok=True)
+        info = os.lstat(path)
+    except OSError as e:
+        print(f"Warning: Could not create cache directory {path}: {e}; disk cache disabled.")
+        return None
+    if not stat.S_ISDIR(info.st_mode):
+        print(f"Warning: Cache directory {path} is not a directory; disk cache disabled.")
+        return None
+    # Not available on Windows, where the directory's ACLs apply instead
+    if hasattr(os, "getuid"):
+        if info.st_uid != os.getuid() or info.st_mode & 0o022:
+            # Someone else owns it or may already have written entries to it
+            print(f"Warning: Cache directory {path} is not private to this user; disk cache disabled.")
+            return None
+        if info.st_mode & 0o077:
+            # Only readable by others, as older versions created it; close it
+            os.chmod(path, 0o700)
+    return path
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """
+    Get the process-wide result cache, or None if caching is disabled.
+    """
+    global _cache
+    if not config.RESULT_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            disk_dir = private_cache_dir(Path(config.RESULT_CACHE_DIR)) if config.RESULT_CACHE_DIR else None
+            _cache = ResultCache(config.RESULT_CACHE_MEMORY_ENTRIES, disk_dir, config.RESULT_CACHE_MAX_BYTES)
+        return _cache
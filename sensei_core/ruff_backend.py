@@ -0,0 +1,184 @@
+import json
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, List, Any, Tuple
+
+import config
+
+# Rule code of the unused-variable pass, merged into the main Ruff call
+UNUSED_VARIABLE_CODE = "F841"
+
+# Name diagnostics are reported against in student-facing output
+STUDENT_FILENAME = "student_code.py"
+
+# Ruff's arguments before the files (or stdin) to check
+RUFF_COMMAND = ["ruff", "check", "--output-format", "json", "--extend-select", UNUSED_VARIABLE_CODE, "--exit-zero"]
+
+
+def lint_codes(codes: Dict[str, str], timeout: float = 10) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Lint many submissions with a single `ruff check --output-format json` call.
+
+    A single submission is passed on stdin. Several are written to their own
+    files in a scratch directory on TOOL_SCRATCH_DIR (a tmpfs where there is
+    one), and the JSON diagnostics are split back to their submission by
+    filename.
+
+    Args:
+        codes: Dictionary mapping a submission key to its Python code
+        timeout: Timeout in seconds for the Ruff process
+
+    Returns:
+        Dictionary mapping each submission key to its list of Ruff diagnostics
+
+    Raises:
+        subprocess.TimeoutExpired: If Ruff does not finish within the timeout
+        RuntimeError: If Ruff fails or its output cannot be parsed
+    """
+    results: Dict[str, List[Dict[str, Any]]] = {key: [] for key in codes}
+    if not codes:
+        return results
+
+    if len(codes) == 1:
+        # A lone submission is piped in, without touching the file system. Both paths run
+        # from the scratch directory, so the server's own files never count as first-party imports
+        (only_key, only_code), = codes.items()
+        file_keys = {STUDENT_FILENAME: only_key}
+        ruff_result = subprocess.run(
+            [*RUFF_COMMAND, "--stdin-filename", STUDENT_FILENAME, "-"],
+            input=only_code,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            cwd=config.TOOL_SCRATCH_DIR
+        )
+    else:
+        with tempfile.TemporaryDirectory(prefix="ruff_batch_", dir=config.TOOL_SCRATCH_DIR) as scratch_dir:
+            # Use generated file names so arbitrary keys can't escape the scratch directory
+            file_keys = {}
+            for index, (key, code) in enumerate(codes.items()):
+                file_name = f"submission_{index}.py"
+                (Path(scratch_dir) / file_name).write_text(code, encoding="utf-8")
+                file_keys[file_name] = key
+
+            ruff_result = subprocess.run(
+                [*RUFF_COMMAND, scratch_dir],
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+                cwd=config.TOOL_SCRATCH_DIR
+            )
+
+    if ruff_result.returncode != 0:
+        raise RuntimeError(ruff_result.stderr.strip() or f"Ruff exited with status {ruff_result.returncode}")
+
+    try:
+        diagnostics = json.loads(ruff_result.stdout or "[]")
+    except json.JSONDecodeError:
+        raise RuntimeError(ruff_result.stderr.strip() or "Ruff produced no JSON output")
+
+    for diagnostic in diagnostics:
+        key = file_keys.get(Path(diagnostic.get("filename", "")).name)
+        if key is not None:
+            results[key].append(diagnostic)
+
+    return results
+
+
+def format_diagnostic(diagnostic: Dict[str, Any], filename: str = STUDENT_FILENAME) -> str:
+    """
+    Format a Ruff JSON diagnostic as a concise `file:row:col: CODE message` line.
+
+    Args:
+        diagnostic: One diagnostic from Ruff's JSON output
+        filename: File name to report the diagnostic against
+
+    Returns:
+        Formatted diagnostic line
+    """
+    location = diagnostic.get("location") or {}
+    code = diagnostic.get("code")
+    message = diagnostic.get("message", "")
+    text = f"{code} {message}" if code else message
+    return f"{filename}:{location.get('row', 0)}:{location.get('column', 0)}: {text}"
+
+
+class RuffBatcher:
+    """
+    Collects submissions linted from concurrent workers into shared Ruff calls.
+
+    While one Ruff process is running, newly arriving submissions queue up; the
+    next caller to find Ruff idle lints everything queued (up to `max_batch`)
+    in one process. An idle server therefore lints immediately, and a busy one
+    amortizes the process start across the whole queue.
+    """
+
+    def __init__(self, max_batch: int = 64, timeout: float = 10):
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self._running = False
+        self._pending: List[Tuple[str, Future]] = []
+
+    def lint(self, code: str) -> List[Dict[str, Any]]:
+        """
+        Lint one submission as part of the next batch.
+
+        Args:
+            code: The Python code to lint
+
+        Returns:
+            List of Ruff diagnostics for this submission
+        """
+        future: Future = Future()
+        with self._condition:
+            self._pending.append((code, future))
+
+        while not future.done():
+            with self._condition:
+                while self._running and not future.done():
+                    self._condition.wait()
+                if future.done():
+                    break
+                self._running = True
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+
+            try:
+                self._run_batch(batch)
+            finally:
+                with self._condition:
+                    self._running = False
+                    self._condition.notify_all()
+
+        return future.result()
+
+    def _run_batch(self, batch: List[Tuple[str, Future]]) -> None:
+        try:
+            diagnostics = lint_codes({str(index): code for index, (code, _) in enumerate(batch)}, timeout=self.timeout)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for index, (_, future) in enumerate(batch):
+            future.set_result(diagnostics[str(index)])
+
+
+_default_batcher = RuffBatcher()
+
+
+def lint_code(code: str) -> List[Dict[str, Any]]:
+    """
+    Lint a single submission through the shared batcher.
+
+    Args:
+        code: The Python code to lint
+
+    Returns:
+        List of Ruff diagnostics (including the F841 unused-variable pass)
+    """
+    return _default_batcher.lint(code)
@@ -0,0 +1,185 @@
+"""
+Scratch area for uploaded files while they are graded.
+
+Uploads graded in the web process are read straight from the form parser's
+spool and never saved here; uploads handed to Celery workers are copied to
+UPLOAD_DIR in chunks with a size cap, so neither a large file nor a burst of
+uploads is ever held in memory. Whoever finishes
+with a file removes it (the request, or the Celery task it was handed to);
+a janitor thread deletes anything left behind by a crash or a lost task.
+"""
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Optional
+
+import config as settings
+
+# Bytes copied from an upload at a time
+CHUNK_SIZE = 64 * 1024
+# Multipart framing and the form's other fields on top of the file itself
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+UPLOAD_SUFFIXES = (".ipynb", ".py")
+
+
+class UploadRejected(ValueError):
+    """An upload that isn't accepted (too large, wrong type, or no room for it)."""
+
+
+def scratch_dir() -> Path:
+    """Return the scratch directory, creating it if needed."""
+    path = Path(settings.UPLOAD_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def scratch_usage() -> int:
+    """Total size in bytes of the files in the scratch directory."""
+    total = 0
+    with os.scandir(scratch_dir()) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file():
+                    total += entry.stat().st_size
+            except OSError:
+                # Removed while we were looking
+                pass
+    return total
+
+
+def content_length_too_large(content_length: Optional[str]) -> bool:
+    """
+    Tell from a request's Content-Length header whether its upload is over the limit,
+    before any of the body is read.
+    """
+    if content_length is None:
+        return False
+    try:
+        return int(content_length) > settings.UPLOAD_MAX_BYTES + FORM_OVERHEAD_BYTES
+    except ValueError:
+        return False
+
+
+def size_limit_message(max_bytes: Optional[int] = None) -> str:
+    """The message an upload over the size limit is refused with."""
+    if max_bytes is None:
+        max_bytes = settings.UPLOAD_MAX_BYTES
+    return f"File is larger than the {max_bytes / (1024 * 1024):g} MB limit."
+
+
+async def save_upload(upload: Any, max_bytes: Optional[int] = None) -> Path:
+    """
+    Copy an uploaded file into the scratch area in chunks.
+
+    The file keeps its type's extension (.ipynb or .py) under a random name.
+    Nothing is left behind if the copy fails or the upload is rejected.
+
+    Args:
+        upload: Starlette UploadFile
+        max_bytes: Largest size accepted; defaults to UPLOAD_MAX_BYTES
+
+    Returns:
+        Path of the saved file; the caller must remove it (remove_scratch_file)
+
+    Raises:
+        UploadRejected: If the file has the wrong type, is too large, or the scratch area is full
+    """
+    if max_bytes is None:
+        max_bytes = settings.UPLOAD_MAX_BYTES
+    suffix = Path(upload.filename or "").suffix.lower()
+    if suffix not in UPLOAD_SUFFIXES:
+        raise UploadRejected("Invalid file type. Please upload a .ipynb or .py file.")
+    check_upload_size(upload, max_bytes)
+    if scratch_usage() + max_bytes > settings.UPLOAD_DIR_MAX_BYTES:
+        raise UploadRejected("The server is busy grading other submissions. Please try again in a few minutes.")
+
+    path = scratch_dir() / f"{uuid.uuid4()}{suffix}"
+    written = 0
+    try:
+        with open(path, "wb") as f:
+            while True:
+                chunk = await upload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadRejected(size_limit_message(max_bytes))
+                f.write(chunk)
+    except BaseException:
+        remove_scratch_file(path)
+        raise
+    return path
+
+
+def check_upload_size(upload: Any, max_bytes: Optional[int] = None) -> None:
+    """
+    Refuse an upload the form parser has measured as larger than `max_bytes`.
+
+    Raises:
+        UploadRejected: If the file is too large
+    """
+    if max_bytes is None:
+        max_bytes = settings.UPLOAD_MAX_BYTES
+    if getattr(upload, "size", None) is not None and upload.size > max_bytes:
+        raise UploadRejected(size_limit_message(max_bytes))
+
+
+def remove_scratch_file(path) -> None:
+    """Remove a scratch file; one that is already gone is fine."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Warning: Could not remove temporary file {path}: {e}")
+
+
+def sweep_scratch(max_age: Optional[float] = None) -> int:
+    """
+    Delete scratch files that haven't been touched for `max_age` seconds.
+
+    Args:
+        max_age: Age in seconds; defaults to UPLOAD_MAX_AGE_SECONDS
+
+    Returns:
+        Number of files removed
+    """
+    if max_age is None:
+        max_age = settings.UPLOAD_MAX_AGE_SECONDS
+    cutoff = time.time() - max_age
+    removed = 0
+    with os.scandir(scratch_dir()) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                # Removed by its owner in the meantime, or not ours to remove
+                pass
+    return removed
+
+
+_janitor: Optional[threading.Thread] = None
+_janitor_lock = threading.Lock()
+
+
+def _janitor_loop() -> None:
+    while True:
+        try:
+            sweep_scratch()
+        except Exception as e:
+            print(f"Warning: Scratch directory sweep failed: {e}")
+        time.sleep(settings.UPLOAD_JANITOR_INTERVAL)
+
+
+def start_scratch_janitor() -> None:
+    """Start the thread that sweeps orphaned scratch files, once per process."""
+    global _janitor
+    with _janitor_lock:
+        if _janitor is None:
+            _janitor = threading.Thread(target=_janitor_loop, name="scratch-janitor", daemon=True)
+            _janitor.start()
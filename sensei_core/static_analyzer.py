@@ -1,13 +1,31 @@
 import nbformat
 import ast
+import re
 import subprocess
-import tempfile
-import os
+import time
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union
+
+import config as settings
 
 # Import our notebook parser to reuse code
-from sensei_core.notebook_parser import extract_code_from_notebook
+from sensei_core.notebook_parser import extract_code_from_notebook, extract_code_cells_from_notebook, SourceMap
+from sensei_core.ast_rules import run_ast_rules, traverse
+from sensei_core.cell_analysis import run_ast_rules_by_cell, run_ast_rules_on_parsing_cells
+from sensei_core.ruff_backend import lint_code, format_diagnostic, UNUSED_VARIABLE_CODE, STUDENT_FILENAME
+from sensei_core.mypy_backend import get_daemon_pool, MypyCheckTimeout
+from sensei_core.analysis_graph import AnalysisStage, Halted, run_stage_graph
+from sensei_core.load_shedding import get_load_monitor, defer_until_idle
+from sensei_core.result_cache import get_result_cache, make_cache_key, hash_code
+
+# Options handled by the single-pass AST rule engine: results key, empty message, default
+AST_CHECKS = {
+    "security": ("security_checks", "No security issues found.", True),
+    "style": ("style_checks", "No style issues found.", True),
+    "docstrings": ("function_checks", "No function style issues found.", True),
+    "complexity": ("complexity_checks", "No complexity issues found.", False),
+    "best_practices": ("best_practices", "No best practice issues found.", True),
+}
 
 def get_code_from_file(file_path) -> Optional[str]:
     """
@@ -48,56 +66,15 @@ def custom_ast_checks(code_string: str) -> List[str]:
     Returns:
         List of issues found in the code
     """
-    issues = []
-    # Security-related disallowed modules
-    disallowed_imports = {
-        "os", "subprocess", "shutil", "sys", "socket", "requests", 
-        "urllib", "http", "ftplib", "telnetlib", "smtplib"
-    }
-    # Potentially dangerous built-in functions 
-    disallowed_functions = {"eval", "exec", "__import__", "globals", "locals", "compile"}
-
     try:
         tree = ast.parse(code_string)
-        
-        # Check for style issues
-        for node in ast.walk(tree):
-            # Check variable naming style
-            if isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name):
-                        if target.id.isupper() and len(target.id) > 1 and not target.id.startswith("_"):
-                            issues.append(f"Style: Variable '{target.id}' at line {node.lineno} is all uppercase. This style is typically reserved for constants.")
-                        elif target.id.startswith("__") and not target.id.endswith("__"):
-                            issues.append(f"Style: Variable '{target.id}' at line {node.lineno} uses double underscore prefix, which is typically reserved for name mangling in classes.")
-            
-            # Check for security issues
-            if isinstance(node, ast.Import):
-                for alias in node.names:
-                    if alias.name in disallowed_imports or any(alias.name.startswith(f"{mod}.") for mod in disallowed_imports):
-                        issues.append(f"Security: Disallowed import found: '{alias.name}' at line {node.lineno}")
-            elif isinstance(node, ast.ImportFrom):
-                if node.module and (node.module in disallowed_imports or any(node.module.startswith(f"{mod}.") for mod in disallowed_imports)):
-                    issues.append(f"Security: Disallowed import from found: '{node.module}' at line {node.lineno}")
-            elif isinstance(node, ast.Call):
-                if isinstance(node.func, ast.Name) and node.func.id in disallowed_functions:
-                    issues.append(f"Security: Disallowed function call found: '{node.func.id}()' at line {node.lineno}")
-                
-            # Check for common errors
-            if isinstance(node, ast.FunctionDef) and not node.body:
-                issues.append(f"Error: Function '{node.name}' at line {node.lineno} has an empty body.")
-            
-            # Check for unused imports (basic check)
-            if isinstance(node, ast.Import) or isinstance(node, ast.ImportFrom):
-                # More sophisticated unused import detection would require tracking variable usage
-                pass
-                
+        context = traverse(tree, ["style", "security", "errors"])
+        return [issue for _, issue in context.ordered()]
     except SyntaxError as e:
-        issues.append(f"Syntax error in student code: {e}")
+        return [f"Syntax error in student code: {e}"]
     except Exception as e:
-        issues.append(f"Error during AST check: {str(e)}")
-    
-    return issues
+        return [f"Error during AST check: {str(e)}"]
+
 
 def style_check_functions(code_string: str) -> List[str]:
     """
@@ -109,68 +86,27 @@ def style_check_functions(code_string: str) -> List[str]:
     Returns:
         List of style issues in function definitions
     """
-    issues = []
-    
-    try:
-        tree = ast.parse(code_string)
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                # Check function name style (should be snake_case)
-                if not node.name.islower() and "_" not in node.name and not node.name.startswith("__"):
-                    issues.append(f"Style: Function name '{node.name}' at line {node.lineno} should use snake_case naming convention.")
-                
-                # Check for docstring
-                if not ast.get_docstring(node):
-                    issues.append(f"Style: Function '{node.name}' at line {node.lineno} is missing a docstring.")
-                
-                # Check argument names
-                for arg in node.args.args:
-                    if not arg.arg.islower() and "_" not in arg.arg:
-                        issues.append(f"Style: Argument '{arg.arg}' in function '{node.name}' at line {node.lineno} should use snake_case naming convention.")
-    
-    except SyntaxError as e:
-        issues.append(f"Syntax error in student code: {e}")
-    except Exception as e:
-        issues.append(f"Error during function style check: {str(e)}")
-    
-    return issues
+    return run_ast_rules(code_string, ["docstrings"])["docstrings"]
+
 
-def run_ruff_linter(code_string: str) -> List[str]:
+def run_ruff_linter(code_string: str, diagnostics: Union[List[Dict[str, Any]], Exception, None] = None) -> List[str]:
     """
     Run the Ruff linter on the provided code.
     
     Args:
         code_string: The Python code to analyze
+        diagnostics: Ruff diagnostics (or the Ruff error) already produced for this code, if any
         
     Returns:
         List of linting issues found
     """
     try:
-        # Create a temporary file for the code
-        with tempfile.NamedTemporaryFile(suffix='.py', mode='w', delete=False) as temp_file:
-            temp_file_path = temp_file.name
-            temp_file.write(code_string)
+        if diagnostics is None:
+            diagnostics = lint_code(code_string)
+        elif isinstance(diagnostics, Exception):
+            raise diagnostics
         
-        # Run Ruff on the temporary file
-        ruff_result = subprocess.run(
-            ["ruff", "check", temp_file_path], 
-            capture_output=True, 
-            text=True,
-            timeout=10  # Timeout after 10 seconds
-        )
-        
-        # Process the output
-        linter_output = []
-        if ruff_result.stdout:
-            # Process each line to make it more readable
-            for line in ruff_result.stdout.splitlines():
-                # Remove the temp file path from the output for clarity
-                cleaned_line = line.replace(temp_file_path, "student_code.py")
-                linter_output.append(cleaned_line)
-        
-        # Clean up the temporary file
-        os.unlink(temp_file_path)
+        linter_output = [format_diagnostic(diagnostic) for diagnostic in diagnostics]
         
         return linter_output if linter_output else ["No linting issues found."]
     
@@ -179,6 +115,7 @@ def run_ruff_linter(code_string: str) -> List[str]:
     except Exception as e:
         return [f"Error running linter: {str(e)}"]
 
+
 def check_code_complexity(code_string: str) -> List[str]:
     """
     Check for code complexity issues using AST.
@@ -189,32 +126,8 @@ def check_code_complexity(code_string: str) -> List[str]:
     Returns:
         List of complexity issues
     """
-    issues = []
-    
-    try:
-        tree = ast.parse(code_string)
-        
-        for node in ast.walk(tree):
-            # Check function complexity by counting branches
-            if isinstance(node, ast.FunctionDef):
-                # Simple branch counting for if/elif/else, for, while
-                branch_count = 0
-                
-                for subnode in ast.walk(node):
-                    if isinstance(subnode, (ast.If, ast.For, ast.While)):
-                        branch_count += 1
-                
-                if branch_count > 10:
-                    issues.append(f"Complexity: Function '{node.name}' at line {node.lineno} has high complexity ({branch_count} branches). Consider refactoring.")
-                elif branch_count > 5:
-                    issues.append(f"Complexity: Function '{node.name}' at line {node.lineno} has moderate complexity ({branch_count} branches). Consider simplifying.")
-    
-    except SyntaxError as e:
-        issues.append(f"Syntax error in student code: {e}")
-    except Exception as e:
-        issues.append(f"Error during complexity check: {str(e)}")
-    
-    return issues
+    return run_ast_rules(code_string, ["complexity"])["complexity"]
+
 
 def check_best_practices(code_string: str) -> List[str]:
     """
@@ -226,54 +139,16 @@ def check_best_practices(code_string: str) -> List[str]:
     Returns:
         List of best practice suggestions
     """
-    issues = []
-    
-    try:
-        tree = ast.parse(code_string)
-        
-        for node in ast.walk(tree):
-            # Check for 'is' vs '==' with None, True, False
-            if isinstance(node, ast.Compare):
-                if isinstance(node.ops[0], (ast.Eq, ast.NotEq)) and len(node.comparators) == 1:
-                    if isinstance(node.comparators[0], ast.Constant):
-                        if node.comparators[0].value is None:
-                            issues.append(f"Best Practice: Use 'is None' instead of '== None' at line {node.lineno}")
-                        elif node.comparators[0].value is True:
-                            issues.append(f"Best Practice: Use 'is True' instead of '== True' at line {node.lineno}")
-                        elif node.comparators[0].value is False:
-                            issues.append(f"Best Practice: Use 'is False' instead of '== False' at line {node.lineno}")
-            
-            # Check for inefficient list/dict building patterns
-            if isinstance(node, ast.FunctionDef):
-                has_list_append_loop = False
-                appended_var = None
-                
-                # Look for loops with list.append()
-                for subnode in ast.walk(node):
-                    if isinstance(subnode, ast.For):
-                        for stmt in subnode.body:
-                            if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call):
-                                if (isinstance(stmt.value.func, ast.Attribute) and 
-                                    stmt.value.func.attr == 'append'):
-                                    has_list_append_loop = True
-                                    appended_var = stmt.value.func.value.id if isinstance(stmt.value.func.value, ast.Name) else None
-                
-                if has_list_append_loop and appended_var:
-                    issues.append(f"Best Practice: Consider using a list comprehension instead of appending in a loop in function '{node.name}' at line {node.lineno}")
-    
-    except SyntaxError as e:
-        issues.append(f"Syntax error in student code: {e}")
-    except Exception as e:
-        issues.append(f"Error during best practices check: {str(e)}")
-    
-    return issues
+    return run_ast_rules(code_string, ["best_practices"])["best_practices"]
 
-def check_unused_variables(code_string: str) -> List[str]:
+
+def check_unused_variables(code_string: str, diagnostics: Union[List[Dict[str, Any]], Exception, None] = None) -> List[str]:
     """
     Check for unused variables and imports.
     
     Args:
         code_string: The Python code to analyze
+        diagnostics: Ruff diagnostics (or the Ruff error) already produced for this code, if any
         
     Returns:
         List of unused variable warnings
@@ -281,28 +156,15 @@ def check_unused_variables(code_string: str) -> List[str]:
     issues = []
     
     try:
-        # Create a temporary file for the code
-        with tempfile.NamedTemporaryFile(suffix='.py', mode='w', delete=False) as temp_file:
-            temp_file_path = temp_file.name
-            temp_file.write(code_string)
-        
-        # Run Ruff with the specific rule for unused variables
-        ruff_result = subprocess.run(
-            ["ruff", "check", "--select=F841", temp_file_path], 
-            capture_output=True, 
-            text=True,
-            timeout=10
-        )
-        
-        # Process the output
-        if ruff_result.stdout:
-            for line in ruff_result.stdout.splitlines():
-                # Clean up the output
-                cleaned_line = line.replace(temp_file_path, "student_code.py")
-                issues.append(f"Unused: {cleaned_line}")
+        if diagnostics is None:
+            diagnostics = lint_code(code_string)
+        elif isinstance(diagnostics, Exception):
+            raise diagnostics
         
-        # Clean up
-        os.unlink(temp_file_path)
+        # The F841 pass is part of the shared Ruff call, so just filter its findings
+        for diagnostic in diagnostics:
+            if diagnostic.get("code") == UNUSED_VARIABLE_CODE:
+                issues.append(f"Unused: {format_diagnostic(diagnostic)}")
     
     except subprocess.TimeoutExpired:
         issues.append("Timeout during unused variable check.")
@@ -311,9 +173,10 @@ def check_unused_variables(code_string: str) -> List[str]:
     
     return issues
 
+
 def run_mypy_check(code_string: str) -> List[str]:
     """
-    Run mypy type checking on the code.
+    Run mypy type checking on the code using a warm dmypy daemon.
     
     Args:
         code_string: The Python code to analyze
@@ -324,43 +187,59 @@ def run_mypy_check(code_string: str) -> List[str]:
     issues = []
     
     try:
-        # Create a temporary file for the code
-        with tempfile.NamedTemporaryFile(suffix='.py', mode='w', delete=False) as temp_file:
-            temp_file_path = temp_file.name
-            temp_file.write(code_string)
-        
-        # Run mypy on the temporary file
-        mypy_result = subprocess.run(
-            ["mypy", "--ignore-missing-imports", temp_file_path], 
-            capture_output=True, 
-            text=True,
-            timeout=10
-        )
+        mypy_result = get_daemon_pool().check(code_string)
         
         # Process the output
-        if mypy_result.stdout:
-            for line in mypy_result.stdout.splitlines():
-                # Clean up the output
-                cleaned_line = line.replace(temp_file_path, "student_code.py")
-                if "error:" in cleaned_line:
-                    issues.append(f"Type: {cleaned_line}")
+        if mypy_result.get("out"):
+            for line in mypy_result["out"].splitlines():
+                if "error:" in line:
+                    issues.append(f"Type: {line}")
         
         # Check for errors in stderr as well
-        if mypy_result.stderr and "error:" in mypy_result.stderr:
-            issues.append(f"Type checking error: {mypy_result.stderr}")
-        
-        # Clean up
-        os.unlink(temp_file_path)
+        if mypy_result.get("err") and "error:" in mypy_result["err"]:
+            issues.append(f"Type checking error: {mypy_result['err']}")
         
         return issues if issues else ["No type checking issues found."]
     
     except FileNotFoundError:
         return ["mypy is not installed or not in PATH. Type checking skipped."]
-    except subprocess.TimeoutExpired:
+    except (subprocess.TimeoutExpired, MypyCheckTimeout):
         return ["Type checking timed out."]
     except Exception as e:
         return [f"Error during type checking: {str(e)}"]
 
+
+# Messages reporting tool failures rather than findings about the code
+TRANSIENT_ERROR_PREFIXES = (
+    "Linting timed out", "Error running linter",
+    "Timeout during unused variable check", "Error checking for unused variables",
+    "Type checking timed out", "Type checking error", "Error during type checking",
+    "mypy is not installed"
+)
+
+# How the partial-analysis notice names checks that were left out
+CHECK_NAMES = {
+    "style": "style checks",
+    "security": "security checks",
+    "linter": "linting",
+    "docstrings": "function checks",
+    "complexity": "complexity checks",
+    "mypy": "type checking",
+    "best_practices": "best practice checks",
+    "unused": "unused variable checks"
+}
+
+DEFAULT_OPTIONS = {
+    "style": True,
+    "security": True,
+    "linter": True,
+    "docstrings": True,
+    "complexity": False,
+    "mypy": False,
+    "best_practices": True,
+    "unused": True
+}
+
 def run_static_analysis_on_notebook(notebook_file_path: str, options: Dict[str, bool] = None, difficulty: str = "beginner") -> Dict[str, List[str]]:
     """
     Main function for static analysis in Milestone 1.
@@ -374,74 +253,309 @@ def run_static_analysis_on_notebook(notebook_file_path: str, options: Dict[str,
     Returns:
         Dictionary with results from different types of analysis
     """
-    # Default all options to True if not provided
-    if options is None:
-        options = {
-            "style": True,
-            "security": True,
-            "linter": True,
-            "docstrings": True,
-            "complexity": False,
-            "mypy": False,
-            "best_practices": True,
-            "unused": True
-        }
-    
-    # Initialize empty results
-    results = {}
-    
     # Extract code from file (either notebook or Python script)
-    code_to_analyze = get_code_from_file(notebook_file_path)
-    if code_to_analyze is None:
+    if not str(notebook_file_path).endswith('.ipynb'):
+        code_to_analyze = get_code_from_file(notebook_file_path)
+        if code_to_analyze is None:
+            return {"error": ["Could not extract code from file."]}
+        return run_static_analysis_on_code(code_to_analyze, options, difficulty)
+    
+    code_cells = extract_code_cells_from_notebook(notebook_file_path)
+    if code_cells is None:
         return {"error": ["Could not extract code from file."]}
+    return run_static_analysis_on_cells(code_cells, options, difficulty)
+
+def run_static_analysis_on_cells(
+    code_cells: List[Tuple[int, str]],
+    options: Dict[str, bool] = None,
+    difficulty: str = "beginner",
+    backlogged: bool = False
+) -> Dict[str, List[str]]:
+    """
+    Run the configured static analysis checks on a notebook's code cells.
+    
+    Args:
+        code_cells: List of (cell index, source) for the notebook's code cells
+        options: Dictionary of check options to enable/disable
+        difficulty: Difficulty level (beginner, intermediate, advanced)
+        backlogged: Whether the grading queue was over its threshold when the
+            submission was admitted (see run_static_analysis_on_code)
+        
+    Returns:
+        Dictionary with results from different types of analysis, with each
+        finding pointing at the cell it is in
+    """
+    # Keep the cells so unchanged ones can reuse their earlier findings,
+    # and so findings can point at the cell they are in
+    cell_sources = [source for _, source in code_cells]
+    code_to_analyze = "\n".join(cell_sources)
+    results = run_static_analysis_on_code(code_to_analyze, options, difficulty, cell_sources, backlogged)
+    return add_cell_locations(results, SourceMap(code_to_analyze, code_cells))
+
+def describe_syntax_error(error: SyntaxError) -> str:
+    """
+    Describe a syntax error in one message, e.g. "Syntax error in student code at line 12: expected ':'".
+    
+    The line is given the way add_cell_locations recognizes, so in a
+    notebook the message points at the cell.
+    """
+    if error.lineno is None:
+        return f"Syntax error in student code: {error.msg}"
+    return f"Syntax error in student code at line {error.lineno}: {error.msg}"
+
+# Line references in analyzer messages: AST rules ("at line N"), Ruff and mypy
+# diagnostics ("student_code.py:N:..."), and linter messages simplified for beginners ("Line N:")
+_LINE_REFERENCE = re.compile(rf"at line (\d+)|^(?:Unused: |Type: )?{re.escape(STUDENT_FILENAME)}:(\d+):|^Line (\d+):")
+
+def add_cell_locations(results: Dict[str, List[str]], source_map: SourceMap) -> Dict[str, List[str]]:
+    """
+    Point each finding at the notebook cell it is in.
+    
+    Line numbers in findings count lines of all code cells joined together,
+    which students can't find in their notebook; each message that refers to
+    a line gets its cell and line within the cell appended.
+    
+    Args:
+        results: Static analysis results for the notebook's extracted code
+        source_map: Source map of the extracted code and its cells
+        
+    Returns:
+        The results with cell locations added
+    """
+    located = {}
+    for check_type, messages in results.items():
+        located[check_type] = []
+        for message in messages:
+            match = _LINE_REFERENCE.search(message)
+            location = source_map.describe(int(next(group for group in match.groups() if group))) if match else None
+            located[check_type].append(f"{message} ({location})" if location else message)
+    return located
+
+def run_static_analysis_on_code(
+    code_to_analyze: str,
+    options: Dict[str, bool] = None,
+    difficulty: str = "beginner",
+    cell_sources: Optional[List[str]] = None,
+    backlogged: bool = False
+) -> Dict[str, List[str]]:
+    """
+    Run the configured static analysis checks on extracted code.
+    Results are cached by code content, options, difficulty and tool versions.
+    
+    Under load (the grading queue was backlogged when the submission was
+    admitted, or this process's analyses have been slow), the checks in
+    DEFERRABLE_CHECKS are left out and run later (see load_shedding).
+    
+    Args:
+        code_to_analyze: The Python code to analyze
+        options: Dictionary of check options to enable/disable
+        difficulty: Difficulty level (beginner, intermediate, advanced)
+        cell_sources: The notebook's code cells, which joined with newlines
+            make up `code_to_analyze`; when given, the AST checks run per cell
+        backlogged: Whether the grading queue was over DEGRADE_QUEUE_DEPTH
+            when the submission was admitted, decided where the queue is counted
+        
+    Returns:
+        Dictionary with results from different types of analysis
+    """
+    # Default all options to True if not provided
+    if options is None:
+        options = DEFAULT_OPTIONS
     
     if not code_to_analyze.strip():
         return {"error": ["No Python code found in the file."]}
     
-    # Run checks based on enabled options
+    cache = get_result_cache()
+    cache_key = None
+    if cache is not None:
+        cache_key = make_cache_key(
+            "static_analysis",
+            code=hash_code(code_to_analyze),
+            # Per-cell AST checks find other things than a whole-file run of the same code
+            cells=[len(source) for source in cell_sources] if cell_sources is not None else None,
+            options=options,
+            difficulty=difficulty
+        )
+        cached_results = cache.get(cache_key)
+        if cached_results is not None:
+            return cached_results
+    
+    # Under load, give the core feedback now and leave the expensive checks for later
+    deferrable = [
+        option for option in settings.DEFERRABLE_CHECKS
+        if options.get(option, DEFAULT_OPTIONS.get(option, False))
+    ]
+    if deferrable and (backlogged or get_load_monitor().under_pressure()):
+        core_options = {**options, **{option: False for option in deferrable}}
+        results = dict(run_static_analysis_on_code(code_to_analyze, core_options, difficulty, cell_sources))
+        if "syntax_errors" in results:
+            # Nothing more would be checked anyway
+            return results
+        # The full analysis is only worth running if the cache keeps it for the next upload
+        queued = cache is not None and defer_until_idle(
+            _run_deferred_analysis, code_to_analyze, options, difficulty, cell_sources, cache_key
+        )
+        results["partial_analysis"] = [partial_analysis_notice(deferrable, queued)]
+        return results
+    
+    return _analyze_and_cache(code_to_analyze, options, difficulty, cell_sources, cache_key)
+
+def _analyze_and_cache(
+    code_to_analyze: str,
+    options: Dict[str, bool],
+    difficulty: str,
+    cell_sources: Optional[List[str]],
+    cache_key: Optional[str]
+) -> Dict[str, List[str]]:
+    start = time.perf_counter()
+    results = _run_static_analysis(code_to_analyze, options, difficulty, cell_sources)
+    get_load_monitor().record_latency(time.perf_counter() - start)
+    
+    cache = get_result_cache()
+    if cache is not None and cache_key is not None and _is_cacheable(results):
+        cache.set(cache_key, results)
+    return results
+
+def _run_deferred_analysis(
+    code_to_analyze: str,
+    options: Dict[str, bool],
+    difficulty: str,
+    cell_sources: Optional[List[str]],
+    cache_key: str
+) -> None:
+    # The same code may have been queued again while it waited
+    cache = get_result_cache()
+    if cache is not None and cache.get(cache_key) is None:
+        _analyze_and_cache(code_to_analyze, options, difficulty, cell_sources, cache_key)
+
+def partial_analysis_notice(left_out: List[str], queued: bool) -> str:
+    """
+    Explain to the student that their report is partial.
+    
+    Args:
+        left_out: Options of the checks that weren't run
+        queued: Whether the full analysis was queued
+        
+    Returns:
+        The notice for the report's "partial_analysis" entry
+    """
+    names = [CHECK_NAMES.get(option, option) for option in left_out]
+    checks = names[0] if len(names) == 1 else f"{', '.join(names[:-1])} and {names[-1]}"
+    if queued:
+        return (
+            f"Partial — full analysis queued. The server is busy, so {checks} will run once it is quieter; "
+            "upload the same file again in a few minutes for the full report."
+        )
+    return f"Partial — the server is busy, so {checks} didn't run. Upload the file again later for the full report."
+
+def _is_cacheable(results: Dict[str, List[str]]) -> bool:
+    # Tool failures and timeouts are transient, so don't remember them
+    return not any(
+        message.startswith(TRANSIENT_ERROR_PREFIXES)
+        for messages in results.values() for message in messages
+    )
+
+def _run_static_analysis(
+    code_to_analyze: str,
+    options: Dict[str, bool],
+    difficulty: str,
+    cell_sources: Optional[List[str]] = None
+) -> Dict[str, List[str]]:
+    # The analyzers are independent, so they run as a graph: Ruff and mypy
+    # wait on their subprocesses on the analysis pool while the AST checks
+    # run here, and the linter and unused-variable feedback are read from
+    # the one Ruff call once it is done. Everything waits for one parse of
+    # the code; if it doesn't parse, none of them run and the syntax error
+    # is reported on its own.
+    #
+    # All AST-based checks share one parse and one traversal; for notebooks
+    # there is one per cell, and only cells that changed since an earlier
+    # submission are analyzed again. Ruff and mypy look across cells
+    # (undefined and unused names, types), so they always see the whole code.
+    ast_options = [
+        option for option, (_, _, default) in AST_CHECKS.items()
+        if options.get(option, default)
+    ]
+    
+    def parse(_):
+        try:
+            return ast.parse(code_to_analyze)
+        except SyntaxError as e:
+            return Halted("parse", e)
+    
+    def run_ast(inputs):
+        if cell_sources is not None:
+            return run_ast_rules_by_cell(cell_sources, ast_options)
+        return run_ast_rules(inputs["parse"], ast_options)
+    
+    def run_ruff(_):
+        try:
+            return lint_code(code_to_analyze)
+        except Exception as e:
+            # Let each check report the failure in its own words
+            return e
+    
+    stages = [AnalysisStage("parse", parse, inline=True), AnalysisStage("ast", run_ast, after=("parse",), inline=True)]
+    if options.get("linter", True) or options.get("unused", True):
+        stages.append(AnalysisStage("ruff", run_ruff, after=("parse",)))
+    if options.get("linter", True):
+        stages.append(AnalysisStage(
+            "linter_feedback", lambda inputs: run_ruff_linter(code_to_analyze, inputs["ruff"]),
+            after=("ruff",), inline=True
+        ))
+    if options.get("unused", True):
+        stages.append(AnalysisStage(
+            "unused_variables", lambda inputs: check_unused_variables(code_to_analyze, inputs["ruff"]),
+            after=("ruff",), inline=True
+        ))
+    if options.get("mypy", False):
+        # Only run mypy if explicitly enabled - it might not be installed
+        stages.append(AnalysisStage("type_checking", lambda _: run_mypy_check(code_to_analyze), after=("parse",)))
+    
+    stage_results = run_stage_graph(stages)
+    
+    # Merge in a fixed order, however the stages finished
+    def ran(stage):
+        return stage in stage_results and not isinstance(stage_results[stage], Halted)
+    
+    results = {}
+    ast_results = stage_results["ast"]
+    if isinstance(ast_results, Halted):
+        results["syntax_errors"] = [describe_syntax_error(ast_results.detail)]
+        # The cells that parse can still be checked on their own
+        ast_results = run_ast_rules_on_parsing_cells(cell_sources, ast_options) if cell_sources is not None else {}
+    
+    def add_ast_results(option):
+        if option in ast_results:
+            result_key, empty_message, _ = AST_CHECKS[option]
+            results[result_key] = ast_results[option] if ast_results[option] else [empty_message]
     
     # Security checks (always run for safety)
-    if options.get("security", True):
-        ast_issues = [issue for issue in custom_ast_checks(code_to_analyze) 
-                     if issue.startswith("Security:")]
-        results["security_checks"] = ast_issues if ast_issues else ["No security issues found."]
+    add_ast_results("security")
     
     # Style checks
-    if options.get("style", True):
-        style_issues = [issue for issue in custom_ast_checks(code_to_analyze) 
-                       if issue.startswith("Style:")]
-        results["style_checks"] = style_issues if style_issues else ["No style issues found."]
+    add_ast_results("style")
     
     # Function style checks
-    if options.get("docstrings", True):
-        func_issues = style_check_functions(code_to_analyze)
-        results["function_checks"] = func_issues if func_issues else ["No function style issues found."]
+    add_ast_results("docstrings")
     
     # Linter feedback
-    if options.get("linter", True):
-        linter_results = run_ruff_linter(code_to_analyze)
-        results["linter_feedback"] = linter_results
+    if ran("linter_feedback"):
+        results["linter_feedback"] = stage_results["linter_feedback"]
     
     # Complexity checks
-    if options.get("complexity", False):
-        complexity_issues = check_code_complexity(code_to_analyze)
-        results["complexity_checks"] = complexity_issues if complexity_issues else ["No complexity issues found."]
+    add_ast_results("complexity")
     
     # Best practices
-    if options.get("best_practices", True):
-        best_practice_issues = check_best_practices(code_to_analyze)
-        results["best_practices"] = best_practice_issues if best_practice_issues else ["No best practice issues found."]
+    add_ast_results("best_practices")
     
     # Unused variables
-    if options.get("unused", True):
-        unused_issues = check_unused_variables(code_to_analyze)
-        results["unused_variables"] = unused_issues if unused_issues else ["No unused variables found."]
+    if ran("unused_variables"):
+        results["unused_variables"] = stage_results["unused_variables"] or ["No unused variables found."]
     
     # Type checking (mypy)
-    if options.get("mypy", False):
-        # Only run mypy if explicitly enabled - it might not be installed
-        mypy_issues = run_mypy_check(code_to_analyze)
-        results["type_checking"] = mypy_issues
+    if ran("type_checking"):
+        results["type_checking"] = stage_results["type_checking"]
     
     # Adjust output based on difficulty level
     if difficulty == "beginner":
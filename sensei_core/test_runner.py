@@ -1 +1,414 @@
 # Executes test harness logic on student functions
+import atexit
+import json
+import os
+import pickle
+import queue
+import secrets
+import signal
+import struct
+import subprocess
+import sys
+import threading
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Dict, List, Any, Optional, BinaryIO, Tuple
+
+import config
+
+HARNESS_MODULE = "test_harness_actual.harness"
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+_HEADER = struct.Struct("!Q")
+
+# Extra seconds a worker gets to report its own timeouts before it is killed
+KILL_GRACE_SECONDS = 1.0
+
+# Largest results message the parent accepts from a worker
+MAX_RESULTS_BYTES = 64 * 1024 * 1024
+
+# Fields a test result may have, and the types the grader relies on ("actual" is any JSON value)
+RESULT_FIELD_TYPES = {
+    "test_id": (str,),
+    "description": (str,),
+    "passed": (bool,),
+    "status": (str,),
+    "points": (int, float),
+    "error": (str, type(None)),
+    "actual": (object,),
+    "elapsed": (int, float, type(None)),
+    "timings": (dict, type(None)),
+}
+
+
+class SandboxProtocolError(Exception):
+    """A sandbox worker's reply isn't well-formed results for the job it was sent."""
+
+
+def _write_frame(stream: BinaryIO, data: bytes) -> None:
+    stream.write(_HEADER.pack(len(data)) + data)
+    stream.flush()
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    # Unbuffered streams may return less than asked for
+    chunks = []
+    while size > 0:
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _read_frame(stream: BinaryIO, max_size: Optional[int] = None) -> bytes:
+    header = _read_exact(stream, _HEADER.size)
+    if len(header) < _HEADER.size:
+        raise EOFError("Sandbox pipe closed")
+    size = _HEADER.unpack(header)[0]
+    if max_size is not None and size > max_size:
+        raise SandboxProtocolError(f"Results message of {size} bytes is over the {max_size} byte limit")
+    data = _read_exact(stream, size)
+    if len(data) < size:
+        raise EOFError("Sandbox pipe closed")
+    return data
+
+
+def send_message(stream: BinaryIO, message: Any) -> None:
+    """Write one length-prefixed pickled message to a sandbox worker (parent to child only)."""
+    _write_frame(stream, pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def recv_message(stream: BinaryIO) -> Any:
+    """Read one message written by send_message; raises EOFError if the pipe closed."""
+    return pickle.loads(_read_frame(stream))
+
+
+def send_results(
+    stream: BinaryIO,
+    job_id: Optional[str],
+    results: List[Dict[str, Any]],
+    recycle: bool = False
+) -> None:
+    """
+    Write one job's results back to the parent as length-prefixed JSON.
+
+    Results travel as plain data because the worker runs student code: the
+    parent must never unpickle anything it sends. Tuples arrive as lists, as
+    they do from Celery's JSON results.
+
+    Args:
+        stream: The worker's results channel
+        job_id: The "job_id" of the job these results answer
+        results: The job's test results
+        recycle: Ask the parent to replace this worker (student code left threads running)
+    """
+    reply = {"job_id": job_id, "results": results, "recycle": recycle}
+    _write_frame(stream, json.dumps(reply).encode("utf-8"))
+
+
+def check_results(results: Any) -> List[Dict[str, Any]]:
+    """
+    Check that a worker's results are a list of test results the grader can use.
+
+    Raises:
+        SandboxProtocolError: If they aren't
+    """
+    if not isinstance(results, list):
+        raise SandboxProtocolError("Results are not a list")
+    for result in results:
+        if not isinstance(result, dict) or not isinstance(result.get("test_id"), str):
+            raise SandboxProtocolError("Result without a test id")
+        if not isinstance(result.get("passed"), bool):
+            raise SandboxProtocolError(f"Result {result['test_id']!r} has no passed flag")
+        for field, value in result.items():
+            if field not in RESULT_FIELD_TYPES or not isinstance(value, RESULT_FIELD_TYPES[field]):
+                raise SandboxProtocolError(f"Result {result['test_id']!r} has an unexpected field {field!r}")
+    return results
+
+
+def recv_results(stream: BinaryIO, job_id: Optional[str]) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Read the results of job `job_id` written by send_results.
+
+    Args:
+        stream: Unbuffered read end of the worker's results channel, so any
+            data after the reply is left in the pipe where it can be seen
+        job_id: The "job_id" of the job that was sent
+
+    Returns:
+        The job's results, and whether the worker asked to be replaced
+
+    Raises:
+        EOFError: If the pipe closed
+        SandboxProtocolError: If the reply is malformed or answers another job
+    """
+    try:
+        reply = json.loads(_read_frame(stream, MAX_RESULTS_BYTES))
+    except ValueError as e:
+        raise SandboxProtocolError(f"Results are not valid JSON: {e}") from e
+    if not isinstance(reply, dict) or reply.get("job_id") != job_id:
+        raise SandboxProtocolError("Reply does not answer the job that was sent")
+    return check_results(reply.get("results")), reply.get("recycle") is not False
+
+
+def _worker_env() -> Dict[str, str]:
+    """
+    Environment for sandbox workers: single-threaded numeric libraries fit the
+    memory limit, and only pytest's own plugins are loaded for assignment tests.
+    """
+    env = dict(os.environ)
+    for variable in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        env[variable] = "1"
+    env["PYTEST_DISABLE_PLUGIN_AUTOLOAD"] = "1"
+    return env
+
+
+def _describe_exit(returncode: Optional[int]) -> str:
+    """Explain why a sandbox worker died."""
+    if returncode is not None and returncode < 0:
+        if hasattr(signal, "SIGXCPU") and -returncode == signal.SIGXCPU:
+            return "CPU time limit exceeded"
+        if -returncode == signal.SIGKILL:
+            return "Test process was killed (memory limit exceeded?)"
+        return f"Test process was terminated by signal {-returncode}"
+    return f"Test process exited unexpectedly (exit code {returncode})"
+
+
+def _failed_results(job: Dict[str, Any], error: str, status: str = "error") -> List[Dict[str, Any]]:
+    """
+    Build a failed result for each test of a job whose worker didn't answer.
+
+    The results are flagged with "sandbox_error" so they aren't cached: a
+    timeout may only mean the server was busy.
+    """
+    results = [
+        {
+            "test_id": test_case.get("test_id", "unknown"),
+            "description": test_case.get("description", ""),
+            "points": test_case.get("points", 0),
+            "passed": False,
+            "status": status,
+            "error": error,
+            "elapsed": 0.0,
+            "sandbox_error": True
+        }
+        for test_case in job.get("tests", []) + job.get("scaling_tests", [])
+    ]
+    if job.get("pytest_file") or not results:
+        results.append({
+            "test_id": "sandbox_error",
+            "description": "Tests could not be completed",
+            "passed": False,
+            "status": status,
+            "error": error,
+            "sandbox_error": True
+        })
+    return results
+
+
+class SandboxWorker:
+    """
+    One warm interpreter that runs student code under resource limits.
+
+    The worker process imports the harness (and with it the parser, pytest and
+    YAML) as soon as it starts, before any job is sent. It is replaced after
+    `max_jobs` jobs, or as soon as it crashes or overruns its time limit; the
+    replacement starts immediately so it has warmed up by the next job.
+    """
+
+    def __init__(self, limits: Dict[str, Any]):
+        self.limits = limits
+        self.jobs_run = 0
+        self.process: Optional[subprocess.Popen] = None
+
+    def start(self) -> None:
+        """Start the worker process and send it its limits."""
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", HARNESS_MODULE],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=REPO_ROOT,
+            env=_worker_env()
+        )
+        self.jobs_run = 0
+        send_message(self.process.stdin, self.limits)
+
+    def stop(self) -> None:
+        """Ask the worker to exit, killing it if it doesn't."""
+        if self.process is None:
+            return
+        try:
+            send_message(self.process.stdin, None)
+            self.process.stdin.close()
+            self.process.wait(timeout=1)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+        self.process.stdout.close()
+        self.process = None
+
+    def restart(self) -> None:
+        """Replace the worker with a fresh process."""
+        self.stop()
+        self.start()
+
+    def run(self, job: Dict[str, Any], timeout: float) -> List[Dict[str, Any]]:
+        """
+        Send one job to the worker and wait for its results.
+
+        Args:
+            job: Function source, name, test cases and pytest file (see harness.run_job)
+            timeout: Wall-clock seconds to wait for the results
+
+        Returns:
+            List of test results; on a crash or timeout, a failed result per test
+        """
+        if self.process is None or self.process.poll() is not None:
+            self.restart()
+
+        # The reply must name this job, so a message student code wrote to the pipe
+        # earlier can't be taken for its results
+        job = {**job, "job_id": secrets.token_hex(16)}
+        try:
+            send_message(self.process.stdin, job)
+            if wait([self.process.stdout], timeout):
+                results, recycle = recv_results(self.process.stdout.raw, job["job_id"])
+                if wait([self.process.stdout], 0):
+                    # Student code wrote to the pipe too; nothing from this worker can be trusted
+                    raise SandboxProtocolError("Unexpected data after the results")
+                self.jobs_run += 1
+                if recycle or self.jobs_run >= self.limits["max_jobs"]:
+                    self.restart()
+                return results
+            error, status = f"Tests timed out after {timeout:.2f} seconds", "timed_out"
+        except SandboxProtocolError as e:
+            error, status = f"Test process sent invalid results: {e}", "error"
+        except (EOFError, OSError):
+            try:
+                self.process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                pass
+            error = _describe_exit(self.process.returncode)
+            status = "timed_out" if error == "CPU time limit exceeded" else "error"
+
+        self.process.kill()
+        self.restart()
+        return _failed_results(job, error, status)
+
+
+class SandboxPool:
+    """
+    Fixed-size pool of sandbox workers; each job gets a worker to itself.
+    """
+
+    def __init__(self, size: int, limits: Dict[str, Any], job_timeout: float):
+        self.limits = limits
+        self.job_timeout = job_timeout
+        self._idle: "queue.Queue[SandboxWorker]" = queue.Queue()
+        self._workers = [SandboxWorker(limits) for _ in range(max(1, size))]
+        for worker in self._workers:
+            worker.start()
+            self._idle.put(worker)
+
+    def run(self, job: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Run one job on the next idle worker.
+
+        The worker enforces the job's time limits itself; the pool only steps in
+        (and kills the worker) once the job's budget plus a grace period has
+        passed without an answer. The budget sent to the worker is capped so
+        that this stays within `job_timeout`: the worker then stops on its own
+        and returns the results it has, rather than being killed with them.
+
+        Args:
+            job: Function source, name, test cases, pytest file and time limits
+                (see harness.run_job)
+
+        Returns:
+            List of test results
+        """
+        budget = job.get("budget")
+        if budget is not None and budget <= 0:
+            return _failed_results(job, "Submission time limit reached", "timed_out")
+        max_budget = max(self.job_timeout - KILL_GRACE_SECONDS, 0.0)
+        budget = max_budget if budget is None else min(budget, max_budget)
+        job = {**job, "budget": budget}
+        timeout = budget + KILL_GRACE_SECONDS
+
+        worker = self._idle.get()
+        try:
+            return worker.run(job, timeout)
+        finally:
+            self._idle.put(worker)
+
+    def shutdown(self) -> None:
+        """Stop every worker."""
+        for worker in self._workers:
+            worker.stop()
+
+
+_pool: Optional[SandboxPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """
+    Get this process's sandbox pool, starting its workers on first use.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A pool inherited through fork belongs to the parent; start our own
+        if _pool is None or _pool_pid != os.getpid():
+            limits = {
+                "cpu_seconds": config.SANDBOX_CPU_SECONDS,
+                "memory_mb": config.SANDBOX_MEMORY_MB,
+                "max_open_files": config.SANDBOX_MAX_OPEN_FILES,
+                "max_jobs": config.SANDBOX_MAX_JOBS_PER_WORKER,
+            }
+            _pool = SandboxPool(config.SANDBOX_POOL_SIZE, limits, config.SANDBOX_JOB_TIMEOUT)
+            _pool_pid = os.getpid()
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def run_function_tests_in_sandbox(
+    func_name: str,
+    func_source: str,
+    tests: List[Dict[str, Any]],
+    pytest_file: Optional[str] = None,
+    time_limit: Optional[float] = None,
+    budget: Optional[float] = None,
+    scaling_tests: Optional[List[Dict[str, Any]]] = None,
+    module_code: Optional[bytes] = None
+) -> List[Dict[str, Any]]:
+    """
+    Compile a student function and run its tests in a sandbox worker.
+
+    Args:
+        func_name: Name of the function
+        func_source: Source code of the function
+        tests: Test cases from the assignment configuration
+        pytest_file: Pytest file to run against the function, if any
+        time_limit: Seconds each test case may take, if limited
+        budget: Seconds left of the submission's total execution time, if limited
+        scaling_tests: Runtime-scaling tests from the assignment configuration
+        module_code: Marshalled module-level code the function depends on, run before it
+
+    Returns:
+        List of test results
+    """
+    job = {
+        "function_name": func_name,
+        "function_source": func_source,
+        "module_code": module_code,
+        "tests": tests,
+        "scaling_tests": scaling_tests or [],
+        "pytest_file": pytest_file,
+        "time_limit": time_limit,
+        "budget": budget,
+    }
+    return get_sandbox_pool().run(job)
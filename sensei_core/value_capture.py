@@ -0,0 +1,184 @@
+"""
+Bounded capture of the values tested functions return.
+
+A test result keeps the value the function returned, and the result crosses
+the sandbox pipe, the result cache and possibly a process pool or Celery
+backend. Plain data (None, bools, numbers, strings, and lists, tuples and
+dicts of them) whose repr fits in RESULT_VALUE_MAX_BYTES is kept as it is.
+Anything larger or not plain (arrays, generators, objects) is replaced by a
+summary that stays within the budget however large the value is:
+
+    {"truncated": True, "type": "list", "length": 10000000,
+     "preview": "[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, ...]", "digest": "3f2a..."}
+"""
+import hashlib
+import pickle
+import reprlib
+from typing import Dict, Any, Optional
+
+import config as settings
+
+# Kept as they are when they fit; exact types, so subclasses with their own behaviour are summarized
+_PLAIN_SCALARS = frozenset({type(None), bool, int, float, str})
+_PLAIN_CONTAINERS = frozenset({list, tuple, dict})
+# Dict keys JSON can encode (Celery results are JSON)
+_PLAIN_KEYS = frozenset({type(None), bool, int, float, str})
+
+
+class _PreviewRepr(reprlib.Repr):
+    def repr_int(self, x, level):
+        # Converting a huge int to a string is slow, and refused past sys.get_int_max_str_digits()
+        if x.bit_length() > 4 * self.maxlong:
+            return f"<int with {x.bit_length()} bits>"
+        return super().repr_int(x, level)
+
+
+_preview = _PreviewRepr()
+_preview.maxlevel = 3
+_preview.maxlist = _preview.maxtuple = _preview.maxset = _preview.maxfrozenset = _preview.maxdeque = 10
+_preview.maxdict = 10
+_preview.maxstring = 200
+_preview.maxlong = 100
+_preview.maxother = 200
+
+
+class _DigestWriter:
+    """File-like sink that hashes what is written to it, so a pickle is never held whole."""
+
+    def __init__(self):
+        self.hasher = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self.hasher.update(data)
+        return len(data)
+
+
+def value_digest(value: Any) -> Optional[str]:
+    """
+    Hash a value without keeping a serialized copy of it.
+
+    Equal digests mean equal values; equal values of different types (1 and
+    1.0) or built differently (dicts in another insertion order) may differ.
+
+    Args:
+        value: The value to hash
+
+    Returns:
+        SHA-256 hex digest, or None if the value can't be serialized
+    """
+    writer = _DigestWriter()
+    try:
+        if type(value).__module__ == "numpy" and getattr(value, "dtype", None) is not None and value.dtype.kind != "O":
+            # Hash the array's buffer directly rather than a pickled copy of it
+            import numpy as np
+
+            writer.write(f"{value.dtype.str}{value.shape}".encode("utf-8"))
+            writer.write(np.ascontiguousarray(value).reshape(-1).view(np.uint8))
+        else:
+            pickle.Pickler(writer, protocol=5).dump(value)
+    except Exception:
+        return None
+    return writer.hasher.hexdigest()
+
+
+def _plain_budget_left(value: Any, budget: int) -> int:
+    """
+    Walk plain data until its repr would exceed `budget`.
+
+    Returns:
+        The budget left after the value's repr, or a negative number if the
+        value isn't plain data or doesn't fit; never looks at more of the
+        value than the budget allows
+    """
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        kind = type(item)
+        if kind is str:
+            budget -= len(item) + 2
+        elif kind is int:
+            # Roughly its decimal digits, without converting a huge int to a string
+            budget -= item.bit_length() // 3 + 2
+        elif kind in _PLAIN_SCALARS:
+            budget -= len(repr(item))
+        elif kind in _PLAIN_CONTAINERS:
+            budget -= 2 + 2 * len(item)
+            if budget < 0:
+                return budget
+            if kind is dict:
+                for key, entry in item.items():
+                    if type(key) not in _PLAIN_KEYS:
+                        return -1
+                    stack.append(key)
+                    stack.append(entry)
+            else:
+                stack.extend(item)
+        else:
+            return -1
+        if budget < 0:
+            return budget
+    return budget
+
+
+def _type_name(value: Any) -> str:
+    kind = type(value)
+    return kind.__qualname__ if kind.__module__ == "builtins" else f"{kind.__module__}.{kind.__qualname__}"
+
+
+def summarize_value(value: Any, max_bytes: int) -> Dict[str, Any]:
+    """
+    Describe a value within a byte budget: its type, size, a preview and a digest.
+
+    Args:
+        value: The value to describe
+        max_bytes: Most characters the preview may use
+
+    Returns:
+        Summary dictionary with "truncated" set to True
+    """
+    summary: Dict[str, Any] = {"truncated": True, "type": _type_name(value)}
+
+    shape = getattr(value, "shape", None)
+    if isinstance(shape, tuple):
+        # NumPy arrays and pandas objects
+        summary["shape"] = list(shape)
+        if getattr(value, "dtype", None) is not None:
+            summary["dtype"] = str(value.dtype)
+    elif isinstance(value, (str, bytes, list, tuple, dict, set, frozenset)):
+        summary["length"] = len(value)
+
+    try:
+        preview = _preview.repr(value)
+    except Exception:
+        preview = f"<{summary['type']} object>"
+    if len(preview) > max_bytes:
+        preview = preview[:max(max_bytes - 3, 0)] + "..."
+    summary["preview"] = preview
+
+    if settings.RESULT_VALUE_DIGESTS:
+        summary["digest"] = value_digest(value)
+    return summary
+
+
+def capture_value(value: Any, max_bytes: Optional[int] = None) -> Any:
+    """
+    Prepare a tested function's return value for its test result.
+
+    Args:
+        value: Value the function returned
+        max_bytes: Byte budget; defaults to RESULT_VALUE_MAX_BYTES
+
+    Returns:
+        The value itself if it is plain data within the budget, otherwise its
+        summary (see summarize_value)
+    """
+    if max_bytes is None:
+        max_bytes = settings.RESULT_VALUE_MAX_BYTES
+
+    # NumPy scalars (numpy.float64 and friends) are kept as the Python number they hold
+    if type(value).__module__ == "numpy" and getattr(value, "ndim", None) == 0 and hasattr(value, "item"):
+        value = value.item()
+
+    if _plain_budget_left(value, max_bytes) >= 0:
+        return value
+    return summarize_value(value, max_bytes)
@@ -1 +1,302 @@
 # Contains test harness logic
+"""
+Child side of the sandbox pool: runs student functions against their test cases.
+
+A sandbox worker runs this module (`python -m test_harness_actual.harness`),
+applies its resource limits, and then serves jobs from its stdin until it is
+recycled. Each job carries one function's source and all of its test cases so
+a function is graded in a single round trip.
+"""
+import contextlib
+import io
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Dict, List, Any, BinaryIO, Optional
+
+from sensei_core.complexity import run_scaling_test
+from sensei_core.notebook_parser import compile_function, run_function_test, run_pytest_tests
+from sensei_core.test_runner import KILL_GRACE_SECONDS, recv_message, send_results
+
+# Seconds pytest may run past the budget to report the tests it stopped, within the parent's
+# grace period; every test's call is already cut short at the budget itself
+PYTEST_WRAP_UP_SECONDS = KILL_GRACE_SECONDS / 2
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def apply_limits(limits: Dict[str, Any]) -> None:
+    """
+    Apply the worker's memory, file-descriptor and total CPU limits.
+
+    Args:
+        limits: Dictionary with "memory_mb", "max_open_files", "cpu_seconds" and "max_jobs"
+    """
+    if resource is None:
+        print("Warning: resource limits are not supported on this platform; running unlimited.")
+        return
+
+    memory_bytes = int(limits["memory_mb"]) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (limits["max_open_files"], limits["max_open_files"]))
+
+    # The hard CPU limit covers every job this worker may run before it is recycled;
+    # the soft limit is moved forward before each job (see set_job_cpu_budget)
+    cpu_hard = int(limits["cpu_seconds"] * limits["max_jobs"]) + 1
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_hard, cpu_hard))
+
+
+def set_job_cpu_budget(cpu_seconds: float) -> None:
+    """Allow the next job `cpu_seconds` of CPU time on top of what the worker has used."""
+    if resource is None:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+class TimeLimitExceeded(BaseException):
+    """Raised inside student code when a test runs past its time limit."""
+
+
+@contextlib.contextmanager
+def time_limit(seconds: Optional[float], message: str = ""):
+    """
+    Interrupt the enclosed code after `seconds` of wall-clock time.
+
+    Raises TimeLimitExceeded(message), which derives from BaseException so
+    `except Exception` in student code doesn't swallow it; code that still
+    does (or is stuck in C) is caught by the parent's own deadline, which
+    kills the worker. Limits can be nested: an enclosing limit is re-armed
+    with what is left of it when the inner one ends.
+    """
+    if seconds is None or not hasattr(signal, "setitimer"):
+        yield
+        return
+
+    def on_timeout(signum, frame):
+        raise TimeLimitExceeded(message)
+
+    previous = signal.signal(signal.SIGALRM, on_timeout)
+    outer_delay, _ = signal.setitimer(signal.ITIMER_REAL, max(seconds, 0.001))
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+        if outer_delay:
+            signal.setitimer(signal.ITIMER_REAL, max(outer_delay - (time.monotonic() - start), 0.001))
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _test_limit(time_limit_seconds: Optional[float], deadline: Optional[float]) -> Optional[float]:
+    """The tighter of the per-test limit and what is left of the submission's budget."""
+    limits = [limit for limit in (time_limit_seconds, _remaining(deadline)) if limit is not None]
+    return min(limits) if limits else None
+
+
+def timed_out_result(test_case: Dict[str, Any], error: str, elapsed: float) -> Dict[str, Any]:
+    """Build the result of a configured test that ran past its time limit."""
+    return {
+        "test_id": test_case.get("test_id", "unknown"),
+        "description": test_case.get("description", ""),
+        "passed": False,
+        "status": "timed_out",
+        "points": test_case.get("points", 0),
+        "error": error,
+        "actual": None,
+        "elapsed": elapsed
+    }
+
+
+def run_job(job: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Compile one student function and run its test cases.
+
+    Each configured test and each pytest test is limited to the job's
+    "time_limit" (if any) and all of the job's work to its "budget", the
+    seconds left of the submission's max_execution_time.
+
+    Args:
+        job: Dictionary with "function_name", "function_source", "module_code",
+            "tests", "scaling_tests", "pytest_file", "time_limit" and "budget"
+
+    Returns:
+        List of test results
+    """
+    deadline = None if job.get("budget") is None else time.monotonic() + job["budget"]
+    func_name = job["function_name"]
+
+    try:
+        with time_limit(_remaining(deadline)):
+            function = compile_function(job["function_source"], func_name, job.get("module_code"))
+    except TimeLimitExceeded:
+        function = None
+
+    if function is None:
+        return [{
+            "test_id": "compilation_error",
+            "description": "Function could not be compiled",
+            "passed": False,
+            "status": "error",
+            "error": "Compilation error"
+        }]
+
+    function_results = []
+    for test_case in job.get("tests", []):
+        limit = _test_limit(job.get("time_limit"), deadline)
+        if limit is not None and limit <= 0:
+            function_results.append(timed_out_result(test_case, "Submission time limit reached", 0.0))
+            continue
+
+        start = time.perf_counter()
+        try:
+            with time_limit(limit):
+                function_results.append(run_function_test(function, test_case))
+        except TimeLimitExceeded:
+            elapsed = time.perf_counter() - start
+            function_results.append(timed_out_result(test_case, f"Timed out after {limit:.2f} seconds", elapsed))
+
+    # Scaling tests get their own time_limit (or the rest of the budget), not the per-test one
+    for test_case in job.get("scaling_tests", []):
+        limit = _test_limit(test_case.get("time_limit"), deadline)
+        if limit is not None and limit <= 0:
+            function_results.append(timed_out_result(test_case, "Submission time limit reached", 0.0))
+            continue
+
+        start = time.perf_counter()
+        try:
+            with time_limit(limit):
+                function_results.append(run_scaling_test(function, test_case, limit))
+        except TimeLimitExceeded:
+            elapsed = time.perf_counter() - start
+            function_results.append(timed_out_result(test_case, f"Timed out after {limit:.2f} seconds", elapsed))
+
+    if job.get("pytest_file"):
+        def pytest_call_limit():
+            # Each pytest test's call gets the per-test limit too; setup and teardown only the budget
+            limit = _test_limit(job.get("time_limit"), deadline)
+            if limit is not None and limit == job.get("time_limit"):
+                return time_limit(limit, f"Timed out after {limit:.2f} seconds")
+            return time_limit(limit, "Submission time limit reached")
+
+        start = time.perf_counter()
+        try:
+            pytest_limit = None if deadline is None else _remaining(deadline) + PYTEST_WRAP_UP_SECONDS
+            with time_limit(pytest_limit, "Submission time limit reached"):
+                function_results.extend(run_pytest_tests(
+                    function, job["pytest_file"], func_name, pytest_call_limit, TimeLimitExceeded
+                ))
+        except TimeLimitExceeded:
+            elapsed = time.perf_counter() - start
+            function_results.append({
+                "test_id": "pytest_timeout",
+                "description": "Pytest tests did not finish within the submission's time limit",
+                "passed": False,
+                "status": "timed_out",
+                "error": "Submission time limit reached",
+                "elapsed": elapsed
+            })
+
+    return function_results
+
+
+def make_portable(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Replace return values that can't be sent back to the parent as JSON with their repr."""
+    portable = []
+    for result in results:
+        try:
+            json.dumps(result)
+        except Exception:
+            result = {**result, "actual": repr(result.get("actual"))}
+        portable.append(result)
+    return portable
+
+
+def serve(channel_in: BinaryIO, channel_out: BinaryIO, limits: Dict[str, Any]) -> None:
+    """
+    Worker main loop: receive jobs, run them, send back their results.
+
+    Args:
+        channel_in: Stream jobs are read from
+        channel_out: Stream results are written to
+        limits: Resource limits for this worker (see apply_limits)
+    """
+    apply_limits(limits)
+
+    while True:
+        try:
+            job = recv_message(channel_in)
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        set_job_cpu_budget(limits["cpu_seconds"])
+
+        # Keep student print() output out of the results channel
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            try:
+                results = run_job(job)
+            except BaseException as e:
+                results = [{
+                    "test_id": "harness_error",
+                    "description": "Error while running tests",
+                    "passed": False,
+                    "status": "error",
+                    "error": str(e)
+                }]
+
+        # Threads student code left running could write to the results channel
+        # during a later job, so the parent replaces this worker
+        recycle = threading.active_count() > 1
+
+        # Return values are already captured as plain data within a byte budget (see
+        # value_capture), so encoding them once is enough; only something unexpected
+        # needs another pass
+        try:
+            send_results(channel_out, job.get("job_id"), results, recycle)
+        except (TypeError, ValueError):
+            send_results(channel_out, job.get("job_id"), make_portable(results), recycle)
+
+
+def main() -> None:
+    """
+    Serve jobs over this process's stdin/stdout, keeping student code off both.
+
+    The channels move to close-on-exec descriptors, so programs student code
+    starts don't inherit them. Student code runs in this process and could
+    still find them; the parent therefore only accepts plain JSON results
+    that answer the job it sent (see test_runner.recv_results).
+    """
+    channel_in = os.fdopen(os.dup(0), "rb")
+    channel_out = os.fdopen(os.dup(1), "wb")
+    os.set_inheritable(channel_in.fileno(), False)
+    os.set_inheritable(channel_out.fileno(), False)
+
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+    sys.stdin = open(os.devnull, "r")
+    sys.stdout = open(os.devnull, "w")
+
+    limits = recv_message(channel_in)
+    serve(channel_in, channel_out, limits)
+
+
+if __name__ == "__main__":
+    main()
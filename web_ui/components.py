@@ -1 +1,845 @@
 # Optional reusable FastHTML components
+from fasthtml.common import *
+from typing import Dict, List, Any, Optional
+
+# Student-facing names of the grading pipeline stages
+GRADING_STAGE_LABELS = {
+    "extracting": "Extracting code and functions",
+    "static_analysis": "Running static analysis",
+    "function_tests": "Running function tests",
+}
+
+
+def grading_progress(task_id: str, state: str = "PENDING", meta: Optional[Dict[str, Any]] = None):
+    """
+    Progress panel for a queued grading task that polls itself until the task finishes.
+    
+    Args:
+        task_id: Celery task id
+        state: Current task state
+        meta: PROGRESS metadata with "stage", "current" and "total"
+        
+    Returns:
+        A Div that re-requests /task_status/{task_id} every second
+    """
+    meta = meta or {}
+    if state == "PROGRESS":
+        label = GRADING_STAGE_LABELS.get(meta.get("stage"), meta.get("stage", "Working"))
+        status_text = f"{label} (step {meta.get('current', 0)} of {meta.get('total', 0)})"
+        percent = int(100 * meta.get("current", 0) / max(meta.get("total", 1), 1))
+    elif state == "STARTED":
+        status_text, percent = "Grading started", 5
+    else:
+        status_text, percent = "Waiting for a grading worker", 0
+    
+    return Div(
+        P(status_text, style="color: #d1d5db; margin-bottom: 0.5rem;"),
+        Div(
+            Div(style=f"width: {percent}%; height: 100%; background: linear-gradient(to right, #8b5cf6, #6366f1); border-radius: 9999px; transition: width 0.3s;"),
+            style="width: 100%; height: 0.5rem; background-color: rgba(75, 85, 99, 0.5); border-radius: 9999px;"
+        ),
+        P(f"Task ID: {task_id}", style="font-size: 0.75rem; color: #6b7280; margin-top: 0.5rem;"),
+        id="grading_progress",
+        hx_get=f"/task_status/{task_id}",
+        hx_trigger="every 1s",
+        hx_swap="outerHTML"
+    )
+
+
+def grading_status_page(task_id: str, state: str = "PENDING", meta: Optional[Dict[str, Any]] = None):
+    """
+    Page shown while a submission is being graded in the background.
+    
+    Args:
+        task_id: Celery task id
+        state: Current task state
+        meta: PROGRESS metadata, if any
+        
+    Returns:
+        The full status page
+    """
+    return Titled("CellSensei - Grading in Progress",
+        Div(
+            P("Your submission has been queued for analysis. This page will update automatically."),
+            grading_progress(task_id, state, meta),
+            style="max-width: 800px; margin: 0 auto;"
+        )
+    )
+
+
+def detected_functions_list(functions: Optional[Dict[str, Any]]):
+    """
+    Checkbox list of the functions found in a chosen file, swapped into the upload form.
+    
+    Args:
+        functions: Function records from extract_functions_from_code, or None if the file couldn't be read
+        
+    Returns:
+        A Div with one test_function_{name} checkbox per function
+    """
+    if functions is None:
+        message = "Could not read any functions from this file."
+    elif not functions:
+        message = "No functions found in this file."
+    else:
+        message = None
+    
+    if message:
+        return Div(
+            message,
+            id="detected_functions",
+            style="font-size: 0.75rem; color: #9ca3af; font-style: italic;"
+        )
+    
+    return Div(
+        Div("Functions to test:", style="margin-bottom: 0.5rem; font-size: 0.875rem;"),
+        *[
+            Label(
+                Input(type="checkbox", name=f"test_function_{name}", checked=True),
+                Div(cls="custom-checkbox"),
+                Span(f"{name}({', '.join(info.args)})", cls="check-text"),
+                Span(f"line {info.line_number}", style="margin-left: 0.5rem; font-size: 0.75rem; color: #6b7280;"),
+                cls="check-label"
+            )
+            for name, info in sorted(functions.items(), key=lambda item: item[1].line_number)
+        ],
+        id="detected_functions"
+    )
+
+
+def analysis_results_page(filename: str, analysis_results: Dict[str, List[str]], test_results: Dict[str, List[Dict[str, Any]]]):
+    """
+    Build the analysis results page for a graded submission.
+    
+    Args:
+        filename: Name of the uploaded file, as shown to the student
+        analysis_results: Static analysis results by check type
+        test_results: Function test results by function name
+        
+    Returns:
+        The full results page
+    """
+    # Create a stylish results page based on the mockup
+    # Group issues by category
+    issue_categories = {
+        "syntax_errors": {"name": "Syntax Errors", "icon": "❌", "color": "red", "messages": []},
+        "security_checks": {"name": "Security Checks", "icon": "🛡️", "color": "red", "messages": []},
+        "style_checks": {"name": "Style Checks", "icon": "💻", "color": "yellow", "messages": []},
+        "function_checks": {"name": "Function Checks", "icon": "💻", "color": "blue", "messages": []},
+        "linter_feedback": {"name": "Linter Feedback", "icon": "⚠️", "color": "orange", "messages": []},
+        "unused_variables": {"name": "Unused Variables", "icon": "💻", "color": "purple", "messages": []},
+        "type_checking": {"name": "Type Checking", "icon": "✓", "color": "green", "messages": []},
+        "best_practices": {"name": "Best Practices", "icon": "✨", "color": "indigo", "messages": []},
+        "complexity_checks": {"name": "Complexity Checks", "icon": "🔄", "color": "teal", "messages": []}
+    }
+    
+    # A partial report (the server was busy) says so above the issues rather than as one of them
+    analysis_results = dict(analysis_results)
+    partial_notices = analysis_results.pop("partial_analysis", [])
+    
+    # Map the results to our categories
+    issue_count = 0
+    
+    for check_type, messages in analysis_results.items():
+        # Skip placeholders like "No issues found"
+        real_issues = [msg for msg in messages if not msg.startswith("No ") and not "not yet implemented" in msg]
+        
+        if check_type in issue_categories:
+            issue_categories[check_type]["messages"] = messages
+            issue_categories[check_type]["count"] = len(real_issues)
+            issue_count += len(real_issues)
+        else:
+            # For any other category not explicitly mapped
+            issue_categories[check_type] = {
+                "name": check_type.replace("_", " ").title(),
+                "icon": "📝",
+                "color": "gray",
+                "messages": messages,
+                "count": len(real_issues)
+            }
+            issue_count += len(real_issues)
+    
+    # Custom CSS styling for the results page
+    css = Style("""
+        body {
+            font-family: system-ui, -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+            min-height: 100vh;
+            background: linear-gradient(to bottom right, #1a1a2e, #16213e);
+            color: #f0f0f0;
+            padding: 1.5rem;
+            margin: 0;
+        }
+        
+        .container {
+            max-width: 1000px;
+            margin: 0 auto;
+        }
+        
+        .header {
+            display: flex;
+            align-items: center;
+            justify-content: space-between;
+            margin-bottom: 2rem;
+        }
+        
+        .logo-container {
+            display: flex;
+            align-items: center;
+            gap: 0.75rem;
+        }
+        
+        .logo-bg {
+            background-color: rgba(236, 72, 153, 0.2);
+            padding: 0.5rem;
+            border-radius: 0.5rem;
+        }
+        
+        .logo {
+            width: 2rem;
+            height: 2rem;
+            background: linear-gradient(to right, #ec4899, #8b5cf6);
+            border-radius: 0.5rem;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            color: white;
+            font-size: 1.25rem;
+        }
+        
+        .title {
+            font-size: 1.5rem;
+            font-weight: bold;
+            background: linear-gradient(to right, #a78bfa, #ec4899);
+            -webkit-background-clip: text;
+            background-clip: text;
+            color: transparent;
+        }
+        
+        .button-group {
+            display: flex;
+            gap: 0.75rem;
+        }
+        
+        .btn {
+            display: flex;
+            align-items: center;
+            gap: 0.5rem;
+            padding: 0.5rem 1rem;
+            border-radius: 0.5rem;
+            font-weight: 500;
+            cursor: pointer;
+            transition: all 0.3s;
+            border: none;
+            font-size: 0.875rem;
+        }
+        
+        .btn-outline {
+            border: 1px solid #4b5563;
+            background-color: transparent;
+            color: #d1d5db;
+        }
+        
+        .btn-outline:hover {
+            background-color: rgba(75, 85, 99, 0.2);
+        }
+        
+        .btn-primary {
+            background: linear-gradient(to right, #8b5cf6, #6366f1);
+            color: white;
+            box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
+        }
+        
+        .btn-primary:hover {
+            transform: translateY(-1px);
+            box-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.1), 0 4px 6px -2px rgba(0, 0, 0, 0.05);
+        }
+        
+        .card {
+            background-color: rgba(31, 41, 55, 0.5);
+            backdrop-filter: blur(4px);
+            border-radius: 0.75rem;
+            padding: 1.5rem;
+            border: 1px solid rgba(75, 85, 99, 0.5);
+            box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
+            margin-bottom: 1.5rem;
+        }
+        
+        .summary-title {
+            font-size: 1.25rem;
+            font-weight: 600;
+            margin-bottom: 1rem;
+            color: #f0f0f0;
+        }
+        
+        .severity-badge {
+            display: inline-flex;
+            align-items: center;
+            padding: 0.25rem 0.5rem;
+            border-radius: 9999px;
+            font-size: 0.75rem;
+            font-weight: 500;
+        }
+        
+        .severity-header {
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+            margin-bottom: 1rem;
+        }
+        
+        .severity-low {
+            background-color: #10b981;
+            color: white;
+        }
+        
+        .severity-medium {
+            background-color: #f59e0b;
+            color: white;
+        }
+        
+        .severity-high {
+            background-color: #ef4444;
+            color: white;
+        }
+        
+        .issue-count {
+            display: flex;
+            align-items: center;
+            gap: 0.5rem;
+            font-size: 1.125rem;
+            margin-bottom: 1rem;
+        }
+        
+        .issue-icon {
+            color: #f59e0b;
+        }
+        
+        .partial-notice {
+            display: flex;
+            align-items: center;
+            gap: 0.5rem;
+            padding: 0.75rem 1rem;
+            margin-bottom: 1rem;
+            border-radius: 0.5rem;
+            background-color: rgba(245, 158, 11, 0.15);
+            color: #fcd34d;
+            font-size: 0.875rem;
+        }
+        
+        .category-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(200px, 1fr));
+            gap: 0.75rem;
+            margin-bottom: 1.5rem;
+        }
+        
+        .category-item {
+            background-color: rgba(31, 41, 55, 0.7);
+            border-radius: 0.5rem;
+            padding: 0.75rem;
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+            cursor: pointer;
+            transition: background-color 0.3s;
+        }
+        
+        .category-item:hover {
+            background-color: rgba(55, 65, 81, 0.7);
+        }
+        
+        .category-info {
+            display: flex;
+            align-items: center;
+            gap: 0.5rem;
+        }
+        
+        .category-icon {
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            width: 1.5rem;
+            height: 1.5rem;
+            background-color: rgba(31, 41, 55, 0.7);
+            border-radius: 0.25rem;
+        }
+        
+        .category-badge {
+            background-color: rgba(31, 41, 55, 0.7);
+            border-radius: 9999px;
+            min-width: 1.5rem;
+            height: 1.5rem;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            font-size: 0.75rem;
+        }
+        
+        .section-title {
+            font-size: 1.25rem;
+            font-weight: 600;
+            margin-bottom: 1rem;
+            color: #f0f0f0;
+        }
+        
+        .collapsible {
+            margin-bottom: 1rem;
+        }
+        
+        .collapsible-header {
+            background-color: rgba(31, 41, 55, 0.5);
+            backdrop-filter: blur(4px);
+            border-radius: 0.5rem;
+            padding: 1rem;
+            border: 1px solid rgba(75, 85, 99, 0.5);
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+            cursor: pointer;
+            transition: background-color 0.3s;
+        }
+        
+        .collapsible-header:hover {
+            background-color: rgba(55, 65, 81, 0.5);
+        }
+        
+        .collapsible-title {
+            display: flex;
+            align-items: center;
+            gap: 0.5rem;
+            font-weight: 500;
+        }
+        
+        .collapsible-badge {
+            display: flex;
+            align-items: center;
+            gap: 0.5rem;
+        }
+        
+        .collapsible-content {
+            background-color: rgba(31, 41, 55, 0.3);
+            border: 1px solid rgba(75, 85, 99, 0.5);
+            border-top: none;
+            border-bottom-left-radius: 0.5rem;
+            border-bottom-right-radius: 0.5rem;
+            padding: 1rem;
+            margin-top: -1px;
+        }
+        
+        .collapsible-content.hidden {
+            display: none;
+        }
+        
+        .issue-list {
+            list-style: none;
+            padding: 0;
+            margin: 0;
+        }
+        
+        .issue-item {
+            padding: 0.5rem 0;
+            padding-left: 1rem;
+            border-left-width: 2px;
+            border-left-style: solid;
+            margin-bottom: 0.5rem;
+            font-size: 0.875rem;
+        }
+        
+        .issue-item-red {
+            border-left-color: #ef4444;
+            color: #fca5a5;
+        }
+        
+        .issue-item-yellow {
+            border-left-color: #f59e0b;
+            color: #fcd34d;
+        }
+        
+        .issue-item-blue {
+            border-left-color: #3b82f6;
+            color: #93c5fd;
+        }
+        
+        .issue-item-green {
+            border-left-color: #10b981;
+            color: #6ee7b7;
+        }
+        
+        .issue-item-purple {
+            border-left-color: #8b5cf6;
+            color: #c4b5fd;
+        }
+        
+        .issue-item-orange {
+            border-left-color: #f97316;
+            color: #fdba74;
+        }
+        
+        .issue-item-indigo {
+            border-left-color: #6366f1;
+            color: #a5b4fc;
+        }
+        
+        .issue-item-teal {
+            border-left-color: #14b8a6;
+            color: #5eead4;
+        }
+        
+        .issue-item-gray {
+            border-left-color: #6b7280;
+            color: #d1d5db;
+        }
+        
+        .code-block {
+            background-color: rgba(17, 24, 39, 0.8);
+            padding: 0.75rem;
+            border-radius: 0.5rem;
+            font-family: monospace;
+            font-size: 0.75rem;
+            color: #d1d5db;
+            white-space: pre;
+            overflow-x: auto;
+        }
+        
+        .hidden {
+            display: none;
+        }
+    """)
+    
+    # Generate full report for download
+    full_report = "# Static Analysis Report\n\n"
+    for notice in partial_notices:
+        full_report += f"{notice}\n\n"
+    for category_key, category in issue_categories.items():
+        if "count" in category and category["count"] > 0:
+            full_report += f"## {category['name']} ({category['count']} issues)\n\n"
+            for msg in category["messages"]:
+                if not msg.startswith("No ") and not "not yet implemented" in msg:
+                    full_report += f"- {msg}\n"
+            full_report += "\n"
+    
+    # Add hidden textarea with report content for download
+    report_data = Textarea(
+        full_report,
+        id="report_data",
+        style="display:none;"
+    )
+    
+    # Determine severity based on issue count
+    severity = "low"
+    severity_text = "Low"
+    
+    if issue_count > 50:
+        severity = "high"
+        severity_text = "High"
+    elif issue_count > 20:
+        severity = "medium"
+        severity_text = "Medium"
+        
+    # Header with navigation buttons
+    header = Div(
+        Div(
+            Div(
+                Div(
+                    "📄",
+                    cls="logo"
+                ),
+                cls="logo-bg"
+            ),
+            Div(
+                "Analysis Results",
+                cls="title"
+            ),
+            cls="logo-container"
+        ),
+        Div(
+            Button(
+                Span("←", style="margin-right: 0.25rem;"),
+                "Back to Home",
+                cls="btn btn-outline",
+                onclick="window.location.href='/'",
+                type="button"
+            ),
+            Button(
+                Span("⬇️", style="margin-right: 0.25rem;"),
+                "Download Report",
+                id="download_report",
+                cls="btn btn-primary",
+                type="button"
+            ),
+            cls="button-group"
+        ),
+        cls="header"
+    )
+    
+    # Summary card
+    summary_card = Div(
+        Div(
+            Div(
+                "Summary",
+                cls="summary-title"
+            ),
+            Div(
+                Span("Severity:", style="font-size: 0.875rem; color: #9ca3af;"),
+                Span(
+                    severity_text,
+                    cls=f"severity-badge severity-{severity}"
+                ),
+                cls="flex items-center gap-2"
+            ),
+            cls="severity-header"
+        ),
+        Div(
+            Span("⚠️", cls="issue-icon"),
+            f"Found {issue_count} issues in your {filename}",
+            cls="issue-count"
+        ),
+        *[Div(Span("⏳"), notice, cls="partial-notice") for notice in partial_notices],
+        Div(
+            H3("Issues by Category:", style="font-size: 1rem; font-weight: 500; color: #d1d5db; margin-bottom: 0.75rem;"),
+            # Create a grid of categories
+            Div(
+                *[
+                    Div(
+                        Div(
+                            Span(category["icon"], cls="category-icon"),
+                            Span(category["name"], style="font-size: 0.875rem;"),
+                            cls="category-info"
+                        ),
+                        Div(
+                            category.get("count", 0),
+                            cls="category-badge"
+                        ),
+                        cls="category-item",
+                        onclick=f"document.getElementById('section_{key}').scrollIntoView({{behavior: 'smooth'}})"
+                    )
+                    for key, category in issue_categories.items()
+                    if "count" in category and category["count"] > 0
+                ],
+                cls="category-grid"
+            ),
+        ),
+        cls="card"
+    )
+    
+    # Detailed analysis sections
+    detailed_sections = []
+    
+    # Create collapsible sections for each category with issues
+    for key, category in issue_categories.items():
+        if "count" in category and category["count"] > 0:
+            # Create a unique ID for the section
+            section_id = f"section_{key}"
+            content_id = f"content_{key}"
+            
+            # Create issues list based on the category
+            issue_items = []
+            
+            # Special handling for linter feedback to show as code block
+            if key == "linter_feedback" and len(category["messages"]) > 0:
+                # Format linter output as code block
+                issue_items.append(
+                    Div(
+                        "\n".join(category["messages"]),
+                        cls="code-block"
+                    )
+                )
+            else:
+                # Regular list of issues
+                for msg in category["messages"]:
+                    if not msg.startswith("No ") and not "not yet implemented" in msg:
+                        issue_items.append(
+                            Li(
+                                msg,
+                                cls=f"issue-item issue-item-{category['color']}"
+                            )
+                        )
+            
+            # Create the collapsible section
+            section = Div(
+                Div(
+                    Div(
+                        Span(category["icon"], style="color: #8b5cf6;"),
+                        category["name"],
+                        cls="collapsible-title"
+                    ),
+                    Div(
+                        f"{category['count']} issues",
+                        Span("▼", id=f"arrow_{key}"),
+                        cls="collapsible-badge"
+                    ),
+                    cls="collapsible-header",
+                    id=section_id,
+                    onclick=f"""
+                        document.getElementById('{content_id}').classList.toggle('hidden');
+                        document.getElementById('arrow_{key}').textContent = 
+                            document.getElementById('arrow_{key}').textContent === '▼' ? '▲' : '▼';
+                    """
+                ),
+                Div(
+                    *issue_items if issue_items else [P("No specific issues found.")],
+                    id=content_id,
+                    cls="collapsible-content"
+                ),
+                cls="collapsible"
+            )
+            
+            detailed_sections.append(section)
+    
+    # Detailed analysis card
+    detailed_card = Div(
+        H2("Detailed Analysis", cls="section-title"),
+        *detailed_sections,
+        cls="card"
+    ) if detailed_sections else ""
+    
+    # Add script for download functionality
+    download_script = Script("""
+        document.getElementById('download_report').addEventListener('click', function() {
+            const reportContent = document.getElementById('report_data').value;
+            const blob = new Blob([reportContent], { type: 'text/plain' });
+            const url = URL.createObjectURL(blob);
+            const a = document.createElement('a');
+            a.href = url;
+            a.download = 'python_analysis_report.txt';
+            document.body.appendChild(a);
+            a.click();
+            document.body.removeChild(a);
+        });
+        
+        // Initialize with all sections collapsed
+        document.addEventListener('DOMContentLoaded', function() {
+            const collapsibleContents = document.querySelectorAll('.collapsible-content');
+            collapsibleContents.forEach(content => {
+                content.classList.add('hidden');
+            });
+        });
+    """)
+    
+    # Function test results section (if any)
+    function_test_card = ""
+    if test_results:
+        function_sections = []
+        
+        # Calculate total score and max score
+        total_score = 0
+        max_score = 0
+        
+        for func_name, func_results in test_results.items():
+            # Count passed tests and calculate score
+            passed_tests = sum(1 for r in func_results if r.get("passed", False))
+            total_tests = len(func_results)
+            
+            # Calculate points
+            func_score = sum(r.get("points", 0) for r in func_results if r.get("passed", False))
+            func_max_score = sum(r.get("points", 0) for r in func_results)
+            
+            total_score += func_score
+            max_score += func_max_score
+            
+            # Create test result items
+            test_items = []
+            for test_result in func_results:
+                test_id = test_result.get("test_id", "unknown")
+                description = test_result.get("description", "")
+                passed = test_result.get("passed", False)
+                error = test_result.get("error")
+                points = test_result.get("points", 0)
+                timed_out = test_result.get("status") == "timed_out"
+                skipped = test_result.get("status") == "skipped"
+                elapsed = test_result.get("elapsed")
+                
+                # Create test status icon
+                status_icon = "✅" if passed else ("⏱️" if timed_out else ("⏭️" if skipped else "❌"))
+                status_class = "text-green-400" if passed else "text-red-400"
+                
+                # Create test result item
+                test_item = Div(
+                    Div(
+                        Span(status_icon, style=f"color: {status_class};"),
+                        Span(description or test_id, style="margin-left: 0.5rem;"),
+                        cls="flex items-center"
+                    ),
+                    Div(
+                        f"{points if passed else 0}/{points} points"
+                        + (" | timed out" if timed_out else "")
+                        + (" | skipped" if skipped else "")
+                        + (f" | {elapsed * 1000:.1f} ms" if elapsed else ""),
+                        style="font-size: 0.75rem; color: #9ca3af;"
+                    ),
+                    *([Div(
+                        f"Skipped: {error}" if skipped else f"Error: {error}",
+                        style="font-size: 0.75rem; color: #ef4444; margin-top: 0.25rem;"
+                    )] if error else []),
+                    style="padding: 0.5rem; border-bottom: 1px solid rgba(75, 85, 99, 0.3);"
+                )
+                test_items.append(test_item)
+            
+            # Create function result section
+            function_section = Div(
+                Div(
+                    Div(
+                        Span("🔍", style="color: #8b5cf6;"),
+                        func_name,
+                        cls="collapsible-title"
+                    ),
+                    Div(
+                        f"{passed_tests}/{total_tests} tests passed | {func_score}/{func_max_score} points",
+                        Span("▼", id=f"func_arrow_{func_name}"),
+                        cls="collapsible-badge"
+                    ),
+                    cls="collapsible-header",
+                    id=f"function_section_{func_name}",
+                    onclick=f"""
+                        document.getElementById('function_content_{func_name}').classList.toggle('hidden');
+                        document.getElementById('func_arrow_{func_name}').textContent = 
+                            document.getElementById('func_arrow_{func_name}').textContent === '▼' ? '▲' : '▼';
+                    """
+                ),
+                Div(
+                    *test_items,
+                    id=f"function_content_{func_name}",
+                    cls="collapsible-content"
+                ),
+                cls="collapsible"
+            )
+            
+            function_sections.append(function_section)
+        
+        # Create the function test card
+        function_test_card = Div(
+            Div(
+                "Function Tests",
+                style="font-size: 1.25rem; font-weight: 600; margin-bottom: 1rem; color: #f0f0f0;"
+            ),
+            Div(
+                Div(
+                    "Overall Score:",
+                    style="font-weight: 500; color: #d1d5db;"
+                ),
+                Div(
+                    f"{total_score}/{max_score} points ({int(total_score/max_score*100) if max_score else 0}%)",
+                    style="font-size: 1.25rem; font-weight: 600; color: #a78bfa;"
+                ),
+                style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 1rem; padding-bottom: 0.5rem; border-bottom: 1px solid rgba(75, 85, 99, 0.5);"
+            ),
+            *function_sections,
+            cls="card"
+        )
+    
+    # Main container
+    container = Div(
+        header,
+        summary_card,
+        detailed_card,
+        function_test_card if test_results else "",
+        report_data,
+        cls="container"
+    )
+    
+    # Combine all elements
+    return Titled("CellSensei - Analysis Results", 
+        css,
+        container,
+        download_script
+    )
@@ -3,11 +3,20 @@ from fasthtml.components import Form # Explicit import if not in common needed f
 import nbformat # For reading notebook in M1 for static analysis
 from starlette.datastructures import UploadFile
 from starlette.requests import Request # For type hinting if needed
-from pathlib import Path
 import yaml
 
 # Import our function extraction and testing modules
-from sensei_core.notebook_parser import extract_functions_from_file, get_available_configs, test_extracted_functions
+from sensei_core.notebook_parser import get_available_configs, extract_code_cells_from_upload, extract_functions_from_code
+from sensei_core.pipeline import grade_code_cells
+from sensei_core.executor import run_grading_job
+from sensei_core.scratch import (
+    UploadRejected, check_upload_size, content_length_too_large, remove_scratch_file, save_upload,
+    size_limit_message, start_scratch_janitor
+)
+from web_ui.components import analysis_results_page, detected_functions_list, grading_progress, grading_status_page
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+import config as settings
 
 # Assuming main_app.py creates `app` and we add routes to it.
 # This requires a bit of coordination or passing the app/router instance.
@@ -20,8 +29,8 @@ from sensei_core.notebook_parser import extract_functions_from_file, get_availab
 
 # For now, let's assume we get the app object and attach routes.
 def init_routes(app):
-    # In a real app, move UPLOAD_DIR to a config or pass it around.
-    UPLOAD_DIR = Path("./temp_uploads")
+    # Uploads are kept in the scratch area (settings.UPLOAD_DIR) only while they are graded
+    start_scratch_janitor()
 
     @app.route("/", methods=["GET"])
     async def homepage(req: Request):
@@ -516,6 +525,18 @@ def init_routes(app):
         ]
         
         # Create the main upload card
+        # Get available test configurations
+        available_configs = get_available_configs()
+        
+        # Scan the chosen file for functions right away so they can be selected for testing
+        detect_functions_attrs = dict(
+            hx_post="/detect_functions",
+            hx_trigger="change",
+            hx_target="#detected_functions",
+            hx_swap="outerHTML",
+            hx_encoding="multipart/form-data"
+        ) if available_configs else {}
+        
         upload_card = Div(
             Div(
                 Span("📤", cls="card-title-icon"),
@@ -527,7 +548,10 @@ def init_routes(app):
                 cls="subtitle"
             ),
             Label(
-                Input(type="file", name="notebook_file", id="file-upload", accept=".ipynb,.py", cls="hidden"),
+                Input(
+                    type="file", name="notebook_file", id="file-upload", accept=".ipynb,.py", cls="hidden",
+                    **detect_functions_attrs
+                ),
                 Div(
                     Div(
                         Span("📄", cls="file-icon"),
@@ -544,9 +568,6 @@ def init_routes(app):
         # Function testing section
         function_test_section = ""
         
-        # Get available test configurations
-        available_configs = get_available_configs()
-        
         if available_configs:
             config_options = []
             
@@ -613,7 +634,8 @@ def init_routes(app):
                         style="margin-bottom: 1rem;"
                     ),
                     Div(
-                        "Functions will be detected and displayed for selection after upload.",
+                        "Choose a file to see its functions here.",
+                        id="detected_functions",
                         style="font-size: 0.75rem; color: #9ca3af; font-style: italic;"
                     ),
                     id="function_test_content",
@@ -791,21 +813,7 @@ def init_routes(app):
                     runFunctionTestsCheckbox.addEventListener('change', function() {
                         testConfigSelect.disabled = !this.checked;
                     });
-                    
-                    // File upload change event to extract functions
-                    document.getElementById('file-upload').addEventListener('change', function() {
-                        if (this.files.length > 0 && runFunctionTestsCheckbox.checked) {
-                            // Indicate that functions will be detected after upload
-                            const functionContent = document.getElementById('function_test_content');
-                            // Check if the notification is already there
-                            if (functionContent && !document.getElementById('function_detection_notice')) {
-                                const functionInfo = document.createElement('div');
-                                functionInfo.id = 'function_detection_notice';
-                                functionInfo.innerHTML = '<p style="color: #8b5cf6; margin-top: 0.5rem; font-weight: 500;">✨ Functions will be detected when you submit the form.</p>';
-                                functionContent.appendChild(functionInfo);
-                            }
-                        }
-                    });
+
                 }
             });
         """)
@@ -842,8 +850,39 @@ def init_routes(app):
             script
         )
 
+    @app.route("/detect_functions", methods=["POST"])
+    async def detect_functions(req: Request):
+        # Lightweight pre-upload scan: function definitions only, no analysis.
+        # The result is cached by content, so grading the submission reuses it.
+        if content_length_too_large(req.headers.get("content-length")):
+            return detected_functions_list(None)
+        form_data = await req.form()
+        notebook_file: UploadFile = form_data.get("notebook_file")
+        
+        if not notebook_file or not notebook_file.filename:
+            return detected_functions_list(None)
+        
+        try:
+            check_upload_size(notebook_file)
+            # Read from the form parser's spool, which may be on disk, so off the event loop
+            code_cells = await run_in_threadpool(extract_code_cells_from_upload, notebook_file.file, notebook_file.filename)
+        except UploadRejected:
+            return detected_functions_list(None)
+        finally:
+            await notebook_file.close()
+        
+        if code_cells is None:
+            return detected_functions_list(None)
+        
+        code = "\n".join(source for _, source in code_cells)
+        functions = await run_in_threadpool(extract_functions_from_code, code)
+        return detected_functions_list(functions)
+
     @app.route("/upload", methods=["POST"])
     async def handle_upload(req: Request):
+        # Refuse an oversized upload before its body is read
+        if content_length_too_large(req.headers.get("content-length")):
+            return Titled("Upload Error", P(size_limit_message()))
         form_data = await req.form()
         notebook_file: UploadFile = form_data.get("notebook_file")
 
@@ -872,772 +911,99 @@ def init_routes(app):
         # Get difficulty level
         difficulty = form_data.get("difficulty", "beginner")
 
-        # For security, generate a unique filename to prevent path traversal and name clashes
-        import uuid
-        temp_file_path = UPLOAD_DIR / f"{uuid.uuid4()}.ipynb"
-
+        # Check if function testing was requested
+        run_function_tests = form_data.get("run_function_tests") == "on"
+        config_path = form_data.get("test_config") if run_function_tests else None
+        
+        # Functions the student selected for testing
+        selected_functions = [
+            key[len("test_function_"):] for key, value in form_data.items()
+            if key.startswith("test_function_") and value == "on"
+        ]
+        
+        # --- MILESTONE 3: Queue grading on Celery and let the page poll for it ---
+        if settings.GRADING_BACKEND == "celery":
+            from celery_worker.tasks import grade_submission_task
+            
+            # Celery workers read the upload from the shared scratch area; it is
+            # copied there in chunks, under a random name with the upload's extension
+            try:
+                temp_file_path = await save_upload(notebook_file)
+            except UploadRejected as e:
+                return Titled("Upload Error", P(str(e)))
+            except Exception as e:
+                return Titled("Upload Error", P(f"Error saving file: {e}"))
+            finally:
+                await notebook_file.close()
+            
+            # Once queued, the task owns the file and removes it when done; if queueing fails, remove it here
+            try:
+                task = grade_submission_task.delay(
+                    str(temp_file_path),
+                    notebook_file.filename,
+                    check_options,
+                    difficulty,
+                    config_path,
+                    selected_functions
+                )
+            except BaseException:
+                remove_scratch_file(temp_file_path)
+                raise
+            return grading_status_page(task.id)
+        
+        # Graded here, the code is extracted once straight from the upload and
+        # every stage works on it in memory; the upload is never saved
         try:
-            contents = await notebook_file.read()
-            with open(temp_file_path, "wb") as f:
-                f.write(contents)
-        except Exception as e:
-            return Titled("Upload Error", P(f"Error saving file: {e}"))
+            check_upload_size(notebook_file)
+            code_cells = await run_in_threadpool(extract_code_cells_from_upload, notebook_file.file, notebook_file.filename)
+        except UploadRejected as e:
+            return Titled("Upload Error", P(str(e)))
         finally:
             await notebook_file.close()
         
         # --- MILESTONE 1: Static Analysis with Configuration ---
         try:
-            from sensei_core.static_analyzer import run_static_analysis_on_notebook
-            
-            # Extract functions from the file
-            extracted_functions = extract_functions_from_file(temp_file_path)
-            
-            # Get available test configurations
-            available_configs = get_available_configs()
-            
-            # Check if function testing was requested
-            run_function_tests = form_data.get("run_function_tests") == "on"
-            
-            # Get the selected configuration if any
-            selected_config_path = form_data.get("test_config")
-            selected_config = None
-            test_results = {}
-            
-            if run_function_tests and selected_config_path:
-                # Find the selected configuration
-                for config in available_configs:
-                    if config.get("file_path") == selected_config_path:
-                        selected_config = config
-                        break
-                
-                # If a config was selected, run the tests
-                if selected_config:
-                    # Check which functions to test
-                    functions_to_test = {}
-                    for func_name in extracted_functions:
-                        # Check if the function was selected for testing
-                        if form_data.get(f"test_function_{func_name}") == "on":
-                            functions_to_test[func_name] = extracted_functions[func_name]
-                    
-                    # Run the tests
-                    if functions_to_test:
-                        test_results = test_extracted_functions(functions_to_test, selected_config)
-            
-            # Pass check options to the analyzer
-            analysis_results = run_static_analysis_on_notebook(
-                notebook_file_path=temp_file_path, 
-                options=check_options,
-                difficulty=difficulty
-            )
-            
-            # Create a stylish results page based on the mockup
-            # Group issues by category
-            issue_categories = {
-                "security_checks": {"name": "Security Checks", "icon": "🛡️", "color": "red", "messages": []},
-                "style_checks": {"name": "Style Checks", "icon": "💻", "color": "yellow", "messages": []},
-                "function_checks": {"name": "Function Checks", "icon": "💻", "color": "blue", "messages": []},
-                "linter_feedback": {"name": "Linter Feedback", "icon": "⚠️", "color": "orange", "messages": []},
-                "unused_variables": {"name": "Unused Variables", "icon": "💻", "color": "purple", "messages": []},
-                "type_checking": {"name": "Type Checking", "icon": "✓", "color": "green", "messages": []},
-                "best_practices": {"name": "Best Practices", "icon": "✨", "color": "indigo", "messages": []},
-                "complexity_checks": {"name": "Complexity Checks", "icon": "🔄", "color": "teal", "messages": []}
-            }
-            
-            # Map the results to our categories
-            issue_count = 0
-            
-            for check_type, messages in analysis_results.items():
-                # Skip placeholders like "No issues found"
-                real_issues = [msg for msg in messages if not msg.startswith("No ") and not "not yet implemented" in msg]
-                
-                if check_type in issue_categories:
-                    issue_categories[check_type]["messages"] = messages
-                    issue_categories[check_type]["count"] = len(real_issues)
-                    issue_count += len(real_issues)
-                else:
-                    # For any other category not explicitly mapped
-                    issue_categories[check_type] = {
-                        "name": check_type.replace("_", " ").title(),
-                        "icon": "📝",
-                        "color": "gray",
-                        "messages": messages,
-                        "count": len(real_issues)
-                    }
-                    issue_count += len(real_issues)
-            
-            # Clean up the temporary file after analysis
-            try:
-                import os
-                os.remove(temp_file_path) 
-            except:
-                print(f"Warning: Could not remove temporary file {temp_file_path}")
-            
-            # Custom CSS styling for the results page
-            css = Style("""
-                body {
-                    font-family: system-ui, -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                    min-height: 100vh;
-                    background: linear-gradient(to bottom right, #1a1a2e, #16213e);
-                    color: #f0f0f0;
-                    padding: 1.5rem;
-                    margin: 0;
-                }
-                
-                .container {
-                    max-width: 1000px;
-                    margin: 0 auto;
-                }
-                
-                .header {
-                    display: flex;
-                    align-items: center;
-                    justify-content: space-between;
-                    margin-bottom: 2rem;
-                }
-                
-                .logo-container {
-                    display: flex;
-                    align-items: center;
-                    gap: 0.75rem;
-                }
-                
-                .logo-bg {
-                    background-color: rgba(236, 72, 153, 0.2);
-                    padding: 0.5rem;
-                    border-radius: 0.5rem;
-                }
-                
-                .logo {
-                    width: 2rem;
-                    height: 2rem;
-                    background: linear-gradient(to right, #ec4899, #8b5cf6);
-                    border-radius: 0.5rem;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    color: white;
-                    font-size: 1.25rem;
-                }
-                
-                .title {
-                    font-size: 1.5rem;
-                    font-weight: bold;
-                    background: linear-gradient(to right, #a78bfa, #ec4899);
-                    -webkit-background-clip: text;
-                    background-clip: text;
-                    color: transparent;
-                }
-                
-                .button-group {
-                    display: flex;
-                    gap: 0.75rem;
-                }
-                
-                .btn {
-                    display: flex;
-                    align-items: center;
-                    gap: 0.5rem;
-                    padding: 0.5rem 1rem;
-                    border-radius: 0.5rem;
-                    font-weight: 500;
-                    cursor: pointer;
-                    transition: all 0.3s;
-                    border: none;
-                    font-size: 0.875rem;
-                }
-                
-                .btn-outline {
-                    border: 1px solid #4b5563;
-                    background-color: transparent;
-                    color: #d1d5db;
-                }
-                
-                .btn-outline:hover {
-                    background-color: rgba(75, 85, 99, 0.2);
-                }
-                
-                .btn-primary {
-                    background: linear-gradient(to right, #8b5cf6, #6366f1);
-                    color: white;
-                    box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-                }
-                
-                .btn-primary:hover {
-                    transform: translateY(-1px);
-                    box-shadow: 0 10px 15px -3px rgba(0, 0, 0, 0.1), 0 4px 6px -2px rgba(0, 0, 0, 0.05);
-                }
-                
-                .card {
-                    background-color: rgba(31, 41, 55, 0.5);
-                    backdrop-filter: blur(4px);
-                    border-radius: 0.75rem;
-                    padding: 1.5rem;
-                    border: 1px solid rgba(75, 85, 99, 0.5);
-                    box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1), 0 2px 4px -1px rgba(0, 0, 0, 0.06);
-                    margin-bottom: 1.5rem;
-                }
-                
-                .summary-title {
-                    font-size: 1.25rem;
-                    font-weight: 600;
-                    margin-bottom: 1rem;
-                    color: #f0f0f0;
-                }
-                
-                .severity-badge {
-                    display: inline-flex;
-                    align-items: center;
-                    padding: 0.25rem 0.5rem;
-                    border-radius: 9999px;
-                    font-size: 0.75rem;
-                    font-weight: 500;
-                }
-                
-                .severity-header {
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    margin-bottom: 1rem;
-                }
-                
-                .severity-low {
-                    background-color: #10b981;
-                    color: white;
-                }
-                
-                .severity-medium {
-                    background-color: #f59e0b;
-                    color: white;
-                }
-                
-                .severity-high {
-                    background-color: #ef4444;
-                    color: white;
-                }
-                
-                .issue-count {
-                    display: flex;
-                    align-items: center;
-                    gap: 0.5rem;
-                    font-size: 1.125rem;
-                    margin-bottom: 1rem;
-                }
-                
-                .issue-icon {
-                    color: #f59e0b;
-                }
-                
-                .category-grid {
-                    display: grid;
-                    grid-template-columns: repeat(auto-fill, minmax(200px, 1fr));
-                    gap: 0.75rem;
-                    margin-bottom: 1.5rem;
-                }
-                
-                .category-item {
-                    background-color: rgba(31, 41, 55, 0.7);
-                    border-radius: 0.5rem;
-                    padding: 0.75rem;
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    cursor: pointer;
-                    transition: background-color 0.3s;
-                }
-                
-                .category-item:hover {
-                    background-color: rgba(55, 65, 81, 0.7);
-                }
-                
-                .category-info {
-                    display: flex;
-                    align-items: center;
-                    gap: 0.5rem;
-                }
-                
-                .category-icon {
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    width: 1.5rem;
-                    height: 1.5rem;
-                    background-color: rgba(31, 41, 55, 0.7);
-                    border-radius: 0.25rem;
-                }
-                
-                .category-badge {
-                    background-color: rgba(31, 41, 55, 0.7);
-                    border-radius: 9999px;
-                    min-width: 1.5rem;
-                    height: 1.5rem;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    font-size: 0.75rem;
-                }
-                
-                .section-title {
-                    font-size: 1.25rem;
-                    font-weight: 600;
-                    margin-bottom: 1rem;
-                    color: #f0f0f0;
-                }
-                
-                .collapsible {
-                    margin-bottom: 1rem;
-                }
-                
-                .collapsible-header {
-                    background-color: rgba(31, 41, 55, 0.5);
-                    backdrop-filter: blur(4px);
-                    border-radius: 0.5rem;
-                    padding: 1rem;
-                    border: 1px solid rgba(75, 85, 99, 0.5);
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    cursor: pointer;
-                    transition: background-color 0.3s;
-                }
-                
-                .collapsible-header:hover {
-                    background-color: rgba(55, 65, 81, 0.5);
-                }
-                
-                .collapsible-title {
-                    display: flex;
-                    align-items: center;
-                    gap: 0.5rem;
-                    font-weight: 500;
-                }
-                
-                .collapsible-badge {
-                    display: flex;
-                    align-items: center;
-                    gap: 0.5rem;
-                }
-                
-                .collapsible-content {
-                    background-color: rgba(31, 41, 55, 0.3);
-                    border: 1px solid rgba(75, 85, 99, 0.5);
-                    border-top: none;
-                    border-bottom-left-radius: 0.5rem;
-                    border-bottom-right-radius: 0.5rem;
-                    padding: 1rem;
-                    margin-top: -1px;
-                }
-                
-                .collapsible-content.hidden {
-                    display: none;
-                }
-                
-                .issue-list {
-                    list-style: none;
-                    padding: 0;
-                    margin: 0;
-                }
-                
-                .issue-item {
-                    padding: 0.5rem 0;
-                    padding-left: 1rem;
-                    border-left-width: 2px;
-                    border-left-style: solid;
-                    margin-bottom: 0.5rem;
-                    font-size: 0.875rem;
-                }
-                
-                .issue-item-red {
-                    border-left-color: #ef4444;
-                    color: #fca5a5;
-                }
-                
-                .issue-item-yellow {
-                    border-left-color: #f59e0b;
-                    color: #fcd34d;
-                }
-                
-                .issue-item-blue {
-                    border-left-color: #3b82f6;
-                    color: #93c5fd;
-                }
-                
-                .issue-item-green {
-                    border-left-color: #10b981;
-                    color: #6ee7b7;
-                }
-                
-                .issue-item-purple {
-                    border-left-color: #8b5cf6;
-                    color: #c4b5fd;
-                }
-                
-                .issue-item-orange {
-                    border-left-color: #f97316;
-                    color: #fdba74;
-                }
-                
-                .issue-item-indigo {
-                    border-left-color: #6366f1;
-                    color: #a5b4fc;
-                }
-                
-                .issue-item-teal {
-                    border-left-color: #14b8a6;
-                    color: #5eead4;
-                }
-                
-                .issue-item-gray {
-                    border-left-color: #6b7280;
-                    color: #d1d5db;
-                }
-                
-                .code-block {
-                    background-color: rgba(17, 24, 39, 0.8);
-                    padding: 0.75rem;
-                    border-radius: 0.5rem;
-                    font-family: monospace;
-                    font-size: 0.75rem;
-                    color: #d1d5db;
-                    white-space: pre;
-                    overflow-x: auto;
-                }
-                
-                .hidden {
-                    display: none;
-                }
-            """)
-            
-            # Generate full report for download
-            full_report = "# Static Analysis Report\n\n"
-            for category_key, category in issue_categories.items():
-                if "count" in category and category["count"] > 0:
-                    full_report += f"## {category['name']} ({category['count']} issues)\n\n"
-                    for msg in category["messages"]:
-                        if not msg.startswith("No ") and not "not yet implemented" in msg:
-                            full_report += f"- {msg}\n"
-                    full_report += "\n"
-            
-            # Add hidden textarea with report content for download
-            report_data = Textarea(
-                full_report,
-                id="report_data",
-                style="display:none;"
-            )
-            
-            # Determine severity based on issue count
-            severity = "low"
-            severity_text = "Low"
-            
-            if issue_count > 50:
-                severity = "high"
-                severity_text = "High"
-            elif issue_count > 20:
-                severity = "medium"
-                severity_text = "Medium"
-                
-            # Header with navigation buttons
-            header = Div(
-                Div(
-                    Div(
-                        Div(
-                            "📄",
-                            cls="logo"
-                        ),
-                        cls="logo-bg"
-                    ),
-                    Div(
-                        "Analysis Results",
-                        cls="title"
-                    ),
-                    cls="logo-container"
-                ),
-                Div(
-                    Button(
-                        Span("←", style="margin-right: 0.25rem;"),
-                        "Back to Home",
-                        cls="btn btn-outline",
-                        onclick="window.location.href='/'",
-                        type="button"
-                    ),
-                    Button(
-                        Span("⬇️", style="margin-right: 0.25rem;"),
-                        "Download Report",
-                        id="download_report",
-                        cls="btn btn-primary",
-                        type="button"
-                    ),
-                    cls="button-group"
-                ),
-                cls="header"
-            )
-            
-            # Summary card
-            summary_card = Div(
-                Div(
-                    Div(
-                        "Summary",
-                        cls="summary-title"
-                    ),
-                    Div(
-                        Span("Severity:", style="font-size: 0.875rem; color: #9ca3af;"),
-                        Span(
-                            severity_text,
-                            cls=f"severity-badge severity-{severity}"
-                        ),
-                        cls="flex items-center gap-2"
-                    ),
-                    cls="severity-header"
-                ),
-                Div(
-                    Span("⚠️", cls="issue-icon"),
-                    f"Found {issue_count} issues in your {notebook_file.filename}",
-                    cls="issue-count"
-                ),
-                Div(
-                    H3("Issues by Category:", style="font-size: 1rem; font-weight: 500; color: #d1d5db; margin-bottom: 0.75rem;"),
-                    # Create a grid of categories
-                    Div(
-                        *[
-                            Div(
-                                Div(
-                                    Span(category["icon"], cls="category-icon"),
-                                    Span(category["name"], style="font-size: 0.875rem;"),
-                                    cls="category-info"
-                                ),
-                                Div(
-                                    category.get("count", 0),
-                                    cls="category-badge"
-                                ),
-                                cls="category-item",
-                                onclick=f"document.getElementById('section_{key}').scrollIntoView({{behavior: 'smooth'}})"
-                            )
-                            for key, category in issue_categories.items()
-                            if "count" in category and category["count"] > 0
-                        ],
-                        cls="category-grid"
-                    ),
-                ),
-                cls="card"
-            )
-            
-            # Detailed analysis sections
-            detailed_sections = []
-            
-            # Create collapsible sections for each category with issues
-            for key, category in issue_categories.items():
-                if "count" in category and category["count"] > 0:
-                    # Create a unique ID for the section
-                    section_id = f"section_{key}"
-                    content_id = f"content_{key}"
-                    
-                    # Create issues list based on the category
-                    issue_items = []
-                    
-                    # Special handling for linter feedback to show as code block
-                    if key == "linter_feedback" and len(category["messages"]) > 0:
-                        # Format linter output as code block
-                        issue_items.append(
-                            Div(
-                                "\n".join(category["messages"]),
-                                cls="code-block"
-                            )
-                        )
-                    else:
-                        # Regular list of issues
-                        for msg in category["messages"]:
-                            if not msg.startswith("No ") and not "not yet implemented" in msg:
-                                issue_items.append(
-                                    Li(
-                                        msg,
-                                        cls=f"issue-item issue-item-{category['color']}"
-                                    )
-                                )
-                    
-                    # Create the collapsible section
-                    section = Div(
-                        Div(
-                            Div(
-                                Span(category["icon"], style="color: #8b5cf6;"),
-                                category["name"],
-                                cls="collapsible-title"
-                            ),
-                            Div(
-                                f"{category['count']} issues",
-                                Span("▼", id=f"arrow_{key}"),
-                                cls="collapsible-badge"
-                            ),
-                            cls="collapsible-header",
-                            id=section_id,
-                            onclick=f"""
-                                document.getElementById('{content_id}').classList.toggle('hidden');
-                                document.getElementById('arrow_{key}').textContent = 
-                                    document.getElementById('arrow_{key}').textContent === '▼' ? '▲' : '▼';
-                            """
-                        ),
-                        Div(
-                            *issue_items if issue_items else [P("No specific issues found.")],
-                            id=content_id,
-                            cls="collapsible-content"
-                        ),
-                        cls="collapsible"
-                    )
-                    
-                    detailed_sections.append(section)
-            
-            # Detailed analysis card
-            detailed_card = Div(
-                H2("Detailed Analysis", cls="section-title"),
-                *detailed_sections,
-                cls="card"
-            ) if detailed_sections else ""
-            
-            # Add script for download functionality
-            download_script = Script("""
-                document.getElementById('download_report').addEventListener('click', function() {
-                    const reportContent = document.getElementById('report_data').value;
-                    const blob = new Blob([reportContent], { type: 'text/plain' });
-                    const url = URL.createObjectURL(blob);
-                    const a = document.createElement('a');
-                    a.href = url;
-                    a.download = 'python_analysis_report.txt';
-                    document.body.appendChild(a);
-                    a.click();
-                    document.body.removeChild(a);
-                });
-                
-                // Initialize with all sections collapsed
-                document.addEventListener('DOMContentLoaded', function() {
-                    const collapsibleContents = document.querySelectorAll('.collapsible-content');
-                    collapsibleContents.forEach(content => {
-                        content.classList.add('hidden');
-                    });
-                });
-            """)
-            
-            # Function test results section (if any)
-            function_test_card = ""
-            if test_results:
-                function_sections = []
-                
-                # Calculate total score and max score
-                total_score = 0
-                max_score = 0
-                
-                for func_name, func_results in test_results.items():
-                    # Count passed tests and calculate score
-                    passed_tests = sum(1 for r in func_results if r.get("passed", False))
-                    total_tests = len(func_results)
-                    
-                    # Calculate points
-                    func_score = sum(r.get("points", 0) for r in func_results if r.get("passed", False))
-                    func_max_score = sum(r.get("points", 0) for r in func_results)
-                    
-                    total_score += func_score
-                    max_score += func_max_score
-                    
-                    # Create test result items
-                    test_items = []
-                    for test_result in func_results:
-                        test_id = test_result.get("test_id", "unknown")
-                        description = test_result.get("description", "")
-                        passed = test_result.get("passed", False)
-                        error = test_result.get("error")
-                        points = test_result.get("points", 0)
-                        
-                        # Create test status icon
-                        status_icon = "✅" if passed else "❌"
-                        status_class = "text-green-400" if passed else "text-red-400"
-                        
-                        # Create test result item
-                        test_item = Div(
-                            Div(
-                                Span(status_icon, style=f"color: {status_class};"),
-                                Span(description or test_id, style="margin-left: 0.5rem;"),
-                                cls="flex items-center"
-                            ),
-                            Div(
-                                f"{points if passed else 0}/{points} points",
-                                style="font-size: 0.75rem; color: #9ca3af;"
-                            ),
-                            *([Div(
-                                f"Error: {error}",
-                                style="font-size: 0.75rem; color: #ef4444; margin-top: 0.25rem;"
-                            )] if error else []),
-                            style="padding: 0.5rem; border-bottom: 1px solid rgba(75, 85, 99, 0.3);"
-                        )
-                        test_items.append(test_item)
-                    
-                    # Create function result section
-                    function_section = Div(
-                        Div(
-                            Div(
-                                Span("🔍", style="color: #8b5cf6;"),
-                                func_name,
-                                cls="collapsible-title"
-                            ),
-                            Div(
-                                f"{passed_tests}/{total_tests} tests passed | {func_score}/{func_max_score} points",
-                                Span("▼", id=f"func_arrow_{func_name}"),
-                                cls="collapsible-badge"
-                            ),
-                            cls="collapsible-header",
-                            id=f"function_section_{func_name}",
-                            onclick=f"""
-                                document.getElementById('function_content_{func_name}').classList.toggle('hidden');
-                                document.getElementById('func_arrow_{func_name}').textContent = 
-                                    document.getElementById('func_arrow_{func_name}').textContent === '▼' ? '▲' : '▼';
-                            """
-                        ),
-                        Div(
-                            *test_items,
-                            id=f"function_content_{func_name}",
-                            cls="collapsible-content"
-                        ),
-                        cls="collapsible"
-                    )
-                    
-                    function_sections.append(function_section)
-                
-                # Create the function test card
-                function_test_card = Div(
-                    Div(
-                        "Function Tests",
-                        style="font-size: 1.25rem; font-weight: 600; margin-bottom: 1rem; color: #f0f0f0;"
-                    ),
-                    Div(
-                        Div(
-                            "Overall Score:",
-                            style="font-weight: 500; color: #d1d5db;"
-                        ),
-                        Div(
-                            f"{total_score}/{max_score} points ({int(total_score/max_score*100) if max_score else 0}%)",
-                            style="font-size: 1.25rem; font-weight: 600; color: #a78bfa;"
-                        ),
-                        style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 1rem; padding-bottom: 0.5rem; border-bottom: 1px solid rgba(75, 85, 99, 0.5);"
-                    ),
-                    *function_sections,
-                    cls="card"
-                )
-            
-            # Main container
-            container = Div(
-                header,
-                summary_card,
-                detailed_card,
-                function_test_card if test_results else "",
-                report_data,
-                cls="container"
+            # Extraction, function tests and analysis block on subprocesses and
+            # student code, so run them on the grading executor
+            grading = await run_grading_job(
+                grade_code_cells,
+                code_cells,
+                is_notebook,
+                check_options,
+                difficulty,
+                config_path,
+                selected_functions
             )
+            analysis_results = grading["analysis_results"]
+            test_results = grading["test_results"]
             
-            # Combine all elements
-            return Titled("CellSensei - Analysis Results", 
-                css,
-                container,
-                download_script
-            )
+            return analysis_results_page(notebook_file.filename, analysis_results, test_results)
 
         except Exception as e:
             # Log the full error on the server
             print(f"Error during static analysis: {e}") # Replace with proper logging
             # import traceback; traceback.print_exc(); # For detailed debugging
             return Titled("Processing Error", P(f"An error occurred during analysis: {e}"))
+
+    @app.route("/task_status/{task_id}", methods=["GET"])
+    async def task_status(req: Request, task_id: str):
+        from celery_worker.app import celery_app
+        
+        result = celery_app.AsyncResult(task_id)
+        is_htmx = req.headers.get("HX-Request") == "true"
+        
+        if result.successful():
+            if is_htmx:
+                # Swap the whole page for the results, not just the progress panel
+                return Response(status_code=200, headers={"HX-Redirect": f"/task_status/{task_id}"})
+            grading = result.result
+            return analysis_results_page(grading["filename"], grading["analysis_results"], grading["test_results"])
+        
+        if result.failed():
+            print(f"Error during grading task {task_id}: {result.result}")
+            return Titled("Processing Error", P(f"An error occurred during analysis: {result.result}"))
+        
+        meta = result.info if result.state == "PROGRESS" and isinstance(result.info, dict) else {}
+        if is_htmx:
+            return grading_progress(task_id, result.state, meta)
+        return grading_status_page(task_id, result.state, meta)